@@ -4,13 +4,11 @@ import sys
 import click
 
 from .utils.graphviz import plot_dag
-from .logging import ConsoleLogger, FancyLogger, FileLogger
+from .logging import ConsoleLogger, FancyLogger, FileLogger, StateLogger
 from .scaffolding.init_project import sayn_init
 from .core.app import App, Command
 from .tasks.task import TaskStatus
 
-yesterday = date.today() - timedelta(days=1)
-
 
 class CliApp(App):
     def __init__(
@@ -26,25 +24,21 @@ class CliApp(App):
         end_dt=None,
         with_tests=False,
         fail_fast=False,
+        threads=None,
+        resume=None,
+        skip_unchanged=None,
+        shard=None,
+        shard_key=None,
+        shard_db=None,
+        state=None,
     ):
         super().__init__()
 
         # STARTING APP: register loggers and set cli arguments in the App object
         self.run_arguments.command = command
+        self.register_loggers(debug)
 
-        if debug:
-            self.run_arguments.debug = debug
-        else:
-            self.tracker.remove_logger(ConsoleLogger)
-            self.tracker.register_logger(FancyLogger())
-
-        self.tracker.register_logger(
-            FileLogger(
-                self.run_arguments.folders.logs,
-                format=f"{self.run_id}|" + "%(asctime)s|%(levelname)s|%(message)s",
-            )
-        )
-
+        yesterday = date.today() - timedelta(days=1)
         if start_dt is not None:
             self.run_arguments.dates_specified = True
             self.run_arguments.start_dt = start_dt.date()
@@ -76,8 +70,44 @@ class CliApp(App):
         if fail_fast is not None:
             self.run_arguments.fail_fast = fail_fast
 
+        if threads is not None:
+            self.run_arguments.threads = threads
+
+        if resume is not None:
+            self.run_arguments.resume = resume
+
+        if skip_unchanged is not None:
+            self.run_arguments.skip_unchanged = skip_unchanged
+
+        if shard is not None:
+            self.run_arguments.shard = shard
+
+        if shard_key is not None:
+            self.run_arguments.shard_key = shard_key
+
+        if shard_db is not None:
+            self.run_arguments.shard_db = shard_db
+
+        if state is not None:
+            self.run_arguments.state = state
+
         self.start_app()
 
+    def register_loggers(self, debug):
+        if debug:
+            self.run_arguments.debug = debug
+        else:
+            self.tracker.remove_logger(ConsoleLogger)
+            self.tracker.register_logger(FancyLogger())
+
+        self.tracker.register_logger(
+            FileLogger(
+                self.run_arguments.folders.logs,
+                format=f"{self.run_id}|" + "%(asctime)s|%(levelname)s|%(message)s",
+            )
+        )
+        self.tracker.register_logger(StateLogger(self.state))
+
 
 class ChainOption(click.Option):
     def __init__(self, *args, **kwargs):
@@ -139,6 +169,71 @@ click_fail_fast = click.option(
     help="Interrupt remaining task execution on first failure.",
 )
 
+click_threads = click.option(
+    "--threads",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Maximum number of tasks to execute concurrently (default: 1).",
+)
+
+click_resume = click.option(
+    "--resume",
+    default=None,
+    metavar="RUN_ID",
+    help="Resume a previous run, executing only the tasks that didn't succeed with its original arguments.",
+)
+
+
+def parse_shard(ctx, param, value):
+    if value is None:
+        return None
+
+    try:
+        shard, n_shards = [int(v) for v in value.split("/")]
+    except ValueError:
+        raise click.BadParameter("Expected format: i/n (eg: 1/3)")
+
+    if n_shards < 1 or shard < 1 or shard > n_shards:
+        raise click.BadParameter("Shard needs to be between 1 and the number of shards")
+
+    return shard, n_shards
+
+
+def click_shard(func):
+    func = click.option(
+        "--shard",
+        default=None,
+        metavar="I/N",
+        callback=parse_shard,
+        help="Split the tasks in N shards executed by separate invocations, running shard I in this one.",
+    )(func)
+    func = click.option(
+        "--shard-key",
+        default=None,
+        help="Identifier shared by all shards of a run (default: a hash of the run arguments).",
+    )(func)
+    func = click.option(
+        "--shard-db",
+        default=None,
+        help="Path to the sqlite database shared by all shards (default: .sayn/shards.db).",
+    )(func)
+    return func
+
+
+click_state = click.option(
+    "--state",
+    default=None,
+    metavar="MANIFEST_OR_GIT_REF",
+    help="Manifest file or git ref to compare with when selecting tasks with state:modified (default: the last run).",
+)
+
+click_skip_unchanged = click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    default=False,
+    help="Skip sql and autosql tasks whose query, definition and parents didn't change since their last successful run.",
+)
+
 
 def click_filter(func):
     func = click.option(
@@ -146,7 +241,7 @@ def click_filter(func):
         "-t",
         multiple=True,
         cls=ChainOption,
-        help="Task query to INCLUDE in the execution: [+]task_name[+], group:group_name, tag:tag_name",
+        help="Task query to INCLUDE in the execution: [+]task_name[+], group:group_name, tag:tag_name, @file_path",
         default=list(),
     )(func)
     func = click.option(
@@ -154,7 +249,7 @@ def click_filter(func):
         "-x",
         multiple=True,
         cls=ChainOption,
-        help="Task query to EXCLUDE in the execution: [+]task_name[+], group:group_name, tag:tag_name",
+        help="Task query to EXCLUDE in the execution: [+]task_name[+], group:group_name, tag:tag_name, @file_path",
         default=list(),
     )(func)
     func = click.option(
@@ -213,6 +308,15 @@ def init(sayn_project_name):
 
 @cli.command(help="Compile sql tasks.")
 @click_with_tests
+@click_threads
+@click_state
+@click.option(
+    "--watch",
+    "-w",
+    is_flag=True,
+    default=False,
+    help="Keep compiling the tasks affected by changes to project files until interrupted.",
+)
 @click_run_options
 def compile(
     debug,
@@ -225,6 +329,9 @@ def compile(
     end_dt,
     with_tests,
     fail_fast,
+    threads,
+    state,
+    watch,
 ):
 
     tasks = [i for t in tasks for i in t.strip().split(" ")]
@@ -241,9 +348,14 @@ def compile(
         end_dt,
         with_tests,
         fail_fast,
+        threads,
+        state=state,
     )
 
-    app.compile()
+    if watch:
+        app.watch()
+    else:
+        app.compile()
     if any([t.status == TaskStatus.FAILED for _, t in app.tasks.items()]):
         sys.exit(-1)
     else:
@@ -252,6 +364,11 @@ def compile(
 
 @cli.command(help="Run SAYN tasks.")
 @click_with_tests
+@click_threads
+@click_resume
+@click_skip_unchanged
+@click_shard
+@click_state
 @click_run_options
 def run(
     debug,
@@ -264,6 +381,13 @@ def run(
     end_dt,
     with_tests,
     fail_fast,
+    threads,
+    resume,
+    skip_unchanged,
+    shard,
+    shard_key,
+    shard_db,
+    state,
 ):
 
     tasks = [i for t in tasks for i in t.strip().split(" ")]
@@ -280,6 +404,13 @@ def run(
         end_dt,
         with_tests,
         fail_fast,
+        threads,
+        resume=resume,
+        skip_unchanged=skip_unchanged,
+        shard=shard,
+        shard_key=shard_key,
+        shard_db=shard_db,
+        state=state,
     )
 
     app.run()
@@ -290,6 +421,8 @@ def run(
 
 
 @cli.command(help="Test SAYN tasks.")
+@click_threads
+@click_state
 @click_run_options
 def test(
     debug,
@@ -301,6 +434,8 @@ def test(
     start_dt,
     end_dt,
     fail_fast,
+    threads,
+    state,
 ):
 
     tasks = [i for t in tasks for i in t.strip().split(" ")]
@@ -315,7 +450,9 @@ def test(
         full_load,
         start_dt,
         end_dt,
-        fail_fast,
+        fail_fast=fail_fast,
+        threads=threads,
+        state=state,
     )
 
     app.test()
@@ -339,3 +476,28 @@ def dag_image(debug, tasks, exclude, upstream_prod):
     plot_dag(app.dag, "images", "dag")
 
     print("Dag image created in `images/dag.png`")
+
+
+@cli.command(
+    help="Start a server executing run, compile and test requests without reloading the project."
+)
+@click.option("--profile", "-p", help="Profile from settings to use")
+@click.option(
+    "--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)."
+)
+@click.option(
+    "--port",
+    type=click.IntRange(min=0),
+    default=8765,
+    help="Port to listen on (default: 8765).",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    default=None,
+    help="Listen on this unix socket instead of a TCP port.",
+)
+def serve(profile, host, port, socket_path):
+    from .server import serve as serve_requests
+
+    serve_requests(profile=profile, host=host, port=port, socket_path=socket_path)
@@ -1,14 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 from enum import Enum
+import hashlib
 from itertools import groupby
+import json
+import os
 from pathlib import Path
-import shutil
+import time
 from uuid import UUID, uuid4
 import sys
-from typing import Optional, Set
+from typing import Optional, Set, Tuple
+
+from jinja2.defaults import DEFAULT_NAMESPACE
 
 from ..tasks.task_wrapper import TaskWrapper
-from ..utils.dag import query as dag_query, topological_sort
+from ..utils.dag import Dag, topological_sort
+from .manifest import get_definitions, get_modified_tasks, update_manifest
+from .scheduler import Scheduler
+from .shards import ShardStore, partition
+from .state import StateStore
+from .watcher import FileWatcher
 from .settings import get_connections, get_settings
 from .errors import Err, Exc, Ok, Result, SaynError
 from ..logging import EventTracker
@@ -20,9 +31,11 @@ from ..database.unknown import UnknownDb
 from ..database.objects import DbObjectCompiler
 from ..logging import ConsoleLogger
 from ..utils.python_loader import PythonLoader
-from ..utils.task_query import get_query
+from ..utils.task_query import get_query, uses_state
 from ..utils.compiler import Compiler
+from ..utils.compile_writer import CompileWriter
 
+from ..tasks.process_executor import ProcessExecutor
 from ..tasks.task import TaskStatus
 from ..tasks.dummy import DummyTask
 from ..tasks.sql import SqlTask
@@ -40,9 +53,6 @@ _creators = {
 }
 
 
-run_id = uuid4()
-
-
 class Command(Enum):
     UNDEFINED = "undefined"
     COMPILE = "compile"
@@ -56,6 +66,7 @@ class RunArguments:
         sql: str = str(Path("sql"))
         compile: str = str(Path("compile"))
         logs: str = str(Path("logs"))
+        state: str = str(Path(".sayn"))
         tests: str = str(Path("sql"))
 
     folders: Folders
@@ -70,6 +81,13 @@ class RunArguments:
     is_prod: bool = False
     with_tests: bool = False
     fail_fast: bool = False
+    threads: Optional[int] = None
+    resume: Optional[str] = None
+    skip_unchanged: bool = False
+    shard: Optional[Tuple[int, int]] = None
+    shard_key: Optional[str] = None
+    shard_db: Optional[str] = None
+    state: Optional[str] = None
 
     include: Set[str]
     exclude: Set[str]
@@ -96,13 +114,22 @@ class RunArguments:
 
 
 class App:
+    # Seconds between checks for tasks finished by other shards
+    shard_poll_interval = 1
+    # Seconds between checks for changes to project files with `sayn compile --watch`
+    watch_poll_interval = 1
+    # Task types whose config only depends on their definition and templates, so the
+    # results can be reused across executions (see set_tasks)
+    cached_edges_types = ("sql", "autosql", "copy")
+
     def __init__(self):
         self.project_root = Path(".")
 
-        self.run_id: UUID = run_id
+        self.run_id: UUID = uuid4()
         self.app_start_ts = datetime.now()
 
         self.run_arguments = RunArguments()
+        self.state = StateStore(self.run_arguments.folders.state)
 
         self.tracker = EventTracker(self.run_id)
         self.tracker.register_logger(ConsoleLogger(True))
@@ -111,19 +138,41 @@ class App:
         self.prod_project_parameters = dict()
         self.credentials = dict()
         self.default_db = None
+        self.project = None
 
         self.tasks = dict()
+        self.tasks_dict = dict()
+        self.tasks_in_query = list()
         self.dag = dict()
+        self.dag_index = None
         self.tests = dict()
 
         self.task_query = list()
+        self.task_definitions = dict()
         self.tasks_to_run = dict()
+        self.resumed_tasks = set()
+        self.fingerprints = dict()
+
+        self.shard_store = None
+        self.shard_key = None
+        self.shard_generation = None
+        self.shard_plan = dict()
 
         self.connections = dict()
+        self.active_connections = set()
+        self.introspected = set()
+        self.process_executor = None
+        self.compile_writer = None
 
         self.python_loader = PythonLoader()
 
     def start_app(self):
+        # Arguments from a resumed run need to be in place before reporting the start
+        if self.run_arguments.resume is not None:
+            resume_result = self.set_resume(self.run_arguments.resume)
+        else:
+            resume_result = Ok()
+
         self.tracker.report_event(
             context="app",
             event="start_app",
@@ -132,8 +181,17 @@ class App:
             start_dt=self.run_arguments.start_dt,
             end_dt=self.run_arguments.end_dt,
             profile=self.run_arguments.profile,
+            resume=self.run_arguments.resume,
+            shard=self.run_arguments.shard,
+        )
+        self.check_abort(resume_result)
+        self.compile_writer = CompileWriter(
+            self.run_arguments.folders.compile,
+            self.state,
+            # Shards share the compile folder, so stale files are removed by the last one to
+            # finish (see finish_shard)
+            remove_stale=self.run_arguments.shard is None,
         )
-        self.cleanup_compilation()
 
         # SETUP THE APP: read project config and settings, interpret cli arguments and setup the dag
         self.tracker.start_stage("config")
@@ -148,15 +206,23 @@ class App:
 
         # Read the project configuration
         try:
-            project = read_project(self.project_root)
+            project = read_project(self.project_root, cache=self.state)
         except SaynError as exc:
             self.finish_app(error=Exc(exc))
 
+        timings = dict()
         try:
-            file_groups = read_groups(self.project_root)
+            file_groups = read_groups(
+                self.project_root, cache=self.state, timings=timings
+            )
         except SaynError as exc:
             self.finish_app(error=Exc(exc))
 
+        for file, duration in timings.items():
+            self.tracker.report_event(
+                event="file_parsed", file=str(file), duration=duration
+            )
+
         self.set_project(project, file_groups)
 
         # We need the settings before we can process the tasks
@@ -164,26 +230,11 @@ class App:
         self.check_abort(self.set_settings(settings))
 
         # Set tasks and dag from it
-        tasks_dict = self.check_abort(
-            get_tasks_dict(
-                self.presets,
-                self.file_groups,
-                self.autogroups,
-                self.run_arguments.folders.sql,
-                self.compiler,
-                self.python_loader,
-            )
-        )
+        tasks_dict = self.check_abort(self.get_tasks())
 
         # Set the tasks for the project and call their config method
-
-        if (
-            self.run_arguments.command != Command.TEST
-            and not self.run_arguments.with_tests
-        ):
-            tasks_dict = {k: v for k, v in tasks_dict.items() if v["type"] != "test"}
-
         self.check_abort(self.set_tasks(tasks_dict))
+        self.check_abort(self.set_tasks_in_query())
 
         self.tracker.finish_current_stage(
             tasks={k: v.status for k, v in self.tasks.items()},
@@ -200,6 +251,58 @@ class App:
             test=True if self.run_arguments.command == Command.TEST else False,
         )
 
+    def set_resume(self, run_id):
+        """Restores the arguments of a previous run, so that only the tasks that didn't succeed
+        in that run are executed"""
+        run = self.state.get_run(run_id)
+        if run is None:
+            return Err(
+                "app",
+                "resume_error",
+                error_message=f'Run "{run_id}" not found in the state of the project',
+            )
+        elif run["command"] != self.run_arguments.command.value:
+            return Err(
+                "app",
+                "resume_error",
+                error_message=f'Run "{run_id}" was a "{run["command"]}" execution',
+            )
+
+        arguments = run["arguments"]
+        self.run_arguments.start_dt = date.fromisoformat(arguments["start_dt"])
+        self.run_arguments.end_dt = date.fromisoformat(arguments["end_dt"])
+        self.run_arguments.dates_specified = arguments["dates_specified"]
+        self.run_arguments.full_load = arguments["full_load"]
+        self.run_arguments.profile = arguments["profile"]
+        self.run_arguments.include = set(arguments["include"])
+        self.run_arguments.exclude = set(arguments["exclude"])
+        self.run_arguments.upstream_prod = arguments["upstream_prod"]
+        self.run_arguments.with_tests = arguments["with_tests"]
+        self.run_arguments.state = arguments.get("state")
+
+        self.resumed_tasks = {
+            task
+            for task, status in run["tasks"].items()
+            if status == TaskStatus.SUCCEEDED.value
+        }
+
+        return Ok()
+
+    def get_state_arguments(self):
+        """Json serialisable version of the run arguments required to resume the execution"""
+        return {
+            "start_dt": self.run_arguments.start_dt.isoformat(),
+            "end_dt": self.run_arguments.end_dt.isoformat(),
+            "dates_specified": self.run_arguments.dates_specified,
+            "full_load": self.run_arguments.full_load,
+            "profile": self.run_arguments.profile,
+            "include": sorted(self.run_arguments.include),
+            "exclude": sorted(self.run_arguments.exclude),
+            "upstream_prod": self.run_arguments.upstream_prod,
+            "with_tests": self.run_arguments.with_tests,
+            "state": self.run_arguments.state,
+        }
+
     def set_project(self, project, file_groups):
         self.prod_project_parameters.update(project.parameters or dict())
         self.project_parameters.update(project.parameters or dict())
@@ -230,9 +333,10 @@ class App:
         self.credentials = {k: None for k in project.required_credentials}
         self.default_db = project.default_db
 
-        self.presets = project.presets or dict()
+        self.check_abort(self.set_groups(project, file_groups))
 
-        # Validate groups
+    def set_groups(self, project, file_groups):
+        """Sets the presets and groups used to define tasks"""
         collision = set(file_groups.keys()).intersection(set(project.autogroups.keys()))
         if len(collision) > 0:
             if len(collision) == 1:
@@ -245,17 +349,20 @@ class App:
                     f'Some groups ({", ".join(collision)}) are defined both in '
                     '"project.yaml" and as files in the "tasks" folder: '
                 )
-            self.finish_app(
-                error=Err(
-                    "dag",
-                    "duplicate_groups",
-                    error_message=error_message,
-                    groups=list(collision),
-                )
+            return Err(
+                "dag",
+                "duplicate_groups",
+                error_message=error_message,
+                groups=list(collision),
             )
+
+        self.project = project
+        self.presets = project.presets or dict()
         self.autogroups = project.autogroups
         self.file_groups = file_groups
 
+        return Ok()
+
     def set_settings(self, settings):
         settings_dict = get_settings(
             settings["yaml"], settings["env"], self.run_arguments.profile
@@ -286,7 +393,10 @@ class App:
 
         # With the parameters in place we can build our jinja compiler
         self.compiler = Compiler(
-            self.run_arguments, self.project_parameters, self.prod_project_parameters
+            self.run_arguments,
+            self.project_parameters,
+            self.prod_project_parameters,
+            cache_folder=Path(self.run_arguments.folders.state, "jinja"),
         )
 
         # Validate credentials
@@ -301,9 +411,7 @@ class App:
         self.credentials.update(credentials)
 
         # Create connections
-        result = get_connections(
-            self.credentials,
-        )
+        result = self.create_connections(self.credentials)
         if result.is_err:
             return result
         else:
@@ -327,8 +435,49 @@ class App:
                 "upstream_prod"
             ]
 
+        # Command line arguments take precedence over the settings value
+        if self.run_arguments.threads is None:
+            self.run_arguments.threads = settings_dict["default_run"]["threads"]
+
         return Ok()
 
+    def create_connections(self, credentials):
+        """Returns the connections to use in the execution (see sayn.core.settings.get_connections)"""
+        return get_connections(credentials)
+
+    def get_tasks(self):
+        """Returns the tasks defined in the project for the current command"""
+        result = get_tasks_dict(
+            self.presets,
+            self.file_groups,
+            self.autogroups,
+            self.run_arguments.folders.sql,
+            self.compiler,
+            self.python_loader,
+            cache=self.state,
+        )
+        if result.is_err:
+            return result
+        else:
+            tasks_dict = result.value
+
+        if (
+            self.run_arguments.command != Command.TEST
+            and not self.run_arguments.with_tests
+        ):
+            tasks_dict = {k: v for k, v in tasks_dict.items() if v["type"] != "test"}
+
+        return Ok(tasks_dict)
+
+    def get_definitions(self, tasks_dict):
+        """Returns the definitions of the tasks (see sayn.core.manifest.get_definitions)"""
+        return get_definitions(
+            tasks_dict,
+            self.file_groups,
+            self.run_arguments.folders.sql,
+            self.run_arguments.folders.python,
+        )
+
     def get_task_class(self, task_type, config):
         if task_type == "python_module":
             return Ok(config.pop("task_class"))
@@ -344,66 +493,184 @@ class App:
                 group=config["group"],
             )
 
+    def config_task(self, task_name, task, task_object=None):
+        """Runs the config of a task, creating the TaskWrapper unless an object with the edges
+        from a previous execution is passed (see set_tasks)"""
+        task_tracker = self.tracker.get_task_tracker(task_name)
+        task_tracker._report_event("start_stage")
+        start_ts = datetime.now()
+
+        result = self.get_task_class(task["type"], task)
+        if result.is_err:
+            task_class = None
+            result_error = result
+        else:
+            task_class = result.value
+            result_error = None
+
+        if task_object is None:
+            task_object = self.create_task(task_name, task, task_class, task_tracker)
+        else:
+            task_object.status = TaskStatus.CONFIGURING
+
+        if task_class is None:
+            result = result_error
+        else:
+            result = task_object.config(
+                task,
+                self.project_parameters,
+                task.get("parameters"),
+            )
+
+        task_tracker._report_event(
+            "finish_stage", duration=datetime.now() - start_ts, result=result
+        )
+        self.tracker.release_task_events(task_name)
+
+        return task_object, result
+
+    def create_task(self, task_name, task, task_class, task_tracker=None):
+        return TaskWrapper(
+            task["group"],
+            task_name,
+            task["type"],
+            task.get("on_fail"),
+            task.get("parents"),
+            task.get("sources"),
+            task.get("outputs"),
+            task.get("tags"),
+            task_tracker or self.tracker.get_task_tracker(task_name),
+            task_class,
+            self.connections,
+            self.default_db,
+            self.run_arguments,
+            self.compiler,
+            self.db_object_compiler,
+            compile_writer=self.compile_writer,
+        )
+
+    def config_tasks(self, tasks, task_objects=None):
+        """Runs the config of a set of tasks, returning the task objects and the results"""
+        # Tasks are independent during config, so they can be configured concurrently
+        # reporting their events in the order they're defined
+        task_objects = task_objects or dict()
+        arguments = (
+            tasks.keys(),
+            tasks.values(),
+            [task_objects.get(name) for name in tasks.keys()],
+        )
+        if self.run_arguments.threads is not None and self.run_arguments.threads > 1:
+            self.tracker.buffer_task_events(tasks.keys())
+            with ThreadPoolExecutor(max_workers=self.run_arguments.threads) as pool:
+                return list(pool.map(self.config_task, *arguments))
+        else:
+            return list(map(self.config_task, *arguments))
+
+    def get_edges_context(self):
+        """Json serialisable version of everything outside of the task definition that can
+        change the dependencies found during the config of tasks"""
+        return {
+            "globals": {
+                k: v
+                for k, v in self.compiler.env.globals.items()
+                if k not in DEFAULT_NAMESPACE
+            },
+            "prod_globals": {
+                k: v
+                for k, v in self.compiler.prod_env.globals.items()
+                if k not in DEFAULT_NAMESPACE
+            },
+            "stringify": self.input_stringify,
+            "prod_stringify": self.input_prod_stringify,
+            "from_prod": sorted(self.from_prod or list()),
+            "default_db": self.default_db,
+            "connections": {
+                name: type(connection).__name__
+                for name, connection in self.connections.items()
+            },
+            "with_tests": self.run_arguments.with_tests,
+            "full_load": self.run_arguments.full_load,
+            "is_prod": self.run_arguments.is_prod,
+            "sql_folder": str(self.run_arguments.folders.sql),
+        }
+
+    def get_edges_keys(self, tasks):
+        """Returns the key used to cache the edges of the tasks whose config only depends on
+        their definition, the settings of the project and their templates"""
+        context = json.dumps(self.get_edges_context(), sort_keys=True, default=str)
+        return {
+            name: hashlib.sha256(
+                f"{context}{json.dumps(task, sort_keys=True, default=str)}".encode(
+                    "utf-8"
+                )
+            ).hexdigest()
+            for name, task in tasks.items()
+            if task["type"] in self.cached_edges_types
+        }
+
     def set_tasks(self, tasks):
-        # We first need to do the config of tasks
+        """Creates the task objects and calculates the dag. Tasks whose edges (sources, outputs,
+        parents,...) were stored in a previous execution with the same definition, settings and
+        templates are added to the dag without running their config, which is deferred until
+        they're selected for execution (see set_tasks_in_query)"""
         failed_tasks = list()
         task_objects = dict()
 
         if len(tasks) == 0:
             self.finish_app(Err("dag", "empty_dag"))
 
-        for task_name, task in tasks.items():
-            task_tracker = self.tracker.get_task_tracker(task_name)
-            task_tracker._report_event("start_stage")
-            start_ts = datetime.now()
+        self.tasks_dict = tasks
 
-            result = self.get_task_class(task["type"], task)
-            if result.is_err:
-                task_class = None
-                result_error = result
-                failed_tasks.append(task_name)
-            else:
-                task_class = result.value
-                result_error = None
-
-            task_objects[task_name] = TaskWrapper(
-                task["group"],
-                task_name,
-                task["type"],
-                task.get("on_fail"),
-                task.get("parents"),
-                task.get("sources"),
-                task.get("outputs"),
-                task.get("tags"),
-                task_tracker,
-                task_class,
-                self.connections,
-                self.default_db,
-                self.run_arguments,
-                self.compiler,
-                self.db_object_compiler,
-            )
-
-            if task_class is None:
-                task_tracker._report_event(
-                    "finish_stage",
-                    duration=datetime.now() - start_ts,
-                    result=result_error,
-                )
+        edges_keys = self.get_edges_keys(tasks)
+        file_hashes = dict()
 
-            else:
-                result = task_objects[task_name].config(
-                    task,
-                    self.project_parameters,
-                    task.get("parameters"),
-                )
+        def get_file_hash(file_name):
+            if file_name not in file_hashes:
+                try:
+                    file_hashes[file_name] = hashlib.sha256(
+                        Path(file_name).read_bytes()
+                    ).hexdigest()
+                except OSError:
+                    file_hashes[file_name] = None
+            return file_hashes[file_name]
+
+        stored_edges = self.state.get_task_edges()
+        cached_edges = {
+            task_name: entry
+            for task_name, entry in stored_edges.items()
+            if task_name in edges_keys
+            and entry["cache_key"] == edges_keys[task_name]
+            and all(get_file_hash(f) == h for f, h in entry["files"].items())
+        }
 
-                if result.is_err:
-                    failed_tasks.append(task_name)
+        tasks_to_config = {k: v for k, v in tasks.items() if k not in cached_edges}
+        results = dict(zip(tasks_to_config.keys(), self.config_tasks(tasks_to_config)))
 
-                task_tracker._report_event(
-                    "finish_stage", duration=datetime.now() - start_ts, result=result
+        new_edges = dict()
+        for task_name, task in tasks.items():
+            if task_name in cached_edges:
+                task_class = self.get_task_class(task["type"], task).value
+                task_object = self.create_task(task_name, task, task_class)
+                task_object.set_edges(cached_edges[task_name]["edges"])
+                # Files used by the task the last time it was configured
+                task_object.compiler.loaded_files.update(
+                    cached_edges[task_name]["files"].keys()
                 )
+                task_objects[task_name] = task_object
+                continue
+
+            task_object, result = results[task_name]
+            task_objects[task_name] = task_object
+            if result.is_err:
+                failed_tasks.append(task_name)
+            elif task_name in edges_keys:
+                new_edges[task_name] = {
+                    "cache_key": edges_keys[task_name],
+                    "files": {
+                        f: get_file_hash(f) for f in task_object.compiler.loaded_files
+                    },
+                    "edges": task_object.get_edges(),
+                }
 
         if len(failed_tasks) > 0:
             # If any tasks fail to do config, we can't ensure the DAG is correct, so we abort
@@ -414,8 +681,31 @@ class App:
 
             self.finish_app()
 
+        self.state.set_task_edges(new_edges)
+        # Tasks removed from the project or no longer of a cached type
+        self.state.delete_task_edges([t for t in stored_edges if t not in edges_keys])
+
         # Now that all tasks are configured, we set the relationships so that we
         # can calculate the dag
+        result = self.get_dag(task_objects)
+        if result.is_err:
+            return result
+        else:
+            self.dag, topo_sort = result.value
+
+        self.tasks = {task_name: task_objects[task_name] for task_name in topo_sort}
+        self.dag_index = Dag(self.dag, topo_sort)
+
+        return Ok()
+
+    def get_dag(self, task_objects, report_missing=None):
+        """Links the tasks to their parents, returning the dag and its topological sort.
+
+        Args:
+          task_objects (Dict[str, TaskWrapper]): the tasks to link
+          report_missing (Set[str]): if specified, only these tasks report sources not
+              produced by any task
+        """
         output_to_task = [
             (output, task_name)
             for task_name, task in task_objects.items()
@@ -427,47 +717,117 @@ class App:
             for k, g in groupby(sorted(output_to_task), key=lambda x: x[0])
         }
         for task_name, task in task_objects.items():
-            result = task.set_parents(task_objects, output_to_task)
+            result = task.set_parents(
+                task_objects,
+                output_to_task,
+                report_missing=report_missing is None or task_name in report_missing,
+            )
             if result.is_err:
                 return result
 
-        self.dag = {
+        dag = {
             task.name: [p.name for p in task.parents] for task in task_objects.values()
         }
 
-        topo_sort = topological_sort(self.dag)
+        topo_sort = topological_sort(dag)
         if topo_sort.is_err:
             return topo_sort
-        else:
-            topo_sort = topo_sort.value
 
-        self.tasks = {task_name: task_objects[task_name] for task_name in topo_sort}
+        return Ok((dag, topo_sort.value))
 
-        return Ok()
+    def get_tasks_in_query(self):
+        """Returns the tasks in the dag selected by the task query in topological order"""
+        modified = set()
+        # Task definitions are only needed to find the modified tasks
+        result = uses_state(self.run_arguments.include, self.run_arguments.exclude)
+        if result.is_err:
+            return result
+        elif result.value:
+            result = get_modified_tasks(
+                self.get_definitions(self.tasks_dict),
+                self.run_arguments.state,
+                Path(self.run_arguments.folders.state, "manifest.json"),
+            )
+            if result.is_err:
+                return result
+            else:
+                modified = result.value
 
-    def setup_execution(self):
-        # Apply the task query
         tasks_dict = {
-            name: {"group": task.group, "tags": list(task.tags)}
+            name: {
+                "group": task.group,
+                "tags": list(task.tags),
+                "modified": name in modified,
+            }
             for name, task in self.tasks.items()
         }
-        self.task_query = self.check_abort(
-            get_query(
-                tasks_dict,
-                include=self.run_arguments.include,
-                exclude=self.run_arguments.exclude,
-            )
+        result = get_query(
+            tasks_dict,
+            include=self.run_arguments.include,
+            exclude=self.run_arguments.exclude,
         )
-
-        result = dag_query(self.dag, self.task_query)
         if result.is_err:
             return result
         else:
-            tasks_in_query = result.value
+            self.task_query = result.value
+
+        result = self.dag_index.query(self.task_query)
+        if result.is_err:
+            return result
+
+        if len(self.run_arguments.include) > 0 and not any(
+            o["operation"] == "include" for o in self.task_query
+        ):
+            # Include selectors matched no tasks (eg: state:modified without changes)
+            return Ok(list())
+
+        return result
+
+    def set_tasks_in_query(self):
+        """Applies the task query, running the config of the selected tasks that were added
+        to the dag from their cached edges"""
+        tasks_in_query = self.check_abort(self.get_tasks_in_query())
+
+        # Tasks added to the dag from their cached edges need their config to be executed
+        tasks_to_config = {
+            name: self.tasks_dict[name]
+            for name in tasks_in_query
+            if not self.tasks[name].is_configured
+        }
+        if len(tasks_to_config) > 0:
+            results = self.config_tasks(tasks_to_config, self.tasks)
+            if any(result.is_err for _, result in results):
+                self.tracker.finish_current_stage(
+                    tasks={k: v.status for k, v in self.tasks.items()}
+                )
+                self.finish_app()
 
         if self.run_arguments.command == Command.TEST:
             tasks_in_query = [t for t in tasks_in_query if self.tasks[t].has_tests()]
 
+        # Tasks that succeeded in the resumed run are not executed again
+        tasks_in_query = [t for t in tasks_in_query if t not in self.resumed_tasks]
+
+        # Only the tasks assigned to this shard are executed
+        if self.run_arguments.shard is not None:
+            result = self.set_shard(tasks_in_query)
+            if result.is_err:
+                return result
+            else:
+                tasks_in_query = result.value
+
+        self.tasks_in_query = tasks_in_query
+
+        return Ok()
+
+    def setup_execution(self, tasks_to_setup=None):
+        """Introspects the objects used by the tasks in the query and runs the setup of
+        `tasks_to_setup` (default: all tasks in the query). Connections are only activated and
+        objects only introspected the first time they're required in the process"""
+        tasks_in_query = self.tasks_in_query
+        if tasks_to_setup is None:
+            tasks_to_setup = tasks_in_query
+
         # Introspection
         #########
 
@@ -491,6 +851,15 @@ class App:
             for connection in self.tasks[task_name].used_connections:
                 exec_connections.add(connection)
 
+        # Outputs from the resumed run are already in place, so they're not read from prod
+        for task_name in self.resumed_tasks:
+            if task_name in self.tasks:
+                exec_outputs.update(self.tasks[task_name].outputs)
+
+        # Same for outputs produced by other shards
+        for task_name in self.shard_plan.keys():
+            exec_outputs.update(self.tasks[task_name].outputs)
+
         # Now that we have done the config for all tasks and we know which
         # connections are required, check that we have them all
         connections_setup = {
@@ -516,6 +885,8 @@ class App:
         # are not meant to be used anywhere else in the code
         to_introspect = {self.db_object_compiler.src_obj(s) for s in exec_sources}
         to_introspect.update({self.db_object_compiler.out_obj(o) for o in exec_outputs})
+        to_introspect -= self.introspected
+        self.introspected.update(to_introspect)
 
         # Reshape the list into dictionaries of connection > database > schema > set of objects
         to_introspect = {
@@ -541,47 +912,110 @@ class App:
             )
         }
 
-        for connection_name in exec_connections:
-            db = self.connections[connection_name]
-            if isinstance(db, Database):
-                try:
-                    db._activate_connection()  # This call creates the engine and tests the connection
-                except Exception as exc:
-                    return Exc(exc, where="create_connection")
-                if connection_name in to_introspect:
-                    try:
-                        db._introspect(to_introspect[connection_name])
-                    except Exception as exc:
-                        return Err("database", "introspection", exception=exc)
-
-        self.tracker.set_tasks(tasks_in_query)
-
-        for task_order, task_name in enumerate(tasks_in_query):
-            task = self.tasks[task_name]
-            task.tracker._task_order = task_order + 1
-            if task.status != TaskStatus.READY_FOR_SETUP:
-                continue
-            #  TODO - review from test
-            # for task_name, task in self._tasks_dict.items():
-            #     if self.run_arguments["command"] == "test":
-            #         parents = []
-            #     else:
-            #         parents = [self.tasks[p] for p in task.get("parents", list())]
+        # Connections are activated and introspected concurrently
+        databases = sorted(
+            n
+            for n in exec_connections
+            if isinstance(self.connections[n], Database)
+            and (n not in self.active_connections or n in to_introspect)
+        )
+        if len(databases) > 0:
+            with ThreadPoolExecutor(max_workers=len(databases)) as pool:
+                results = list(
+                    pool.map(
+                        lambda n: self.prepare_connection(n, to_introspect.get(n)),
+                        databases,
+                    )
+                )
 
-            #     task_tracker = self.tracker.get_task_tracker(task_name)
+            for connection_name, (result, activation, introspection) in zip(
+                databases, results
+            ):
+                self.tracker.report_event(
+                    event="connection_ready",
+                    connection=connection_name,
+                    activation=activation,
+                    introspection=introspection,
+                )
+
+            for result, _, _ in results:
+                if result.is_err:
+                    return result
+
+        self.tracker.set_tasks(tasks_to_setup)
 
+        tasks_to_setup = {name: self.tasks[name] for name in tasks_to_setup}
+        for task_order, task in enumerate(tasks_to_setup.values()):
+            task.tracker._task_order = task_order + 1
+        tasks_to_setup = {
+            name: task
+            for name, task in tasks_to_setup.items()
+            if task.status == TaskStatus.READY_FOR_SETUP
+        }
+
+        def setup_task(task):
             start_ts = datetime.now()
 
             task.tracker._report_event("start_stage")
 
-            result = task.setup(task_name in tasks_in_query, sources_from_prod)
+            result = task.setup(True, sources_from_prod)
 
             task.tracker._report_event(
                 "finish_stage", duration=datetime.now() - start_ts, result=result
             )
+            self.tracker.release_task_events(task.name)
+
+            return result
+
+        # Tasks setup concurrently report their events in the order of the dag
+        if self.run_arguments.threads is not None and self.run_arguments.threads > 1:
+            self.tracker.buffer_task_events(tasks_to_setup.keys())
+
+        Scheduler(
+            tasks_to_setup,
+            threads=self.run_arguments.threads,
+            connection_limits=self.get_connection_limits(),
+        ).run(setup_task)
 
         return Ok()
 
+    def prepare_connection(self, connection_name, to_introspect):
+        """Activates a database connection and introspects the objects used in the execution.
+
+        Returns:
+          A tuple with the result, the time taken to activate the connection and the time
+          taken by the introspection (None if there was nothing to introspect)
+        """
+        db = self.connections[connection_name]
+        start_ts = datetime.now()
+        if connection_name not in self.active_connections:
+            try:
+                # This call creates the engine and tests the connection
+                db._activate_connection()
+            except Exception as exc:
+                return (
+                    Exc(exc, where="create_connection"),
+                    datetime.now() - start_ts,
+                    None,
+                )
+            self.active_connections.add(connection_name)
+
+        activation = datetime.now() - start_ts
+        if to_introspect is None:
+            return Ok(), activation, None
+
+        start_ts = datetime.now()
+        try:
+            db._introspect(to_introspect)
+        except Exception as exc:
+            return (
+                Err("database", "introspection", exception=exc),
+                activation,
+                datetime.now() - start_ts,
+            )
+
+        return Ok(), activation, datetime.now() - start_ts
+
     # Commands
 
     def check_abort(self, result):
@@ -609,52 +1043,488 @@ class App:
         self.execute_dag()
 
     def execute_dag(self):
+        if self.run_arguments.command not in (
+            Command.RUN,
+            Command.COMPILE,
+            Command.TEST,
+        ):
+            self.finish_app(error=Err("cli", "wrong_command"))
+
         # Execution of relevant tasks
-        tasks_in_query = {k: v for k, v in self.tasks.items() if v.in_query}
+        self.execute_tasks({k: v for k, v in self.tasks.items() if v.in_query})
+
+        self.finish_app()
+
+    def execute_tasks(self, tasks_in_query):
+        """Executes the current command on a set of tasks already setup"""
         self.tracker.start_stage(
             self.run_arguments.command.value, tasks=list(tasks_in_query.keys())
         )
-        interrupt_flag = False
 
-        for task in self.tasks.values():
-            if not task.in_query:
-                continue
+        if self.run_arguments.command == Command.RUN and any(
+            t.executor == "process" for t in tasks_in_query.values()
+        ):
+            self.process_executor = ProcessExecutor(
+                max_workers=self.run_arguments.threads or 1,
+                python_folder=self.run_arguments.folders.python
+                if Path(self.run_arguments.folders.python).is_dir()
+                else None,
+                credentials=self.credentials,
+            )
 
-            if interrupt_flag:
-                task.fail_fast = True
+        if self.run_arguments.command == Command.RUN:
+            self.fingerprints = self.state.get_fingerprints()
+
+        self.state.start_run(
+            self.run_id,
+            self.run_arguments.command.value,
+            self.get_state_arguments(),
+            dict(
+                {t: TaskStatus.SUCCEEDED.value for t in self.resumed_tasks},
+                **{t: TaskStatus.READY.value for t in tasks_in_query.keys()},
+            ),
+        )
 
-            # We force the run/compile so that the skipped status can be calculated,
-            # but we only report if the task is in the query
-            # if task.in_query:
-            task.tracker._report_event("start_stage")
-            start_ts = datetime.now()
+        scheduler = Scheduler(
+            tasks_in_query,
+            threads=self.run_arguments.threads,
+            fail_fast=self.run_arguments.fail_fast,
+            connection_limits=self.get_connection_limits(),
+            durations=self.state.get_durations(self.run_arguments.command.value)
+            if self.run_arguments.threads is not None and self.run_arguments.threads > 1
+            else None,
+            # Tasks with parents in other shards are only started once those finish
+            external_parents=self.get_shard_parents(tasks_in_query),
+            poll_external=self.poll_shards,
+            poll_interval=self.shard_poll_interval,
+        )
+        try:
+            scheduler.run(
+                self.execute_task,
+                coroutine_func=self.execute_task_async
+                if self.run_arguments.command == Command.RUN
+                else None,
+            )
+        finally:
+            if self.process_executor is not None:
+                self.process_executor.shutdown()
+
+        if self.run_arguments.command == Command.RUN:
+            # The manifest holds the definition of tasks in their last successful run
+            definitions = self.get_definitions(
+                {
+                    name: self.tasks_dict[name]
+                    for name, task in tasks_in_query.items()
+                    if task.status == TaskStatus.SUCCEEDED and name in self.tasks_dict
+                }
+            )
+            update_manifest(
+                Path(self.run_arguments.folders.state, "manifest.json"),
+                {name: definition["hash"] for name, definition in definitions.items()},
+            )
 
-            if self.run_arguments.command == Command.RUN:
-                result = task.run()
-            elif self.run_arguments.command == Command.COMPILE:
-                result = task.compile()
-            elif self.run_arguments.command == Command.TEST:
-                result = task.test()
-            else:
-                self.finish_app(error=Err("cli", "wrong_command"))
+        self.tracker.finish_current_stage(
+            tasks={k: v.status for k, v in tasks_in_query.items()},
+            test=True if self.run_arguments.command == Command.TEST else False,
+        )
 
-            if task.in_query:
-                task.tracker._report_event(
-                    "finish_stage", duration=datetime.now() - start_ts, result=result
+    def watch(self):
+        """Compiles the tasks in the query and keeps compiling the ones affected by changes to
+        the project files (see recompile) until interrupted"""
+        self.execute_tasks({k: v for k, v in self.tasks.items() if v.in_query})
+        # Changes to the definition of tasks are found comparing with the current ones
+        self.task_definitions = self.get_definitions(self.tasks_dict)
+
+        watcher = FileWatcher(
+            [
+                Path(self.project_root, "project.yaml"),
+                Path(self.project_root, "tasks"),
+                Path(self.project_root, self.run_arguments.folders.sql),
+            ]
+        )
+        self.compile_writer.flush()
+        self.tracker.report_event(event="start_watch")
+        try:
+            while True:
+                time.sleep(self.watch_poll_interval)
+                changed_files = watcher.changes()
+                if len(changed_files) == 0:
+                    continue
+
+                start_ts = datetime.now()
+                self.tracker.report_event(
+                    event="files_changed", files=sorted(changed_files)
                 )
+                result = self.recompile(changed_files)
+                if result.is_err:
+                    if self.tracker.current_stage is not None:
+                        self.tracker.finish_current_stage(tasks=dict())
+                    self.tracker.report_event(
+                        event="watch_error",
+                        duration=datetime.now() - start_ts,
+                        error=result,
+                    )
+
+                self.compile_writer.flush()
+                self.tracker.report_event(event="start_watch")
+        except KeyboardInterrupt:
+            pass
+
+        self.finish_app()
+
+    def recompile(self, changed_files):
+        """Configures and compiles again the tasks affected by changes to the project files,
+        which are the tasks whose definition changed, the ones using a changed template and all
+        their downstream tasks. The rest of the tasks, the compilers, connections and the
+        objects introspected are kept from previous compilations.
+
+        Args:
+          changed_files (Set[str]): the files that changed since the last compilation
+        """
+        changed_files = {os.path.normpath(f) for f in changed_files}
+
+        try:
+            project = read_project(self.project_root, cache=self.state)
+            file_groups = read_groups(self.project_root, cache=self.state)
+        except SaynError as exc:
+            return Exc(exc)
+
+        # Presets and groups are the only settings not used to setup the app
+        task_settings = {"presets", "autogroups"}
+        if project.dict(exclude=task_settings) != self.project.dict(
+            exclude=task_settings
+        ):
+            return Err(
+                "app",
+                "watch_restart",
+                error_message="Changes to project.yaml other than presets and groups require restarting sayn",
+            )
+
+        result = self.set_groups(project, file_groups)
+        if result.is_err:
+            return result
+
+        result = self.get_tasks()
+        if result.is_err:
+            return result
+        else:
+            tasks_dict = result.value
+            definitions = self.get_definitions(tasks_dict)
+
+        affected = {
+            name
+            for name in tasks_dict.keys()
+            if name not in self.tasks
+            or definitions[name]["hash"] != self.task_definitions[name]["hash"]
+            or self.tasks[name].status == TaskStatus.FAILED
+            or any(
+                os.path.normpath(f) in changed_files
+                for f in self.tasks[name].compiler.loaded_files
+            )
+        }
+        removed = set(self.tasks.keys()) - set(tasks_dict.keys())
+        if len(affected) == 0 and len(removed) == 0:
+            return Ok()
+
+        # Links between the tasks kept are restored if the new dag is not valid
+        links = {
+            name: (list(task.parents), set(task.parent_names))
+            for name, task in self.tasks.items()
+        }
+
+        def restore_links():
+            for name, (parents, parent_names) in links.items():
+                self.tasks[name].parents = parents
+                self.tasks[name].parent_names = parent_names
+
+        self.tracker.start_stage("config")
+
+        # Tasks downstream in the new dag can only be known after the affected tasks are
+        # configured, so we keep going until no new tasks are found
+        to_config = affected | self.dag_index.downstream_set(affected | removed)
+        configured = dict()
+        failed = False
+        while len(to_config) > 0:
+            tasks_to_config = {k: v for k, v in tasks_dict.items() if k in to_config}
+            results = self.config_tasks(tasks_to_config)
+            for task_name, (task_object, result) in zip(
+                tasks_to_config.keys(), results
+            ):
+                configured[task_name] = task_object
+                failed = failed or result.is_err
+            if failed:
+                break
+
+            task_objects = {
+                name: configured.get(name) or self.tasks[name]
+                for name in tasks_dict.keys()
+            }
+            result = self.get_dag(task_objects, report_missing=to_config)
+            if result.is_err:
+                restore_links()
+                return result
+            else:
+                dag, topo_sort = result.value
+
+            to_config = Dag(dag, topo_sort).downstream_set(affected) - set(configured)
+
+        if failed:
+            restore_links()
+            self.tracker.finish_current_stage(
+                tasks={k: v.status for k, v in configured.items()}
+            )
+            return Ok()
+
+        self.tasks = {task_name: task_objects[task_name] for task_name in topo_sort}
+        self.dag = dag
+        self.dag_index = Dag(dag, topo_sort)
+        self.tasks_dict = tasks_dict
+        self.task_definitions = definitions
+
+        result = self.get_tasks_in_query()
+        if result.is_err:
+            return result
+        else:
+            tasks_in_query = result.value
 
-            if self.run_arguments.fail_fast and result.is_err:
-                interrupt_flag = True
+        # Tasks added to the dag from their cached edges need their config to be executed
+        tasks_to_config = {
+            name: tasks_dict[name]
+            for name in tasks_in_query
+            if not self.tasks[name].is_configured
+        }
+        if len(tasks_to_config) > 0:
+            for task_name, (task_object, result) in zip(
+                tasks_to_config.keys(), self.config_tasks(tasks_to_config, self.tasks)
+            ):
+                configured[task_name] = task_object
+                failed = failed or result.is_err
 
         self.tracker.finish_current_stage(
-            tasks={k: v.status for k, v in tasks_in_query.items()},
-            test=True if self.run_arguments.command == Command.TEST else False,
+            tasks={k: v.status for k, v in configured.items()}
         )
+        if failed:
+            return Ok()
+
+        self.tasks_in_query = tasks_in_query
+        for task_name, task in self.tasks.items():
+            if task_name not in tasks_in_query:
+                task.in_query = False
+
+        # Only new tasks and tasks configured again need setting up and compiling
+        tasks_to_compile = [
+            name
+            for name in tasks_in_query
+            if self.tasks[name].status == TaskStatus.READY_FOR_SETUP
+        ]
+        if len(tasks_to_compile) == 0:
+            return Ok()
 
-        self.finish_app()
+        self.tracker.start_stage("setup")
+        result = self.setup_execution(tasks_to_compile)
+        if result.is_err:
+            return result
+        self.tracker.finish_current_stage(
+            tasks={k: self.tasks[k].status for k in tasks_to_compile}
+        )
+
+        self.execute_tasks({k: self.tasks[k] for k in tasks_to_compile})
+
+        return Ok()
+
+    def get_shard_key(self):
+        """Key identifying the executions of all shards of a run: the one specified with
+        --shard-key or a hash of the run arguments"""
+        if self.run_arguments.shard_key is not None:
+            return self.run_arguments.shard_key
+
+        arguments = dict(
+            self.get_state_arguments(),
+            command=self.run_arguments.command.value,
+            shards=self.run_arguments.shard[1],
+        )
+        return hashlib.sha256(
+            json.dumps(arguments, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def set_shard_store(self):
+        if self.shard_store is None:
+            self.shard_key = self.get_shard_key()
+            self.shard_store = ShardStore(
+                self.run_arguments.shard_db
+                or Path(self.run_arguments.folders.state, "shards.db")
+            )
+
+    def set_shard(self, tasks_in_query):
+        """Splits the tasks in the query across shards, returning the tasks to execute in this
+        one. The first shard to get here creates the plan for the rest"""
+        shard, n_shards = self.run_arguments.shard
+        durations = self.state.get_durations(self.run_arguments.command.value)
+        self.set_shard_store()
+
+        try:
+            plan, self.shard_generation = self.shard_store.get_plan(
+                self.shard_key,
+                shard,
+                lambda: partition(tasks_in_query, self.dag, durations, n_shards),
+            )
+        except Exception as exc:
+            return Err(
+                "app",
+                "shard_error",
+                error_message=f"Error accessing the shards database: {exc}",
+            )
+
+        if set(plan.keys()) != set(tasks_in_query):
+            return Err(
+                "app",
+                "shard_error",
+                error_message="The tasks in this shard don't match the plan of the run. "
+                "All shards need to run the same project with the same arguments",
+            )
+
+        self.shard_plan = {t: s for t, s in plan.items() if s != shard}
+
+        return Ok([t for t in tasks_in_query if plan[t] == shard])
+
+    def get_shard_parents(self, tasks):
+        """Returns the parents of each task executed by other shards"""
+        return {
+            name: {p.name for p in task.parents if p.name in self.shard_plan}
+            for name, task in tasks.items()
+        }
+
+    def poll_shards(self, names):
+        """Returns the tasks executed by other shards that finished, setting their status so
+        that it's considered when executing their children"""
+        # Read before the statuses, so tasks reported just before their shard finished are
+        # not taken as never executed
+        finished = self.shard_store.get_finished_shards(
+            self.shard_key, self.shard_generation
+        )
+        statuses = self.shard_store.get_statuses(
+            self.shard_key, self.shard_generation, names
+        )
+
+        # Tasks from shards that finished without reporting them won't ever finish
+        for name in names:
+            if name not in statuses and self.shard_plan[name] in finished:
+                statuses[name] = TaskStatus.FAILED.value
+
+        for name, status in statuses.items():
+            self.tasks[name].status = TaskStatus(status)
+
+        return set(statuses.keys())
+
+    def get_connection_limits(self):
+        return {
+            name: db.max_concurrency
+            for name, db in self.connections.items()
+            if isinstance(db, Database) and db.max_concurrency is not None
+        }
+
+    def execute_task(self, task):
+        """Executes the current command on a task, reporting the start and finish of the stage"""
+        start_ts = self.start_task_execution(task)
+
+        result = task.execute_task(
+            self.run_arguments.command.value,
+            process_executor=self.process_executor,
+            fingerprints=self.fingerprints
+            if self.run_arguments.skip_unchanged
+            else None,
+        )
+
+        return self.finish_task_execution(task, start_ts, result)
+
+    async def execute_task_async(self, task):
+        """Version of execute_task for tasks with a coroutine run method, awaited in the event
+        loop shared by all coroutine tasks"""
+        start_ts = self.start_task_execution(task)
+
+        result = await task.execute_task_async(
+            self.run_arguments.command.value,
+            fingerprints=self.fingerprints
+            if self.run_arguments.skip_unchanged
+            else None,
+        )
+
+        return self.finish_task_execution(task, start_ts, result)
+
+    def start_task_execution(self, task):
+        task.tracker._report_event("start_stage")
+        start_ts = datetime.now()
+
+        if (
+            self.run_arguments.command == Command.RUN
+            and self.run_arguments.skip_unchanged
+            and task.status == TaskStatus.READY
+        ):
+            task.set_fingerprint(self.fingerprints)
+
+        return start_ts
+
+    def finish_task_execution(self, task, start_ts, result):
+        if (
+            self.run_arguments.command == Command.RUN
+            and task.status == TaskStatus.SUCCEEDED
+        ):
+            if task.fingerprint is None:
+                # Without a fingerprint we assume the output changes in every execution
+                task.fingerprint = f"run:{self.run_id}"
+            self.state.set_fingerprint(task.name, task.fingerprint)
+
+        task.tracker._report_event(
+            "finish_stage",
+            duration=datetime.now() - start_ts,
+            result=result,
+            unchanged=task.unchanged,
+        )
+        self.state.set_task_status(self.run_id, task.name, task.status.value)
+        if self.shard_store is not None:
+            self.shard_store.set_status(
+                self.shard_key, self.shard_generation, task.name, task.status.value
+            )
+
+        return result
+
+    def finish_shard(self):
+        """Flags the shard as finished, so other shards stop waiting for tasks not executed.
+        The last shard to finish removes the compiled files not written by any shard"""
+        if self.run_arguments.shard is None:
+            return
+
+        shard = self.run_arguments.shard[0]
+        try:
+            self.set_shard_store()
+            if self.shard_generation is None:
+                # The shard failed before getting the plan, so it joins the run without tasks
+                _, self.shard_generation = self.shard_store.get_plan(
+                    self.shard_key, shard, lambda: dict()
+                )
+            if self.compile_writer is not None:
+                self.shard_store.add_files(
+                    self.shard_key, self.shard_generation, self.compile_writer.written
+                )
+            self.shard_store.finish_shard(self.shard_key, self.shard_generation, shard)
+
+            finished = self.shard_store.get_finished_shards(
+                self.shard_key, self.shard_generation
+            )
+            if (
+                len(finished) == self.run_arguments.shard[1]
+                and self.compile_writer is not None
+            ):
+                self.compile_writer.remove_stale_files(
+                    self.shard_store.get_files(self.shard_key, self.shard_generation)
+                )
+        except Exception:
+            pass
 
     def finish_app(self, error=None):
+        self.finish_compilation()
         duration = datetime.now() - self.app_start_ts
+        self.finish_shard()
         if self.run_arguments.fail_fast and error is not None:
             self.tracker.report_event(
                 event="finish_stage",
@@ -690,13 +1560,13 @@ class App:
             else:
                 sys.exit()
 
-    def cleanup_compilation(self):
-        folder = self.run_arguments.folders.compile
-        compile_path = Path(folder)
-        if compile_path.exists():
-            if compile_path.is_dir():
-                shutil.rmtree(compile_path.absolute())
-            else:
-                compile_path.unlink()
+    def finish_compilation(self):
+        """Waits for the compiled files to be written and removes the stale ones"""
+        if self.compile_writer is None:
+            return
 
-        compile_path.mkdir()
+        self.compile_writer.close()
+        if len(self.compile_writer.errors) > 0:
+            self.tracker.report_event(
+                event="compile_write_error", errors=self.compile_writer.errors
+            )
@@ -0,0 +1,235 @@
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+import subprocess
+
+from ruamel.yaml import YAML
+
+from .errors import Err, Ok
+
+
+def _relative(path):
+    path = str(path)
+    if os.path.isabs(path):
+        path = os.path.relpath(path)
+    return Path(os.path.normpath(path)).as_posix()
+
+
+def get_task_files(task, file_groups, sql_folder, python_folder):
+    """Returns the files (relative to the project root) that define a task: the yaml where it's
+    defined, its sql file and its python module"""
+    files = list()
+    group = file_groups.get(task["group"])
+    if group is not None:
+        files.append(f"tasks/{task['group']}.yaml")
+
+    if group is None or (
+        "preset" in task and task["preset"] not in (group.presets or dict())
+    ):
+        # Tasks defined in project.yaml or using a global preset
+        files.append("project.yaml")
+
+    if isinstance(task.get("file_name"), str):
+        files.append(_relative(Path(sql_folder, task["file_name"])))
+
+    if task.get("task_class") is not None and hasattr(task["task_class"], "func"):
+        try:
+            files.append(_relative(inspect.getfile(task["task_class"].func)))
+        except TypeError:
+            pass
+    elif task.get("type") == "python" and isinstance(task.get("class"), str):
+        module = Path(python_folder, *task["class"].split(".")[:-1])
+        if Path(f"{module}.py").is_file():
+            files.append(_relative(f"{module}.py"))
+        elif Path(module, "__init__.py").is_file():
+            files.append(_relative(Path(module, "__init__.py")))
+
+    return files
+
+
+def get_definitions(tasks, file_groups, sql_folder, python_folder):
+    """Returns the files defining each task and a hash of its definition, calculated from the
+    task properties (after merging presets) and the content of its sql and python files.
+
+    Args:
+      tasks (Dict[str, Dict]): the tasks as returned by sayn.core.project.get_tasks_dict
+      file_groups (Dict[str, TaskGroupFile]): the groups defined in the tasks folder
+      sql_folder (str): the folder containing sql files
+      python_folder (str): the folder containing python tasks
+    """
+    definitions = dict()
+    for name, task in tasks.items():
+        files = get_task_files(task, file_groups, sql_folder, python_folder)
+
+        properties = dict(task)
+        if properties.get("task_class") is not None:
+            func = getattr(properties["task_class"], "func", None)
+            properties["task_class"] = (
+                f"{func.__module__}.{func.__name__}" if func is not None else None
+            )
+
+        content = hashlib.sha256(
+            json.dumps(properties, sort_keys=True, default=str).encode("utf-8")
+        )
+        for file in files:
+            if not file.endswith(".yaml") and Path(file).is_file():
+                content.update(Path(file).read_bytes())
+
+        definitions[name] = {"files": files, "hash": content.hexdigest()}
+
+    return definitions
+
+
+def read_manifest(path):
+    """Returns the hashes of task definitions stored in a manifest file or None if missing"""
+    path = Path(path)
+    if not path.is_file():
+        return
+
+    try:
+        return json.loads(path.read_text())["tasks"]
+    except Exception:
+        return
+
+
+def update_manifest(path, hashes):
+    """Updates the hashes of the task definitions in the manifest file"""
+    path = Path(path)
+    tasks = read_manifest(path) or dict()
+    tasks.update(hashes)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"tasks": tasks}, indent=2, sort_keys=True))
+    except OSError:
+        pass
+
+
+def get_changed_files(ref):
+    """Returns the files in the current folder that differ from a git ref, including files
+    not tracked by git"""
+    try:
+        changed = subprocess.run(
+            ["git", "diff", "--name-only", "--relative", ref, "--"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.splitlines()
+        untracked = subprocess.run(
+            ["git", "ls-files", "--others", "--exclude-standard"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.splitlines()
+    except (OSError, subprocess.CalledProcessError) as exc:
+        message = exc.stderr.strip() if hasattr(exc, "stderr") and exc.stderr else exc
+        return Err(
+            "task_query",
+            "state_error",
+            error_message=f'Error comparing with git ref "{ref}": {message}',
+        )
+
+    return Ok({Path(f).as_posix() for f in changed + untracked})
+
+
+def _read_group_file(file, ref=None):
+    """Returns the content of a yaml file in the tasks folder at a git ref (or the current
+    content if ref is None) or None if it doesn't exist or it's not valid"""
+    try:
+        if ref is None:
+            text = Path(file).read_text()
+        else:
+            text = subprocess.run(
+                ["git", "show", f"{ref}:./{file}"],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        content = YAML(typ="safe").load(text)
+    except Exception:
+        return
+
+    if not isinstance(content, dict):
+        return
+
+    return content
+
+
+def _task_changed(name, old, new):
+    """Compares the definition of a task and the group presets it uses in two versions of a
+    file in the tasks folder"""
+    if old is None or new is None:
+        return True
+
+    old_task = (old.get("tasks") or dict()).get(name)
+    new_task = (new.get("tasks") or dict()).get(name)
+    if old_task is None or new_task is None or old_task != new_task:
+        # Tests and tasks added or removed are also considered changed
+        return True
+
+    old_presets = old.get("presets") or dict()
+    new_presets = new.get("presets") or dict()
+    preset = new_task.get("preset")
+    seen = set()
+    while preset is not None and preset in new_presets and preset not in seen:
+        if old_presets.get(preset) != new_presets[preset]:
+            return True
+        seen.add(preset)
+        preset = (new_presets[preset] or dict()).get("preset")
+
+    return False
+
+
+def get_modified_tasks(definitions, state, manifest_path):
+    """Returns the set of tasks modified with respect to the state. The state is either the path
+    to a manifest file or a git ref. When not specified, the manifest of the last run is used.
+
+    Args:
+      definitions (Dict[str, Dict]): the output of get_definitions
+      state (str): a manifest file, a git ref or None
+      manifest_path (str): the manifest file where sayn stores the state of the last run
+    """
+    if state is not None and not Path(state).is_file():
+        result = get_changed_files(state)
+        if result.is_err:
+            return result
+        changed = result.value
+
+        # Files in the tasks folder define many tasks, so the definition of each task in the
+        # file is compared instead
+        group_files = {
+            f: (_read_group_file(f, state), _read_group_file(f))
+            for f in changed
+            if f.startswith("tasks/") and f.endswith(".yaml")
+        }
+
+        def is_modified(name, files):
+            for file in files:
+                if file in group_files:
+                    if _task_changed(name, *group_files[file]):
+                        return True
+                elif file in changed:
+                    return True
+            return False
+
+        return Ok(
+            {
+                name
+                for name, definition in definitions.items()
+                if is_modified(name, definition["files"])
+            }
+        )
+
+    manifest = read_manifest(state or manifest_path)
+    if manifest is None:
+        # Without a previous state all tasks are considered modified
+        return Ok(set(definitions.keys()))
+
+    return Ok(
+        {
+            name
+            for name, definition in definitions.items()
+            if manifest.get(name) != definition["hash"]
+        }
+    )
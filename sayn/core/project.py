@@ -1,14 +1,18 @@
 from copy import deepcopy
+import hashlib
+import json
+import os
 from pathlib import Path
 from typing import Any, List, Mapping, Optional
 
+from jinja2.defaults import DEFAULT_NAMESPACE
 from pydantic import BaseModel, Field, validator, Extra
 from sayn.tasks.python import DecoratorTaskWrapper
 
 from ..utils.compiler import TaskJinjaEnv
 from ..utils.misc import merge_dicts, merge_dict_list
 from ..utils.dag import upstream, topological_sort
-from ..utils.yaml import read_yaml_file
+from ..utils.yaml import read_yaml_file, read_yaml_files
 from .errors import Err, Ok
 
 
@@ -66,8 +70,8 @@ class Project(BaseModel):
             return v.strip()
 
 
-def read_project(project_root=Path(".")):
-    return read_yaml_file(project_root / Path("project.yaml"), Project)
+def read_project(project_root=Path("."), cache=None):
+    return read_yaml_file(project_root / Path("project.yaml"), Project, cache=cache)
 
 
 class TaskGroupFile(BaseModel):
@@ -80,15 +84,18 @@ class TaskGroupFile(BaseModel):
         anystr_lower = True
 
 
-def read_groups(project_root=Path(".")):
+def read_groups(project_root=Path("."), cache=None, timings=None):
+    """Returns the groups defined in the tasks folder, parsing the files in parallel. The
+    groups are sorted by file name so the order doesn't depend on the file system"""
     task_folder = project_root / "tasks"
     if task_folder.exists() and task_folder.is_dir():
-        out = dict()
-        for file in task_folder.glob("*.yaml"):
-            name = str(file.relative_to(task_folder))[:-5]
-            out[name] = read_yaml_file(file, TaskGroupFile)
+        files = sorted(task_folder.glob("*.yaml"))
+        models = read_yaml_files(files, TaskGroupFile, cache=cache, timings=timings)
 
-        return out
+        return {
+            str(file.relative_to(task_folder))[:-5]: model
+            for file, model in zip(files, models)
+        }
     else:
         return dict()
 
@@ -205,14 +212,76 @@ def get_task_dict(task, task_name, group_name, presets):
     return Ok(dict(task, name=task_name, group=group_name))
 
 
+def get_tasks_key(global_presets, groups, autogroups, sql_folder, compiler):
+    """Returns a hash of everything that determines the output of get_tasks_dict: the project
+    and group definitions, the jinja variables used to compile autogroup globs and the list
+    of files in the sql folder"""
+    sql_files = list()
+    for root, _, files in os.walk(sql_folder):
+        sql_files.extend(os.path.join(root, f) for f in files)
+
+    variables = {
+        k: v for k, v in compiler.env.globals.items() if k not in DEFAULT_NAMESPACE
+    }
+
+    key = json.dumps(
+        [
+            global_presets,
+            {
+                name: [group.presets, group.tasks, group.tests]
+                for name, group in groups.items()
+            },
+            autogroups,
+            str(sql_folder),
+            variables,
+            sorted(sql_files),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
 def get_tasks_dict(
-    global_presets, groups, autogroups, sql_folder, compiler, python_loader
+    global_presets,
+    groups,
+    autogroups,
+    sql_folder,
+    compiler,
+    python_loader,
+    cache=None,
 ):
     """Returns a dictionary with the task definition with the preset information merged
     Args:
       global_presets (dict): a dictionary with the presets as defined in project.yaml
       groups (sayn.common.config.TaskGroup): a list of task groups from the tasks/ folder
+      cache (sayn.core.state.StateStore): if passed, the output is stored in the cache and
+          reused while the project definition and the sql folder remain the same. Projects
+          with python autogroups are not cached as their tasks are python objects
     """
+    if cache is None:
+        return _get_tasks_dict(
+            global_presets, groups, autogroups, sql_folder, compiler, python_loader
+        )
+
+    cache_key = get_tasks_key(global_presets, groups, autogroups, sql_folder, compiler)
+    tasks = cache.get_parsed_tasks(cache_key)
+    if tasks is not None:
+        return Ok(tasks)
+
+    result = _get_tasks_dict(
+        global_presets, groups, autogroups, sql_folder, compiler, python_loader
+    )
+    if result.is_ok and all("task_class" not in t for t in result.value.values()):
+        cache.set_parsed_tasks(cache_key, result.value)
+
+    return result
+
+
+def _get_tasks_dict(
+    global_presets, groups, autogroups, sql_folder, compiler, python_loader
+):
     result = get_presets(global_presets, groups)
     if result.is_err:
         return result
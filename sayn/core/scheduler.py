@@ -0,0 +1,334 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import heapq
+import threading
+import time
+
+
+class EventLoopThread:
+    """An asyncio event loop running in a background thread, shared by all coroutine tasks.
+
+    The loop is started when the first coroutine is submitted. `submit` returns a
+    `concurrent.futures.Future` so coroutines can be awaited alongside the thread pool.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+
+    def submit(self, coro):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=self.loop.run_forever, name="sayn-event-loop", daemon=True
+            )
+            self.thread.start()
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+
+
+class Scheduler:
+    """Ready-queue executor for the tasks in a DAG.
+
+    A task is started as soon as all its parents within the scheduled set have finished,
+    running up to `threads` tasks at the same time. Parents outside of the scheduled set
+    (ie: tasks not in the query) are considered finished. When `threads` is 1 tasks are
+    executed in the calling thread, following the order of the `tasks` dictionary.
+
+    When running in parallel, ready tasks on the longest remaining path of the DAG are started
+    first. The length of a path is the sum of the durations of its tasks, using the `durations`
+    recorded in previous runs. Tasks without a recorded duration are assumed to take the average
+    of the known durations.
+
+    Connection limits act as semaphores keyed by connection name: a task only starts when
+    there's a free slot in every connection in `task.used_connections`, holding all of them
+    until it finishes. Time spent waiting for a slot is reported as a `connection_wait` event.
+
+    Tasks flagged with `is_coroutine` are executed with `coroutine_func` in a shared event loop
+    instead of the thread pool, so they don't count towards the `threads` limit and any number
+    of them can be awaited concurrently (subject to the connection limits).
+
+    Tasks can also depend on `external_parents`, tasks executed elsewhere (eg: in another
+    shard). Once its parents in the scheduled set finish, a task waits for its external parents
+    without being started, so it doesn't hold a thread, with the scheduler calling
+    `poll_external(names)` every `poll_interval` seconds to get the ones that finished. Time
+    spent waiting is reported as a `shard_wait` event.
+
+    Args:
+      tasks (Dict[str, sayn.tasks.task_wrapper.TaskWrapper]): tasks to execute in topological order
+      threads (int): maximum number of tasks executing concurrently
+      fail_fast (bool): flag tasks not yet started as interrupted after the first failure
+      connection_limits (Dict[str, int]): maximum number of concurrent tasks per connection
+      durations (Dict[str, float]): duration in seconds of each task in previous runs
+      external_parents (Dict[str, Set[str]]): parents of each task executed elsewhere
+      poll_external (Callable[[Set[str]], Set[str]]): returns the external parents finished
+      poll_interval (float): seconds between calls to `poll_external`
+    """
+
+    def __init__(
+        self,
+        tasks,
+        threads=1,
+        fail_fast=False,
+        connection_limits=None,
+        durations=None,
+        external_parents=None,
+        poll_external=None,
+        poll_interval=1,
+    ):
+        self.tasks = tasks
+        self.threads = max(threads or 1, 1)
+        self.fail_fast = fail_fast
+        self.interrupted = False
+
+        self.semaphores = {
+            name: threading.BoundedSemaphore(limit)
+            for name, limit in (connection_limits or dict()).items()
+        }
+        self.ready_ts = dict()
+        self.waiting_on = dict()
+
+        self.order = {name: i for i, name in enumerate(tasks.keys())}
+        self.pending_parents = {
+            name: {p.name for p in task.parents if p.name in tasks}
+            for name, task in tasks.items()
+        }
+        self.children = {name: list() for name in tasks.keys()}
+        for name, parents in self.pending_parents.items():
+            for parent in parents:
+                self.children[parent].append(name)
+
+        self.external_parents = {
+            name: sorted(parents)
+            for name, parents in (external_parents or dict()).items()
+            if name in tasks and len(parents) > 0
+        }
+        self.pending_external = {
+            name: set(parents) for name, parents in self.external_parents.items()
+        }
+        self.poll_external = poll_external
+        self.poll_interval = poll_interval
+        # Tasks waiting only on external parents, with the time they started waiting
+        self.blocked = dict()
+
+        self.critical_path = dict()
+        if self.threads > 1 and durations:
+            self.set_critical_path(durations)
+
+    def set_critical_path(self, durations):
+        """Calculates the duration of the longest path from each task to the end of the DAG"""
+        known = [durations[name] for name in self.tasks.keys() if name in durations]
+        default = sum(known) / len(known) if len(known) > 0 else 0
+
+        # Tasks are in topological order, so children are always calculated before parents
+        for name in reversed(list(self.tasks.keys())):
+            self.critical_path[name] = durations.get(name, default) + max(
+                [self.critical_path[child] for child in self.children[name]],
+                default=0,
+            )
+
+    def priority(self, task_name):
+        """Sort key for ready tasks. Lower values are started first"""
+        return (-self.critical_path.get(task_name, 0), self.order[task_name])
+
+    def run(self, func, coroutine_func=None):
+        """Executes `func(task)` for every task, returning a dictionary of results. If
+        `coroutine_func` is specified, coroutine tasks are awaited as `coroutine_func(task)`
+        in the event loop instead"""
+        self.ready = list()
+        for name, parents in self.pending_parents.items():
+            if len(parents) == 0:
+                self._unblock(name)
+
+        self.coroutine_func = coroutine_func
+        self.event_loop = EventLoopThread()
+        try:
+            if self.threads == 1:
+                return self._run_sequential(func)
+            else:
+                return self._run_parallel(func)
+        finally:
+            self.event_loop.stop()
+
+    def _is_coroutine(self, task_name):
+        return self.coroutine_func is not None and getattr(
+            self.tasks[task_name], "is_coroutine", False
+        )
+
+    def _unblock(self, task_name):
+        """Called when all parents of a task in the scheduled set finished"""
+        if task_name in self.pending_external:
+            self.blocked[task_name] = datetime.now()
+        else:
+            self._push_ready(task_name)
+
+    def _poll_external(self):
+        """Moves the tasks whose external parents finished to the ready queue"""
+        if len(self.blocked) == 0:
+            return
+
+        names = set()
+        for task_name in self.blocked.keys():
+            names |= self.pending_external[task_name]
+        finished = set(self.poll_external(names))
+
+        for task_name in list(self.blocked.keys()):
+            self.pending_external[task_name] -= finished
+            if len(self.pending_external[task_name]) == 0:
+                self.report_external_wait(
+                    self.tasks[task_name],
+                    self.external_parents[task_name],
+                    datetime.now() - self.blocked.pop(task_name),
+                )
+                self._push_ready(task_name)
+
+    def _push_ready(self, task_name):
+        self.ready_ts[task_name] = datetime.now()
+        heapq.heappush(self.ready, (self.priority(task_name), task_name))
+
+    def _pop_ready(self, coroutines_only=False):
+        """Returns the ready task with the highest priority that can acquire its connections
+        or None if all ready tasks are waiting on a connection"""
+        task_name = None
+        waiting = list()
+        while len(self.ready) > 0:
+            item = heapq.heappop(self.ready)
+            if coroutines_only and not self._is_coroutine(item[1]):
+                waiting.append(item)
+            elif self._acquire_connections(item[1]):
+                task_name = item[1]
+                break
+            else:
+                waiting.append(item)
+
+        for item in waiting:
+            heapq.heappush(self.ready, item)
+
+        if task_name is not None:
+            if task_name in self.waiting_on:
+                self.report_wait(
+                    self.tasks[task_name],
+                    sorted(self.waiting_on.pop(task_name)),
+                    datetime.now() - self.ready_ts[task_name],
+                )
+
+            if self.interrupted:
+                self.tasks[task_name].fail_fast = True
+
+        return task_name
+
+    def _task_connections(self, task_name):
+        return sorted(
+            c for c in self.tasks[task_name].used_connections if c in self.semaphores
+        )
+
+    def _acquire_connections(self, task_name):
+        acquired = list()
+        for connection in self._task_connections(task_name):
+            if self.semaphores[connection].acquire(blocking=False):
+                acquired.append(connection)
+            else:
+                if task_name not in self.waiting_on:
+                    self.waiting_on[task_name] = set()
+                self.waiting_on[task_name].add(connection)
+
+                for c in acquired:
+                    self.semaphores[c].release()
+                return False
+
+        return True
+
+    def _release_connections(self, task_name):
+        for connection in self._task_connections(task_name):
+            self.semaphores[connection].release()
+
+    def report_wait(self, task, connections, duration):
+        task.tracker._report_event(
+            "connection_wait", connections=connections, duration=duration
+        )
+
+    def report_external_wait(self, task, tasks, duration):
+        task.tracker._report_event("shard_wait", tasks=tasks, duration=duration)
+
+    def _task_done(self, task_name, result):
+        self._release_connections(task_name)
+
+        if self.fail_fast and result is not None and result.is_err:
+            self.interrupted = True
+
+        for child in self.children[task_name]:
+            self.pending_parents[child].discard(task_name)
+            if len(self.pending_parents[child]) == 0:
+                self._unblock(child)
+
+    def _run_sequential(self, func):
+        results = dict()
+        while len(self.ready) > 0 or len(self.blocked) > 0:
+            self._poll_external()
+            if len(self.ready) == 0:
+                time.sleep(self.poll_interval)
+                continue
+
+            task_name = self._pop_ready()
+            if self._is_coroutine(task_name):
+                results[task_name] = self.event_loop.submit(
+                    self.coroutine_func(self.tasks[task_name])
+                ).result()
+            else:
+                results[task_name] = func(self.tasks[task_name])
+            self._task_done(task_name, results[task_name])
+
+        return results
+
+    def _run_parallel(self, func):
+        results = dict()
+        running = dict()
+        running_threads = 0
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            while len(self.ready) > 0 or len(running) > 0 or len(self.blocked) > 0:
+                self._poll_external()
+                while len(self.ready) > 0:
+                    # With all threads busy, only coroutine tasks can start
+                    task_name = self._pop_ready(
+                        coroutines_only=running_threads >= self.threads
+                    )
+                    if task_name is None:
+                        # All ready tasks are waiting on a connection or a thread
+                        break
+
+                    if self._is_coroutine(task_name):
+                        future = self.event_loop.submit(
+                            self.coroutine_func(self.tasks[task_name])
+                        )
+                    else:
+                        future = pool.submit(func, self.tasks[task_name])
+                        running_threads += 1
+                    running[future] = task_name
+
+                if len(running) == 0:
+                    # Only tasks waiting on external parents left
+                    time.sleep(self.poll_interval)
+                    continue
+
+                done, _ = wait(
+                    running.keys(),
+                    timeout=self.poll_interval if len(self.blocked) > 0 else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    task_name = running.pop(future)
+                    if not self._is_coroutine(task_name):
+                        running_threads -= 1
+                    results[task_name] = future.result()
+                    self._task_done(task_name, results[task_name])
+
+        return results
@@ -19,10 +19,10 @@ RE_ENV_VAR_NAME = re.compile(
 )
 
 RE_DEFAULT_RUN_VAL = re.compile(
-    r"^( *(?:(?:-t|--tasks|-x|--exclude)(?: +(?:group\:|tag\:)?[a-zA-Z][a-zA-Z_0-9]+)+|-u|--upstream-prod))+$"
+    r"^( *(?:(?:-t|--tasks|-x|--exclude)(?: +(?:group\:|tag\:)?[a-zA-Z][a-zA-Z_0-9]+)+|-u|--upstream-prod|--threads +[1-9][0-9]*))+$"
 )
 RE_DEFAULT_RUN = re.compile(
-    r" *((?:-t|--tasks|-x|--exclude)(?: +(?:group\:|tag\:)?[a-zA-Z][a-zA-Z_0-9]+)+|-u|--upstream-prod)"
+    r" *((?:-t|--tasks|-x|--exclude)(?: +(?:group\:|tag\:)?[a-zA-Z][a-zA-Z_0-9]+)+|-u|--upstream-prod|--threads +[1-9][0-9]*)"
 )
 
 
@@ -78,12 +78,13 @@ class Environment(BaseModel):
         m = RE_DEFAULT_RUN_VAL.match(v)
         if m is None:
             raise ValueError(
-                f'Invalid default_run specification "{v}". Allowed arguments: -t/--tasks, -x/--exclude and -u/--upstream-prod'
+                f'Invalid default_run specification "{v}". Allowed arguments: -t/--tasks, -x/--exclude, -u/--upstream-prod and --threads'
             )
 
         include = set()
         exclude = set()
         upstream_prod = None
+        threads = None
         for arg in RE_DEFAULT_RUN.findall(v):
             arg = arg.strip()
             if arg.startswith("-t") or arg.startswith("--tasks"):
@@ -92,6 +93,8 @@ class Environment(BaseModel):
                 exclude.update(arg.split(" ")[1:])
             elif arg.startswith("-u") or arg.startswith("--upstream-prod"):
                 upstream_prod = True
+            elif arg.startswith("--threads"):
+                threads = int(arg.split(" ")[-1])
             else:
                 raise ValueError('Incorrect option in default_run "{arg}"')
 
@@ -99,6 +102,7 @@ class Environment(BaseModel):
             "include": include,
             "exclude": exclude,
             "upstream_prod": upstream_prod,
+            "threads": threads,
         }
 
 
@@ -128,12 +132,13 @@ class SettingsYaml(BaseModel):
             m = RE_DEFAULT_RUN_VAL.match(v)
             if m is None:
                 raise ValueError(
-                    f'Invalid default_run specification "{v}". Allowed arguments: -t/--tasks, -x/--exclude and -u/--upstream-prod'
+                    f'Invalid default_run specification "{v}". Allowed arguments: -t/--tasks, -x/--exclude, -u/--upstream-prod and --threads'
                 )
 
             include = set()
             exclude = set()
             upstream_prod = None
+            threads = None
             for arg in RE_DEFAULT_RUN.findall(v):
                 arg = arg.strip()
                 if arg.startswith("-t") or arg.startswith("--tasks"):
@@ -142,6 +147,8 @@ class SettingsYaml(BaseModel):
                     exclude.update(arg.split(" ")[1:])
                 elif arg.startswith("-u") or arg.startswith("--upstream-prod"):
                     upstream_prod = True
+                elif arg.startswith("--threads"):
+                    threads = int(arg.split(" ")[-1])
                 else:
                     raise ValueError('Incorrect option in default_run "{arg}"')
 
@@ -149,6 +156,7 @@ class SettingsYaml(BaseModel):
                 "include": include,
                 "exclude": exclude,
                 "upstream_prod": upstream_prod,
+                "threads": threads,
             }
 
     credentials: Mapping[str, Mapping]
@@ -228,7 +236,12 @@ class SettingsYaml(BaseModel):
             },
             "from_prod": [f for f in profile_info.from_prod or list()],
             "default_run": profile_info.default_run
-            or {"include": set(), "exclude": set(), "upstream_prod": None},
+            or {
+                "include": set(),
+                "exclude": set(),
+                "upstream_prod": None,
+                "threads": None,
+            },
         }
 
 
@@ -294,7 +307,12 @@ def get_settings(yaml, environment, profile_name=None):
             "parameters": dict(),
             "stringify": dict(),
             "from_prod": list(),
-            "default_run": {"include": set(), "exclude": set(), "upstream_prod": None},
+            "default_run": {
+                "include": set(),
+                "exclude": set(),
+                "upstream_prod": None,
+                "threads": None,
+            },
         }
 
     if profile_name is None and environment is not None:
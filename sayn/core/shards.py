@@ -0,0 +1,280 @@
+from datetime import datetime
+from pathlib import Path
+import sqlite3
+import threading
+
+
+def partition(tasks, parents, durations, n_shards):
+    """Splits a set of tasks into `n_shards` balanced by duration.
+
+    Tasks that are not connected to each other are assigned in whole groups (the weakly connected
+    components of the dag), largest first to the shard with the lowest load, so there are no
+    dependencies across shards. Groups larger than a shard are split, assigning each task in
+    topological order to the shard where most of its parents are, as long as it has capacity.
+
+    Args:
+      tasks (List[str]): the tasks to split in topological order
+      parents (Dict[str, List[str]]): the parents of each task
+      durations (Dict[str, float]): duration in seconds of each task in previous runs. Tasks
+          without a recorded duration are assumed to take the average of the known durations
+      n_shards (int): the number of shards
+
+    Returns:
+      A dictionary of task name to shard number (from 1 to n_shards)
+    """
+    task_set = set(tasks)
+    known = [durations[t] for t in tasks if t in durations]
+    default = sum(known) / len(known) if len(known) > 0 else 1
+    weights = {t: max(durations.get(t, default), 0.001) for t in tasks}
+    # Shards can go over an even split by half a task, which avoids splitting chains just to
+    # move a single task to a different shard
+    capacity = sum(weights.values()) / n_shards + max(weights.values(), default=0) / 2
+
+    # Union-find to group tasks connected by a dependency
+    groups = {t: t for t in tasks}
+
+    def find(task):
+        while groups[task] != task:
+            groups[task] = groups[groups[task]]
+            task = groups[task]
+        return task
+
+    for task in tasks:
+        for parent in parents[task]:
+            if parent in task_set:
+                groups[find(task)] = find(parent)
+
+    components = dict()
+    for task in tasks:
+        components.setdefault(find(task), list()).append(task)
+    components = sorted(components.values(), key=lambda c: -sum(weights[t] for t in c))
+
+    loads = {shard: 0 for shard in range(1, n_shards + 1)}
+    plan = dict()
+    for component in components:
+        weight = sum(weights[t] for t in component)
+        least_loaded = min(loads.keys(), key=lambda s: (loads[s], s))
+        if loads[least_loaded] + weight <= capacity or len(component) == 1:
+            for task in component:
+                plan[task] = least_loaded
+            loads[least_loaded] += weight
+            continue
+
+        for task in component:
+            affinity = {shard: 0 for shard in loads.keys()}
+            for parent in parents[task]:
+                if parent in plan:
+                    affinity[plan[parent]] += weights[parent]
+
+            available = [
+                s
+                for s in loads.keys()
+                if loads[s] == 0 or loads[s] + weights[task] <= capacity
+            ]
+            if len(available) == 0:
+                available = list(loads.keys())
+
+            shard = min(available, key=lambda s: (-affinity[s], loads[s], s))
+            plan[task] = shard
+            loads[shard] += weights[task]
+
+    return plan
+
+
+class ShardStore:
+    """Sqlite database shared by the shards of a run to agree on the assignment of tasks to
+    shards and to communicate the status of the tasks they execute.
+
+    Executions with the same key are grouped in generations: shards join the latest generation
+    of the key unless their shard number already joined it, in which case this is a new run
+    with the same key, so a new generation starts with a new plan, removing everything stored
+    for previous generations. Statuses are stored with the generation, so shards still running
+    from a previous generation don't affect the current one.
+
+    Unlike the StateStore, errors accessing this database are raised as the shards can't
+    coordinate without it.
+
+    Args:
+      path (str): the path to the sqlite database, which needs to be accessible by all shards
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS shard_generations (
+            shard_key TEXT NOT NULL,
+            generation INTEGER NOT NULL,
+            shard INTEGER NOT NULL,
+            PRIMARY KEY (shard_key, generation, shard)
+        )""",
+        """CREATE TABLE IF NOT EXISTS shard_plans (
+            shard_key TEXT NOT NULL,
+            task TEXT NOT NULL,
+            shard INTEGER NOT NULL,
+            PRIMARY KEY (shard_key, task)
+        )""",
+        """CREATE TABLE IF NOT EXISTS shard_tasks (
+            shard_key TEXT NOT NULL,
+            generation INTEGER NOT NULL,
+            task TEXT NOT NULL,
+            status TEXT NOT NULL,
+            updated_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (shard_key, generation, task)
+        )""",
+        """CREATE TABLE IF NOT EXISTS shard_files (
+            shard_key TEXT NOT NULL,
+            generation INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (shard_key, generation, path)
+        )""",
+        """CREATE TABLE IF NOT EXISTS shard_runs (
+            shard_key TEXT NOT NULL,
+            generation INTEGER NOT NULL,
+            shard INTEGER NOT NULL,
+            finished_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (shard_key, generation, shard)
+        )""",
+    )
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            if not self.path.parent.exists():
+                self.path.parent.mkdir(parents=True)
+            conn = sqlite3.connect(
+                str(self.path),
+                timeout=60,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            for stmt in self.schema:
+                conn.execute(stmt)
+            self._conn = conn
+
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_plan(self, shard_key, shard, create_plan):
+        """Joins the latest generation of the key, returning the assignment of tasks to shards
+        and the generation. A new generation with the output of `create_plan()` is started if
+        there's none or the shard already joined the latest one"""
+        with self._lock:
+            conn = self._connection()
+            # The write lock ensures only one shard creates the plan
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation = conn.execute(
+                    "SELECT MAX(generation) FROM shard_generations WHERE shard_key = ?",
+                    (shard_key,),
+                ).fetchone()[0]
+                joined = conn.execute(
+                    "SELECT 1 FROM shard_generations WHERE shard_key = ? AND generation = ? AND shard = ?",
+                    (shard_key, generation, shard),
+                ).fetchone()
+
+                if generation is None or joined is not None:
+                    generation = (generation or 0) + 1
+                    plan = create_plan()
+                    for table in (
+                        "shard_generations",
+                        "shard_plans",
+                        "shard_tasks",
+                        "shard_files",
+                        "shard_runs",
+                    ):
+                        conn.execute(
+                            f"DELETE FROM {table} WHERE shard_key = ?", (shard_key,)
+                        )
+                    conn.executemany(
+                        "INSERT INTO shard_plans (shard_key, task, shard) VALUES (?, ?, ?)",
+                        [(shard_key, task, shard) for task, shard in plan.items()],
+                    )
+                else:
+                    plan = dict(
+                        conn.execute(
+                            "SELECT task, shard FROM shard_plans WHERE shard_key = ?",
+                            (shard_key,),
+                        ).fetchall()
+                    )
+
+                conn.execute(
+                    "INSERT INTO shard_generations (shard_key, generation, shard) VALUES (?, ?, ?)",
+                    (shard_key, generation, shard),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        return plan, generation
+
+    def finish_shard(self, shard_key, generation, shard):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO shard_runs (shard_key, generation, shard, finished_at) VALUES (?, ?, ?, ?)",
+                (shard_key, generation, shard, datetime.now().isoformat()),
+            )
+
+    def get_finished_shards(self, shard_key, generation):
+        with self._lock:
+            rows = (
+                self._connection()
+                .execute(
+                    "SELECT shard FROM shard_runs WHERE shard_key = ? AND generation = ?",
+                    (shard_key, generation),
+                )
+                .fetchall()
+            )
+
+        return {row[0] for row in rows}
+
+    def set_status(self, shard_key, generation, task, status):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO shard_tasks (shard_key, generation, task, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (shard_key, generation, task, status, datetime.now().isoformat()),
+            )
+
+    def get_statuses(self, shard_key, generation, tasks):
+        """Returns the status of the tasks that finished in any of the shards"""
+        tasks = set(tasks)
+        with self._lock:
+            rows = (
+                self._connection()
+                .execute(
+                    "SELECT task, status FROM shard_tasks WHERE shard_key = ? AND generation = ?",
+                    (shard_key, generation),
+                )
+                .fetchall()
+            )
+
+        return {task: status for task, status in rows if task in tasks}
+
+    def add_files(self, shard_key, generation, paths):
+        """Stores the compiled files written by a shard"""
+        with self._lock:
+            self._connection().executemany(
+                "INSERT OR IGNORE INTO shard_files (shard_key, generation, path) VALUES (?, ?, ?)",
+                [(shard_key, generation, path) for path in paths],
+            )
+
+    def get_files(self, shard_key, generation):
+        """Returns the compiled files written by all shards"""
+        with self._lock:
+            rows = (
+                self._connection()
+                .execute(
+                    "SELECT path FROM shard_files WHERE shard_key = ? AND generation = ?",
+                    (shard_key, generation),
+                )
+                .fetchall()
+            )
+
+        return {row[0] for row in rows}
@@ -0,0 +1,347 @@
+from datetime import datetime
+import json
+from pathlib import Path
+import sqlite3
+import threading
+
+from sayn import __version__ as sayn_version
+
+
+class StateStore:
+    """Local storage for information SAYN keeps between runs (eg: task durations).
+
+    The store is a sqlite database inside the state folder (`.sayn` by default) which is only
+    created when first used. Failures accessing the store never stop the execution, as the
+    information kept in it is only used to improve subsequent runs.
+
+    Args:
+      folder (str): the folder where the state database lives
+    """
+
+    schema = (
+        """CREATE TABLE IF NOT EXISTS task_durations (
+            stage TEXT NOT NULL,
+            task TEXT NOT NULL,
+            duration REAL NOT NULL,
+            updated_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (stage, task)
+        )""",
+        """CREATE TABLE IF NOT EXISTS task_fingerprints (
+            task TEXT NOT NULL PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT NOT NULL PRIMARY KEY,
+            command TEXT NOT NULL,
+            arguments TEXT NOT NULL,
+            started_at TIMESTAMP NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS run_tasks (
+            run_id TEXT NOT NULL,
+            task TEXT NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (run_id, task)
+        )""",
+        """CREATE TABLE IF NOT EXISTS parsed_files (
+            path TEXT NOT NULL PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            content TEXT NOT NULL,
+            sayn_version TEXT NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS parsed_tasks (
+            cache_key TEXT NOT NULL PRIMARY KEY,
+            content TEXT NOT NULL,
+            sayn_version TEXT NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS task_edges (
+            task TEXT NOT NULL PRIMARY KEY,
+            cache_key TEXT NOT NULL,
+            files TEXT NOT NULL,
+            edges TEXT NOT NULL,
+            sayn_version TEXT NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS compiled_files (
+            path TEXT NOT NULL PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hash TEXT NOT NULL
+        )""",
+    )
+
+    # Number of expanded task dictionaries kept in the cache (eg: one per profile)
+    max_parsed_tasks = 5
+
+    def __init__(self, folder):
+        self.path = Path(folder, "state.db")
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            if not self.path.parent.exists():
+                self.path.parent.mkdir(parents=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            for stmt in self.schema:
+                conn.execute(stmt)
+            conn.commit()
+            self._conn = conn
+
+        return self._conn
+
+    def _execute(self, sql, params=None, fetch=False, many=False):
+        with self._lock:
+            try:
+                conn = self._connection()
+                if many:
+                    cursor = conn.executemany(sql, params)
+                else:
+                    cursor = conn.execute(sql, params or tuple())
+                if fetch:
+                    return cursor.fetchall()
+                else:
+                    conn.commit()
+            except (sqlite3.Error, OSError):
+                if fetch:
+                    return list()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Task durations
+
+    def get_durations(self, stage):
+        """Returns a dictionary with the last duration in seconds of each task for a stage"""
+        return {
+            task: duration
+            for task, duration in self._execute(
+                "SELECT task, duration FROM task_durations WHERE stage = ?",
+                (stage,),
+                fetch=True,
+            )
+        }
+
+    def set_duration(self, stage, task, duration):
+        self._execute(
+            "INSERT OR REPLACE INTO task_durations (stage, task, duration, updated_at) VALUES (?, ?, ?, ?)",
+            (stage, task, duration, datetime.now().isoformat()),
+        )
+
+    # Task fingerprints
+
+    def get_fingerprints(self):
+        """Returns a dictionary with the fingerprint of each task in its last successful run"""
+        return {
+            task: fingerprint
+            for task, fingerprint in self._execute(
+                "SELECT task, fingerprint FROM task_fingerprints", fetch=True
+            )
+        }
+
+    def set_fingerprint(self, task, fingerprint):
+        self._execute(
+            "INSERT OR REPLACE INTO task_fingerprints (task, fingerprint, updated_at) VALUES (?, ?, ?)",
+            (task, fingerprint, datetime.now().isoformat()),
+        )
+
+    # Runs
+
+    def start_run(self, run_id, command, arguments, statuses):
+        """Records the start of an execution with the arguments required to resume it.
+
+        Args:
+          run_id (str): the id of the run
+          command (str): the command executed (run, compile or test)
+          arguments (Dict[str, Any]): json serialisable dictionary of run arguments
+          statuses (Dict[str, str]): initial status of every task in the execution
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO runs (run_id, command, arguments, started_at) VALUES (?, ?, ?, ?)",
+            (str(run_id), command, json.dumps(arguments), datetime.now().isoformat()),
+        )
+        self._execute(
+            "INSERT OR REPLACE INTO run_tasks (run_id, task, status) VALUES (?, ?, ?)",
+            [(str(run_id), task, status) for task, status in statuses.items()],
+            many=True,
+        )
+
+    def set_task_status(self, run_id, task, status):
+        self._execute(
+            "INSERT OR REPLACE INTO run_tasks (run_id, task, status) VALUES (?, ?, ?)",
+            (str(run_id), task, status),
+        )
+
+    def get_run(self, run_id):
+        """Returns the command, arguments and task statuses of a run or None if not found"""
+        runs = self._execute(
+            "SELECT command, arguments FROM runs WHERE run_id = ?",
+            (str(run_id),),
+            fetch=True,
+        )
+        if len(runs) == 0:
+            return
+
+        statuses = self._execute(
+            "SELECT task, status FROM run_tasks WHERE run_id = ?",
+            (str(run_id),),
+            fetch=True,
+        )
+
+        return {
+            "command": runs[0][0],
+            "arguments": json.loads(runs[0][1]),
+            "tasks": {task: status for task, status in statuses},
+        }
+
+    # Parse cache. Entries are only valid for the version of sayn that stored them
+
+    def get_parsed_file(self, path):
+        """Returns the stat, hash and parsed content of a yaml file or None if not cached"""
+        rows = self._execute(
+            "SELECT mtime_ns, size, hash, content FROM parsed_files WHERE path = ? AND sayn_version = ?",
+            (str(path), sayn_version),
+            fetch=True,
+        )
+        if len(rows) == 0:
+            return
+
+        return {
+            "mtime_ns": rows[0][0],
+            "size": rows[0][1],
+            "hash": rows[0][2],
+            "content": json.loads(rows[0][3]),
+        }
+
+    def set_parsed_file(self, path, mtime_ns, size, hash, content):
+        """Stores the parsed content of a yaml file. Content that can't be stored as json
+        (eg: dates) is not cached"""
+        try:
+            content = json.dumps(content)
+        except (TypeError, ValueError):
+            return
+
+        self._execute(
+            "INSERT OR REPLACE INTO parsed_files (path, mtime_ns, size, hash, content, sayn_version, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(path),
+                mtime_ns,
+                size,
+                hash,
+                content,
+                sayn_version,
+                datetime.now().isoformat(),
+            ),
+        )
+
+    def get_parsed_tasks(self, cache_key):
+        """Returns the expanded task dictionaries stored for a key or None if not cached"""
+        rows = self._execute(
+            "SELECT content FROM parsed_tasks WHERE cache_key = ? AND sayn_version = ?",
+            (cache_key, sayn_version),
+            fetch=True,
+        )
+        if len(rows) == 0:
+            return
+
+        return json.loads(rows[0][0])
+
+    def set_parsed_tasks(self, cache_key, tasks):
+        try:
+            content = json.dumps(tasks)
+        except (TypeError, ValueError):
+            return
+
+        self._execute(
+            "INSERT OR REPLACE INTO parsed_tasks (cache_key, content, sayn_version, updated_at) VALUES (?, ?, ?, ?)",
+            (cache_key, content, sayn_version, datetime.now().isoformat()),
+        )
+        self._execute(
+            """DELETE FROM parsed_tasks
+                WHERE cache_key NOT IN (
+                    SELECT cache_key FROM parsed_tasks ORDER BY updated_at DESC LIMIT ?
+                )""",
+            (self.max_parsed_tasks,),
+        )
+
+    # Task edges
+
+    def get_task_edges(self):
+        """Returns the dependencies found in the config of each task, with the key and the
+        hashes of the files used to validate them"""
+        return {
+            task: {
+                "cache_key": cache_key,
+                "files": json.loads(files),
+                "edges": json.loads(edges),
+            }
+            for task, cache_key, files, edges in self._execute(
+                "SELECT task, cache_key, files, edges FROM task_edges WHERE sayn_version = ?",
+                (sayn_version,),
+                fetch=True,
+            )
+        }
+
+    def set_task_edges(self, entries):
+        """Stores the dependencies of tasks.
+
+        Args:
+          entries (Dict[str, Dict]): cache_key, files (dictionary of file name to hash) and
+              edges of each task
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO task_edges (task, cache_key, files, edges, sayn_version, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    task,
+                    entry["cache_key"],
+                    json.dumps(entry["files"]),
+                    json.dumps(entry["edges"]),
+                    sayn_version,
+                    datetime.now().isoformat(),
+                )
+                for task, entry in entries.items()
+            ],
+            many=True,
+        )
+
+    def delete_task_edges(self, tasks):
+        self._execute(
+            "DELETE FROM task_edges WHERE task = ?",
+            [(task,) for task in tasks],
+            many=True,
+        )
+
+    # Compiled files
+
+    def get_compiled_files(self):
+        """Returns the modification time, size and content hash of the files written to the
+        compile folder"""
+        return {
+            path: (mtime_ns, size, hash)
+            for path, mtime_ns, size, hash in self._execute(
+                "SELECT path, mtime_ns, size, hash FROM compiled_files", fetch=True
+            )
+        }
+
+    def set_compiled_files(self, entries):
+        """Stores the modification time, size and content hash of files in the compile folder"""
+        self._execute(
+            "INSERT OR REPLACE INTO compiled_files (path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+            [(path, *entry) for path, entry in entries.items()],
+            many=True,
+        )
+
+    def delete_compiled_files(self, paths):
+        self._execute(
+            "DELETE FROM compiled_files WHERE path = ?",
+            [(path,) for path in paths],
+            many=True,
+        )
@@ -0,0 +1,51 @@
+import os
+from pathlib import Path
+
+
+class FileWatcher:
+    """Detects changes to the files in a set of paths by comparing their modification time and
+    size between calls, so it works the same in all platforms without file system events.
+
+    Args:
+      paths (List[str]): files and folders (watched recursively) to watch. Hidden files and
+          folders are ignored. Paths that don't exist yet are watched in case they're created
+    """
+
+    def __init__(self, paths):
+        self.paths = [Path(p) for p in paths]
+        self.snapshot = self.get_snapshot()
+
+    def get_snapshot(self):
+        files = list()
+        for path in self.paths:
+            if path.is_file():
+                files.append(path)
+            elif path.is_dir():
+                for root, folders, file_names in os.walk(path):
+                    folders[:] = [f for f in folders if not f.startswith(".")]
+                    files.extend(
+                        Path(root, f) for f in file_names if not f.startswith(".")
+                    )
+
+        snapshot = dict()
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                # Deleted since listed
+                continue
+            snapshot[file.as_posix()] = (stat.st_mtime_ns, stat.st_size)
+
+        return snapshot
+
+    def changes(self):
+        """Returns the files created, modified or deleted since the previous call"""
+        snapshot = self.get_snapshot()
+        changed = {
+            file
+            for file in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(file) != self.snapshot.get(file)
+        }
+        self.snapshot = snapshot
+
+        return changed
@@ -115,6 +115,10 @@ class Database:
 
     DDL = DDL
 
+    # Maximum number of tasks using the connection at the same time when
+    # executing in parallel. None means no limit
+    default_max_concurrency = None
+
     def __init__(
         self,
         name,
@@ -127,6 +131,9 @@ class Database:
         self.name_in_settings = name_in_settings
         self.db_type = db_type
         self.max_batch_rows = common_params.get("max_batch_rows", 50000)
+        self.max_concurrency = common_params.get(
+            "max_concurrency", self.default_max_concurrency
+        )
         self._settings = settings
         self._requested_objects = dict()
 
@@ -413,7 +420,12 @@ class Database:
                         else:
                             out[db][schema][table_name] = {"type": None}
 
-        self._requested_objects = out
+        # Objects introspected previously in the execution are kept
+        for db, schemas in out.items():
+            for schema, tables in schemas.items():
+                self._requested_objects.setdefault(db, dict()).setdefault(
+                    schema, dict()
+                ).update(tables)
 
     def _py2sqa(self, from_type):
         python_types = {
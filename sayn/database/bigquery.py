@@ -180,13 +180,14 @@ class Bigquery(Database):
                     table["table_name"]: self._get_table_type(table) for table in result
                 }
 
-        self._requested_objects = {
-            get_project_key(project): {
-                get_dataset_key(dataset): dataset_details["objects"]
-                for dataset, dataset_details in project_details["datasets"].items()
-            }
-            for project, project_details in objects.items()
-        }
+        # Objects introspected previously in the execution are kept
+        for project, project_details in objects.items():
+            for dataset, dataset_details in project_details["datasets"].items():
+                self._requested_objects.setdefault(
+                    get_project_key(project), dict()
+                ).setdefault(get_dataset_key(dataset), dict()).update(
+                    dataset_details["objects"]
+                )
 
     def _get_table_type(self, type):
         out_key = list()
@@ -1,21 +1,19 @@
-from .bigquery import Bigquery
-from .mysql import Mysql
-from .postgresql import Postgresql
-from .redshift import Redshift
-from .sqlite import Sqlite
-from .snowflake import Snowflake
+from importlib import import_module
+
 from .unknown import UnknownDb
 
+# Driver modules are only imported when a credential of their type is used, as they pull the
+# dependencies of each database (pydantic models, orjson, sqlalchemy dialects)
 drivers = {
-    "postgresql": Postgresql,
-    "sqlite": Sqlite,
-    "mysql": Mysql,
-    "snowflake": Snowflake,
-    "redshift": Redshift,
-    "bigquery": Bigquery,
+    "postgresql": ("postgresql", "Postgresql"),
+    "sqlite": ("sqlite", "Sqlite"),
+    "mysql": ("mysql", "Mysql"),
+    "snowflake": ("snowflake", "Snowflake"),
+    "redshift": ("redshift", "Redshift"),
+    "bigquery": ("bigquery", "Bigquery"),
 }
 
-db_params = ("max_batch_rows", "type")
+db_params = ("max_batch_rows", "max_concurrency", "type")
 
 
 def create(name, name_in_settings, settings):
@@ -27,7 +25,18 @@ def create(name, name_in_settings, settings):
         common_params = {k: v for k, v in settings.items() if k in db_params}
         settings = {k: v for k, v in settings.items() if k not in db_params}
 
-        db_obj = drivers[db_type](
+        max_concurrency = common_params.get("max_concurrency")
+        if max_concurrency is not None and (
+            isinstance(max_concurrency, bool)
+            or not isinstance(max_concurrency, int)
+            or max_concurrency < 1
+        ):
+            raise ValueError(f'max_concurrency for "{name}" must be a positive integer')
+
+        module_name, class_name = drivers[db_type]
+        driver = getattr(import_module(f".{module_name}", __package__), class_name)
+
+        db_obj = driver(
             name,
             name_in_settings,
             db_type,
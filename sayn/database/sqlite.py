@@ -9,6 +9,9 @@ db_parameters = ["database"]
 
 
 class Sqlite(Database):
+    # SQLite only allows one writer at a time
+    default_max_concurrency = 1
+
     def feature(self, feature):
         return feature in (
             "CANNOT ALTER INDEXES",
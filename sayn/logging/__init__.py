@@ -2,3 +2,5 @@ from .event_tracker import EventTracker
 from .fancy_logger import FancyLogger
 from .console_logger import ConsoleLogger
 from .file_logger import FileLogger
+from .state_logger import StateLogger
+from .json_logger import JsonLogger
@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import datetime
 import subprocess
+import threading
 from typing import List, Optional
 
 from .task_event_tracker import TaskEventTracker
@@ -18,14 +19,25 @@ class EventTracker:
     current_task = None
     current_task_n = 0
     sayn_version = sayn_version
-    project_git_commit = None
     project_name = Path(".").absolute().name
+    # Seconds the start of the app waits for git to report the commit
+    git_timeout = 1
 
     def __init__(self, run_id):
         self.run_id = run_id
+        self.loggers = list()
         self.tasks = list()
+        # Tasks can report events from multiple threads when executing in parallel
+        self._lock = threading.RLock()
+        self._buffers = None
+        # The git commit is resolved in the background so that starting sayn doesn't wait for git
+        self._git_commit = None
+        self._git_thread = threading.Thread(target=self._get_git_commit, daemon=True)
+        self._git_thread.start()
+
+    def _get_git_commit(self):
         try:
-            self.project_git_commit = (
+            self._git_commit = (
                 subprocess.check_output(
                     ["git", "rev-parse", "HEAD"], stderr=subprocess.STDOUT
                 )
@@ -36,6 +48,16 @@ class EventTracker:
             # If git is not available, we simply don't report the commit
             pass
 
+    @property
+    def project_git_commit(self):
+        """The commit of the project, or None if git didn't return it yet"""
+        return self._git_commit
+
+    def wait_git_commit(self, timeout=None):
+        """Returns the commit of the project once git returns it, or after timeout seconds"""
+        self._git_thread.join(timeout)
+        return self._git_commit
+
     def register_logger(self, logger):
         self.loggers.append(logger)
 
@@ -73,6 +95,40 @@ class EventTracker:
 
         return TaskEventTracker(self, task_name, task_order)
 
+    def buffer_task_events(self, task_names):
+        """Holds the events of tasks executing in parallel so that they're reported following
+        the order in `task_names`. Events from the first unfinished task are reported as they
+        happen, while the rest are kept until all previous tasks are released with
+        `release_task_events`"""
+        with self._lock:
+            self._buffer_order = list(task_names)
+            self._buffers = {name: list() for name in self._buffer_order}
+            self._buffer_released = set()
+            self._buffer_next = 0
+
+    def release_task_events(self, task_name):
+        """Marks the events of a task as complete, reporting any events now in order"""
+        with self._lock:
+            if self._buffers is None:
+                return
+
+            self._buffer_released.add(task_name)
+            while self._buffer_next < len(self._buffer_order):
+                name = self._buffer_order[self._buffer_next]
+                for event in self._buffers.pop(name, list()):
+                    self._report_to_loggers(event)
+
+                if name not in self._buffer_released:
+                    break
+                self._buffer_next += 1
+
+            if self._buffer_next == len(self._buffer_order):
+                self._buffers = None
+
+    def _report_to_loggers(self, event):
+        for logger in self.loggers:
+            logger.report_event(**event)
+
     def report_event(self, **event):
         if "context" not in event:
             event["context"] = "app"
@@ -83,16 +139,32 @@ class EventTracker:
         if "event" not in event:
             event["event"] = "unknown"
 
+        # Only the events summarising the run wait for git
+        if event["event"] == "start_app":
+            project_git_commit = self.wait_git_commit(self.git_timeout)
+        elif event["event"] == "finish_app":
+            project_git_commit = self.wait_git_commit()
+        else:
+            project_git_commit = self.project_git_commit
+
         event.update(
             dict(
                 run_id=self.run_id,
                 stage=self.current_stage,
                 sayn_version=self.sayn_version,
-                project_git_commit=self.project_git_commit,
+                project_git_commit=project_git_commit,
                 project_name=self.project_name,
                 ts=datetime.now(),
             )
         )
 
-        for logger in self.loggers:
-            logger.report_event(**event)
+        with self._lock:
+            if (
+                self._buffers is not None
+                and event["context"] == "task"
+                and event.get("task") in self._buffers
+                and event["task"] != self._buffer_order[self._buffer_next]
+            ):
+                self._buffers[event["task"]].append(event)
+            else:
+                self._report_to_loggers(event)
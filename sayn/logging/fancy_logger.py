@@ -7,7 +7,6 @@ from .log_formatter import LogFormatter, human
 class FancyLogger(Logger):
     fmt = LogFormatter(use_colour=False, use_icons=False, output_ts=True)
     cfmt = LogFormatter(use_colour=True, use_icons=False, output_ts=True)
-    spinner = Halo(spinner="dots")
 
     stage = None
     task = None
@@ -21,6 +20,10 @@ class FancyLogger(Logger):
     step_text = None
     task_persist_msgs = list()
 
+    def __init__(self):
+        # Created with the logger rather than on import, as halo imports IPython when available
+        self.spinner = Halo(spinner="dots")
+
     def message(self, level, message, details):
         fmsg = self.cfmt.message(level, message, details)
         self.task_persist_msgs.append(fmsg)
@@ -126,6 +129,22 @@ class FancyLogger(Logger):
                 self.app_stage_finish(stage, details)
                 print()
 
+            elif event in ("connection_ready", "file_parsed"):
+                # Less verbosity for this logger
+                pass
+
+            elif event == "start_watch":
+                self.app_start_watch(details)
+
+            elif event == "files_changed":
+                self.app_files_changed(details)
+
+            elif event == "watch_error":
+                self.app_watch_error(details)
+
+            elif event == "compile_write_error":
+                self.app_compile_write_error(details)
+
             else:
                 self.unhandled(event, context, stage, details)
 
@@ -150,6 +169,10 @@ class FancyLogger(Logger):
             elif event == "finish_stage":
                 self.task_stage_finish(stage, details["duration"], details["result"])
 
+            elif event in ("connection_wait", "shard_wait"):
+                # Less verbosity for this logger
+                pass
+
             elif event == "start_step":
                 self.step = details["step"]
                 self.step_order = details["step_order"]
@@ -19,7 +19,8 @@ class FileLogger(Logger):
         if not log_file.parent.exists():
             log_file.parent.mkdir(parents=True)
 
-        handler = logging.FileHandler(log_file)
+        self.handler = logging.FileHandler(log_file)
+        handler = self.handler
         handler.setLevel(logging.DEBUG)
         handler.setFormatter(formatter)
 
@@ -29,6 +30,11 @@ class FileLogger(Logger):
 
         self.logger = logger
 
+    def close(self):
+        """Stops writing to the log file, for processes running more than one execution"""
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
     def print(self, s=None):
         if s is not None:
             if s["level"] == "info":
@@ -0,0 +1,44 @@
+import json
+
+from .logger import Logger
+from .log_formatter import LogFormatter
+
+
+class JsonLogger(Logger):
+    """Writes each log line as a json object in its own line, used to stream the events of an
+    execution to the clients of `sayn serve`
+
+    Args:
+      write (Callable[[str], None]): function receiving each line
+      debug (bool): include debug messages
+    """
+
+    fmt = LogFormatter(use_colour=False, output_ts=True)
+
+    def __init__(self, write, debug=False):
+        self.write = write
+        self.is_debug = debug
+
+    def print(self, s=None):
+        if s is None:
+            return
+
+        if s["level"] == "debug" and not self.is_debug:
+            return
+
+        message = s["message"]
+        if isinstance(message, str):
+            message = [message]
+        elif not isinstance(message, list):
+            raise ValueError("error in logging print")
+
+        self.write(
+            json.dumps(
+                {
+                    "level": s["level"],
+                    "message": "\n".join(message),
+                    "indent": self.current_indent,
+                }
+            )
+            + "\n"
+        )
@@ -202,9 +202,15 @@ class LogFormatter:
 
         elif error.kind == "dag" and error.code == "cycle_error":
             level = "error"
-            message = self.bad(
-                f"A cycle was detected in the dag: {' > '.join(error.details['path'])}"
-            )
+            cycles = error.details.get("cycles") or [error.details["path"]]
+            if len(cycles) == 1:
+                message = self.bad(
+                    f"A cycle was detected in the dag: {' > '.join(cycles[0])}"
+                )
+            else:
+                message = [f"{len(cycles)} cycles were detected in the dag"] + [
+                    self.red(" > ".join(cycle)) for cycle in cycles
+                ]
 
         elif error.kind == "dag" and error.code == "missing_parents":
             level = "error"
@@ -255,6 +261,10 @@ class LogFormatter:
                 f'Task not found in the project: "{error.details["task"]}"'
             )
 
+        elif error.kind == "task_query" and error.code == "missing_file":
+            level = "error"
+            message = self.bad(f'Task query file not found: "{error.details["path"]}"')
+
         elif error.code == "wrong_credentials":
             level = "error"
             message = self.bad(
@@ -416,6 +426,10 @@ class LogFormatter:
             out.append(f"Git commit: {details['project_git_commit']}")
         out.append(f"Period: {dt_range}")
         out.append(f"{'Profile: ' + (details.get('profile') or 'Default')}")
+        if details.get("resume") is not None:
+            out.append(f"Resuming run: {details['resume']}")
+        if details.get("shard") is not None:
+            out.append(f"Shard: {details['shard'][0]}/{details['shard'][1]}")
 
         return {"level": "info", "message": out}
 
@@ -448,6 +462,38 @@ class LogFormatter:
         else:
             return self.unhandled("start_stage", "app", stage, details)
 
+    def app_connection_ready(self, details):
+        activation = human(details["activation"])
+        message = f"Connection {details['connection']} ready ({activation})"
+        if details["introspection"] is not None:
+            message += f", introspection ({human(details['introspection'])})"
+
+        return {"level": "debug", "message": self.dim(message)}
+
+    def app_file_parsed(self, details):
+        message = f"Parsed {details['file']} ({human(details['duration'])})"
+        return {"level": "debug", "message": self.dim(message)}
+
+    def app_start_watch(self, details):
+        return {
+            "level": "info",
+            "message": self.bright("Watching for changes (press Ctrl+C to stop)..."),
+        }
+
+    def app_files_changed(self, details):
+        return {
+            "level": "info",
+            "message": f"Changes detected in: {self.blist(details['files'])}",
+        }
+
+    def app_watch_error(self, details):
+        return self.error_result(details["duration"], details["error"].error)
+
+    def app_compile_write_error(self, details):
+        message = [self.warn("Errors writing to the compile folder:")]
+        message.extend(self.warn(f"  {path}: {exc}") for path, exc in details["errors"])
+        return {"level": "warning", "message": message}
+
     def app_stage_finish(self, stage, details):
         tasks = group_list([(v.value, t) for t, v in details["tasks"].items()])
         failed = tasks.get("setup_failed", list()) + tasks.get("failed", list())
@@ -545,10 +591,27 @@ class LogFormatter:
         else:
             return self.unhandled("start_stage", "task", stage, details)
 
+    def task_connection_wait(self, task, connections, duration):
+        return {
+            "level": "info",
+            "message": f"{self.bright(task)} waited {human(duration)} for connection {self.blist(connections)}",
+        }
+
+    def task_shard_wait(self, task, tasks, duration):
+        return {
+            "level": "info",
+            "message": f"{self.bright(task)} waited {human(duration)} for tasks in other shards: {self.blist(tasks)}",
+        }
+
     def task_stage_finish(self, stage, task, task_order, total_tasks, details):
         duration = human(details["duration"])
 
-        if details.get("result") is None or details["result"].is_ok:
+        if details.get("unchanged"):
+            return {
+                "level": "info",
+                "message": self.good(f"Unchanged, skipped ({duration})"),
+            }
+        elif details.get("result") is None or details["result"].is_ok:
             if stage == "test":
                 success_message = details.get("result").value
                 return {
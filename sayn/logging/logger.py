@@ -24,6 +24,26 @@ class Logger:
         self.print(self.fmt.app_stage_start(stage, details))
         self.current_indent += 1
 
+    def app_connection_ready(self, details):
+        self.print(self.fmt.app_connection_ready(details))
+
+    def app_file_parsed(self, details):
+        self.print(self.fmt.app_file_parsed(details))
+
+    def app_start_watch(self, details):
+        self.print(self.fmt.app_start_watch(details))
+
+    def app_files_changed(self, details):
+        self.print(self.fmt.app_files_changed(details))
+        self.print()
+
+    def app_watch_error(self, details):
+        self.print(self.fmt.app_watch_error(details))
+        self.print()
+
+    def app_compile_write_error(self, details):
+        self.print(self.fmt.app_compile_write_error(details))
+
     def app_stage_finish(self, stage, details):
         self.current_indent -= 1
         self.print(self.fmt.app_stage_finish(stage, details))
@@ -48,6 +68,12 @@ class Logger:
     def task_set_steps(self, details):
         self.print(self.fmt.task_set_steps(details))
 
+    def task_connection_wait(self, task, connections, duration):
+        self.print(self.fmt.task_connection_wait(task, connections, duration))
+
+    def task_shard_wait(self, task, tasks, duration):
+        self.print(self.fmt.task_shard_wait(task, tasks, duration))
+
     def task_step_start(self, stage, task, step, step_order, total_steps, details):
         self.print(
             self.fmt.task_step_start(
@@ -81,6 +107,24 @@ class Logger:
             elif event == "finish_stage":
                 self.app_stage_finish(stage, details)
 
+            elif event == "connection_ready":
+                self.app_connection_ready(details)
+
+            elif event == "file_parsed":
+                self.app_file_parsed(details)
+
+            elif event == "start_watch":
+                self.app_start_watch(details)
+
+            elif event == "files_changed":
+                self.app_files_changed(details)
+
+            elif event == "watch_error":
+                self.app_watch_error(details)
+
+            elif event == "compile_write_error":
+                self.app_compile_write_error(details)
+
             else:
                 self.unhandled(event, context, stage, details)
 
@@ -98,6 +142,14 @@ class Logger:
             elif event == "finish_stage":
                 self.task_stage_finish(stage, task, task_order, total_tasks, details)
 
+            elif event == "connection_wait":
+                self.task_connection_wait(
+                    task, details["connections"], details["duration"]
+                )
+
+            elif event == "shard_wait":
+                self.task_shard_wait(task, details["tasks"], details["duration"])
+
             elif event == "start_step":
                 self.task_step_start(
                     stage,
@@ -0,0 +1,28 @@
+from .logger import Logger
+
+
+class StateLogger(Logger):
+    """Records the duration of successful task executions in the state store, used to
+    prioritise the longest chains of tasks in subsequent parallel runs. Tasks skipped as
+    unchanged keep the duration of their last execution"""
+
+    stages = ("run", "compile", "test")
+
+    def __init__(self, state):
+        self.state = state
+
+    def report_event(self, context, event, stage, **details):
+        if (
+            context == "task"
+            and event == "finish_stage"
+            and stage in self.stages
+            and details.get("result") is not None
+            and details["result"].is_ok
+            and not details.get("unchanged")
+        ):
+            self.state.set_duration(
+                stage, details["task"], details["duration"].total_seconds()
+            )
+
+    def print(self, s=None):
+        pass
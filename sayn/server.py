@@ -0,0 +1,288 @@
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+import threading
+
+from . import __version__
+from .cli import CliApp
+from .core.app import Command
+from .core.errors import Ok
+from .logging import ConsoleLogger, FileLogger, JsonLogger, StateLogger
+
+
+class WarmState:
+    """Objects kept across the executions of a server: the database connections (with their
+    engines and the introspection done so far) and the credentials used to create them
+    """
+
+    def __init__(self):
+        self.credentials_key = None
+        self.connections = dict()
+        self.active_connections = set()
+        self.introspected = set()
+
+
+class ServeApp(CliApp):
+    """An execution of a request to `sayn serve`. It reuses the connections and introspection
+    from previous requests and streams its events with `write`"""
+
+    def __init__(self, command, warm, write, **kwargs):
+        self.warm = warm
+        self.write = write
+        self.file_logger = None
+        super().__init__(command, **kwargs)
+
+    def register_loggers(self, debug):
+        self.run_arguments.debug = debug
+        self.tracker.remove_logger(ConsoleLogger)
+        self.tracker.register_logger(JsonLogger(self.write, debug))
+
+        self.file_logger = FileLogger(
+            self.run_arguments.folders.logs,
+            format=f"{self.run_id}|" + "%(asctime)s|%(levelname)s|%(message)s",
+        )
+        self.tracker.register_logger(self.file_logger)
+        self.tracker.register_logger(StateLogger(self.state))
+
+    def start_app(self):
+        self.active_connections = self.warm.active_connections
+        self.introspected = self.warm.introspected
+        super().start_app()
+
+    def create_connections(self, credentials):
+        credentials_key = json.dumps(credentials, sort_keys=True, default=str)
+        if credentials_key == self.warm.credentials_key:
+            return Ok(self.warm.connections)
+
+        result = super().create_connections(credentials)
+        if result.is_err:
+            return result
+
+        # Settings changed since the previous request, so connections are recreated
+        for connection in self.warm.connections.values():
+            if getattr(connection, "engine", None) is not None:
+                connection.engine.dispose()
+
+        self.warm.credentials_key = credentials_key
+        self.warm.connections = result.value
+        self.warm.active_connections.clear()
+        self.warm.introspected.clear()
+
+        return result
+
+    def finish_app(self, error=None):
+        if error is not None:
+            # Introspection might not have completed
+            self.warm.introspected.clear()
+        elif self.run_arguments.command == Command.RUN:
+            # Objects produced by the execution are introspected again in the next request
+            for task_name in self.tasks_in_query:
+                for output in self.tasks[task_name].outputs:
+                    self.warm.introspected.discard(
+                        self.db_object_compiler.out_obj(output)
+                    )
+
+        try:
+            super().finish_app(error)
+        finally:
+            self.file_logger.close()
+            self.state.close()
+
+
+# Arguments accepted in the body of the requests to each endpoint
+common_arguments = (
+    "tasks",
+    "exclude",
+    "upstream_prod",
+    "full_load",
+    "start_dt",
+    "end_dt",
+    "fail_fast",
+    "threads",
+    "state",
+    "debug",
+)
+commands = {
+    "/run": (Command.RUN, common_arguments + ("with_tests", "skip_unchanged")),
+    "/compile": (Command.COMPILE, common_arguments + ("with_tests",)),
+    "/test": (Command.TEST, common_arguments),
+}
+
+
+def parse_arguments(body, allowed):
+    """Returns the arguments for ServeApp from the json body of a request, raising a ValueError
+    if the body is not valid"""
+    if len(body.strip()) == 0:
+        body = "{}"
+
+    try:
+        body = json.loads(body)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid json: {exc}")
+
+    if not isinstance(body, dict):
+        raise ValueError("The body needs to be a json object")
+
+    unknown = sorted(set(body.keys()) - set(allowed))
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown arguments: {', '.join(unknown)}")
+
+    arguments = dict()
+    for name, value in body.items():
+        if name in ("tasks", "exclude"):
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list) or not all(
+                isinstance(v, str) for v in value
+            ):
+                raise ValueError(f"{name} needs to be a string or a list of strings")
+            # Same as in the cli, each item can contain multiple space separated queries
+            value = [i for v in value for i in v.strip().split(" ") if len(i) > 0]
+            arguments["include" if name == "tasks" else name] = value
+
+        elif name in ("start_dt", "end_dt"):
+            try:
+                arguments[name] = datetime.strptime(value, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} needs to be a date in the format YYYY-MM-DD")
+
+        elif name == "threads":
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError("threads needs to be an integer greater than 0")
+            arguments[name] = value
+
+        elif name == "state":
+            if not isinstance(value, str):
+                raise ValueError("state needs to be a string")
+            arguments[name] = value
+
+        else:
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} needs to be a boolean")
+            arguments[name] = value
+
+    return arguments
+
+
+class SaynServer:
+    """Executes the requests received by `sayn serve`, one at a time, sharing a WarmState"""
+
+    def __init__(self, profile=None):
+        self.profile = profile
+        self.warm = WarmState()
+        self.lock = threading.Lock()
+
+    def execute(self, command, arguments, write):
+        """Executes a command, streaming its events to `write`, and returns the exit code"""
+        with self.lock:
+            try:
+                app = ServeApp(
+                    command, self.warm, write, profile=self.profile, **arguments
+                )
+                if command == Command.RUN:
+                    app.run()
+                elif command == Command.COMPILE:
+                    app.compile()
+                else:
+                    app.test()
+            except SystemExit as exc:
+                return exc.code or 0
+            except Exception as exc:
+                # Connections could be in a bad state after an unexpected error
+                self.warm.credentials_key = None
+                write(
+                    json.dumps({"level": "error", "message": f"{exc}", "indent": 0})
+                    + "\n"
+                )
+                return 1
+
+            return 0
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = f"sayn/{__version__}"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, code, content):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in commands:
+            self.send_json(404, {"error": f"Unknown command {self.path}"})
+            return
+
+        command, allowed = commands[self.path.rstrip("/")]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        try:
+            arguments = parse_arguments(body, allowed)
+        except ValueError as exc:
+            self.send_json(400, {"error": f"{exc}"})
+            return
+
+        # Events are streamed as they happen, so the response ends when the connection closes
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        connected = True
+
+        def write(line):
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                self.wfile.write(line.encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                # The client went away, but the execution carries on
+                connected = False
+
+        exit_code = self.server.sayn.execute(command, arguments, write)
+        write(json.dumps({"exit_code": exit_code}) + "\n")
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("local", 0)
+
+
+def serve(profile=None, host="127.0.0.1", port=8765, socket_path=None):
+    """Starts a server executing the commands received, until interrupted"""
+    if socket_path is not None:
+        socket_path = Path(socket_path)
+        if socket_path.is_socket():
+            # Left behind by a server that didn't finish cleanly
+            socket_path.unlink()
+        server = UnixHTTPServer(str(socket_path), RequestHandler)
+        address = f"unix socket {socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+        address = f"http://{host}:{server.server_address[1]}"
+
+    server.sayn = SaynServer(profile)
+    print(f"SAYN server listening on {address} (press Ctrl+C to stop)", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and socket_path.is_socket():
+            socket_path.unlink()
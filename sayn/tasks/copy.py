@@ -289,6 +289,10 @@ class CopyTask(SqlTask):
 
         return Ok()
 
+    def get_fingerprint(self):
+        """Copied data depends on the source database, so copy tasks are always executed"""
+        return
+
     def setup(self):
         if self.needs_recompile:
             if (self.task_config.source.db_name is None) and (
@@ -0,0 +1,256 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import inspect
+import multiprocessing
+import pickle
+import queue
+
+from ..core.errors import Err
+from ..core.settings import get_connections
+from ..database import Database
+from ..logging.task_event_tracker import TaskEventTracker
+from ..utils.compiler import Compiler, TemplateCache
+from ..utils.python_loader import PythonLoader
+from .python import DecoratorTask, DecoratorTaskWrapper
+
+# Properties of the task runner that are recreated in the worker process
+_excluded_runner_properties = (
+    "_tracker",
+    "connections",
+    "compiler",
+    "src",
+    "out",
+    "_func",
+    "_compile_writer",
+)
+
+
+class ProcessExecutor:
+    """Executes the run method of python tasks in a pool of worker processes.
+
+    Workers are started with the `spawn` method so that they don't inherit threads, locks or
+    database connections from the main process. Each worker registers the python folder of the
+    project and creates the connections it needs from the credentials on first use. Messages and
+    steps reported by the task in the worker are forwarded to the task tracker in the main
+    process while the task executes.
+
+    Args:
+      max_workers (int): maximum number of worker processes
+      python_folder (str): the folder containing the python tasks of the project
+      credentials (Dict[str, Dict]): the credentials as defined in the settings
+    """
+
+    def __init__(self, max_workers, python_folder, credentials):
+        self.max_workers = max_workers
+        self.python_folder = python_folder
+        self.credentials = credentials
+        self.pool = None
+        self.manager = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            context = multiprocessing.get_context("spawn")
+            self.manager = context.Manager()
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.python_folder, self.credentials),
+            )
+
+        return self.pool
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.manager.shutdown()
+            self.pool = None
+            self.manager = None
+
+    def run(self, task):
+        """Executes the run method of the runner of a TaskWrapper in a worker process"""
+        try:
+            payload = pickle.dumps(get_payload(task))
+        except Exception as exc:
+            return Err(
+                "task",
+                "process_executor",
+                error_message=f"Task can't be sent to a worker process: {exc}",
+            )
+
+        pool = self._get_pool()
+        events = self.manager.Queue()
+        future = pool.submit(_run_task, payload, events)
+
+        # Events are put in the queue before the worker returns, so once the future is done
+        # all we need is to empty the queue
+        while True:
+            try:
+                event = events.get(timeout=0.1)
+            except queue.Empty:
+                if future.done() and events.empty():
+                    break
+                continue
+
+            task.tracker._logger.report_event(**event)
+
+        return future.result()
+
+
+def get_payload(task):
+    """Returns the information required to recreate the runner of a TaskWrapper in a worker"""
+    runner = task.runner
+    if isinstance(task.task_class, DecoratorTaskWrapper):
+        # Decorator tasks are module attributes with the same name as the function
+        module = task.task_class.func.__module__
+        name = task.task_class.func.__name__
+    else:
+        module = runner.__class__.__module__
+        name = runner.__class__.__qualname__
+
+    return {
+        "name": task.name,
+        "task_order": task.tracker._task_order,
+        "module": module,
+        "class": name,
+        "state": {
+            k: v
+            for k, v in runner.__dict__.items()
+            if k not in _excluded_runner_properties
+        },
+        "globals": _picklable(runner.compiler.env.globals),
+        "prod_globals": _picklable(runner.compiler.prod_env.globals),
+        "sources": {s.raw: task.db_object_compiler.src_value(s) for s in task.sources},
+        "outputs": {o.raw: task.db_object_compiler.out_value(o) for o in task.outputs},
+    }
+
+
+def _picklable(values):
+    out = dict()
+    for k, v in values.items():
+        try:
+            pickle.dumps(v)
+            out[k] = v
+        except Exception:
+            pass
+
+    return out
+
+
+# Worker process
+
+
+_worker = {"credentials": dict(), "connections": dict()}
+
+
+def _init_worker(python_folder, credentials):
+    if python_folder is not None:
+        PythonLoader().register_module("python_tasks", python_folder)
+
+    _worker["credentials"] = credentials
+
+
+class QueueLogger:
+    """Replaces the EventTracker in worker processes, sending events to the main process"""
+
+    def __init__(self, events):
+        self.events = events
+
+    def report_event(self, **event):
+        try:
+            self.events.put(event)
+        except Exception:
+            # Values that can't be sent across processes are replaced by their string
+            self.events.put({k: _to_picklable(v) for k, v in event.items()})
+
+
+def _to_picklable(value):
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return str(value)
+
+
+class WorkerConnections(dict):
+    """Connections dictionary for tasks in a worker process, with the connections created when
+    accessed for the first time and reused by all tasks executed in the worker"""
+
+    def __init__(self):
+        super().__init__({name: None for name in _worker["credentials"].keys()})
+
+    def __getitem__(self, name):
+        if name not in _worker["connections"]:
+            config = _worker["credentials"].get(name)
+            if config is None:
+                _worker["connections"][name] = None
+            else:
+                result = get_connections({name: config})
+                if result.is_err:
+                    raise result.error.details["exception"]
+                db = result.value[name]
+                if isinstance(db, Database):
+                    db._activate_connection()
+                _worker["connections"][name] = db
+
+        return _worker["connections"][name]
+
+
+class ObjectResolver:
+    """Replaces `src` and `out` in worker processes, where only the objects declared by the
+    task during configuration are available"""
+
+    def __init__(self, values, kind):
+        self.values = values
+        self.kind = kind
+
+    def __call__(self, obj, connection=None, level=None):
+        if obj not in self.values:
+            raise ValueError(
+                f'"{obj}" is not declared as {self.kind} of the task. Only declared objects '
+                "are available to tasks running with `executor: process`"
+            )
+        return self.values[obj]
+
+
+def _run_task(payload, events):
+    payload = pickle.loads(payload)
+
+    module = importlib.import_module(payload["module"])
+    task_class = getattr(module, payload["class"])
+
+    src = ObjectResolver(payload["sources"], "a source")
+    out = ObjectResolver(payload["outputs"], "an output")
+
+    compiler = Compiler.__new__(Compiler)
+    compiler.template_cache = TemplateCache()
+    compiler.env = compiler._create_environment()
+    compiler.env.globals.update(payload["globals"])
+    compiler.prod_env = compiler._create_environment()
+    compiler.prod_env.globals.update(payload["prod_globals"])
+    compiler.update_globals(src=src, out=out)
+
+    if isinstance(task_class, DecoratorTaskWrapper):
+        func = task_class.func
+        task_class = DecoratorTask
+    else:
+        func = None
+
+    runner = task_class.__new__(task_class)
+    runner.__dict__.update(payload["state"])
+    runner._tracker = TaskEventTracker(
+        QueueLogger(events), payload["name"], payload["task_order"]
+    )
+    runner.connections = WorkerConnections()
+    runner.compiler = compiler
+    runner.src = src
+    runner.out = out
+    if func is not None:
+        runner._func = func
+
+    result = runner.run()
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+
+    return result
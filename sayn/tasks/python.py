@@ -28,6 +28,9 @@ class PythonTask(Task):
     def test(self):
         return self.success()
 
+    def is_coroutine(self):
+        return inspect.iscoroutinefunction(self.run)
+
 
 class DecoratorTask(PythonTask):
     def __init__(
@@ -88,6 +91,9 @@ class DecoratorTask(PythonTask):
     def compile(self):
         pass
 
+    def is_coroutine(self):
+        return inspect.iscoroutinefunction(self._func)
+
     def run(self):
         # Get the names of the arguments to the function
         sig = inspect.signature(self._func)
@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import Any, List, Mapping, Optional, Union
 from enum import Enum
+import hashlib
+import json
 import re
 
 from pydantic import BaseModel, FilePath, validator, Extra
@@ -441,6 +443,30 @@ class SqlTask(Task):
 
         return Ok()
 
+    def get_fingerprint(self):
+        """Hash of the compiled query and table definition. Scripts and queries without a
+        materialisation don't produce an object we can check so they're always executed"""
+        materialisation = getattr(self, "materialisation", None)
+        if materialisation not in ("table", "view", "incremental"):
+            return
+
+        content = {
+            "materialisation": self.materialisation,
+            "destination": [getattr(self, "database", None), self.schema, self.table],
+            "delete_key": self.delete_key,
+            "ddl": self.ddl,
+            "sql": self.sql_query,
+        }
+
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def output_exists(self):
+        return self.target_db._object_exists(
+            self.table, self.schema, getattr(self, "database", None)
+        )
+
     def compile(self):
         if self.run_arguments["with_tests"] and self._has_tests:
             self.write_compilation_output(self.test_query, "test")
@@ -59,6 +59,8 @@ class Task:
 
     _has_tests = False
     _needs_recompile = False
+    # Set by the app to write compiled files in the background
+    _compile_writer = None
 
     # Handy properties
     @property
@@ -330,6 +332,10 @@ class Task:
             Path(f"{self.name}{'_'+suffix if suffix is not None else ''}.{extension}"),
         )
 
+        if self._compile_writer is not None:
+            self._compile_writer.write(path, content)
+            return
+
         # Ensure the path exists and it's empty
         path.parent.mkdir(parents=True, exist_ok=True)
         if path.exists():
@@ -1,6 +1,10 @@
+import asyncio
 from copy import deepcopy
+import hashlib
+import inspect
 from typing import Any, Dict, Optional, Set
 
+from ..database.objects import DbObject
 from ..database.unknown import UnknownDb
 
 from ..core.errors import Err, Exc, Ok, Result
@@ -23,8 +27,12 @@ _excluded_properties = (
     "preset",
     "on_fail",
     "module",
+    "executor",
 )
 
+# Values accepted by the executor property
+_executors = ("thread", "process")
+
 
 class TaskWrapper:
     """Task wrapper managing the execution of tasks.
@@ -43,6 +51,8 @@ class TaskWrapper:
       in_query (bool): whether the task is selected for execution based on the task query
       runner (Task): the object that will do the actual work
       status (TaskStatus): the current status of the task
+      executor (str): where the task runs: `thread` (default) or `process` (python tasks only)
+      fingerprint (str): hash of the task content and the fingerprints of its parents
     """
 
     name: str
@@ -57,6 +67,9 @@ class TaskWrapper:
     in_query: bool = False
     runner: Optional[Task]
     status: TaskStatus = TaskStatus.UNKNOWN
+    executor: str = "thread"
+    fingerprint: Optional[str] = None
+    unchanged: bool = False
 
     def __init__(
         self,
@@ -75,6 +88,7 @@ class TaskWrapper:
         run_arguments,
         compiler,
         db_object_compiler,
+        compile_writer=None,
     ):
         self.tags = set(tags or set())
         self.parent_names = set(parent_names or set())
@@ -97,6 +111,7 @@ class TaskWrapper:
         self.default_db = default_db
         self.connections = dict(connections)
         self.db_object_compiler = db_object_compiler
+        self.compile_writer = compile_writer
 
         self.task_class = task_class
 
@@ -142,6 +157,25 @@ class TaskWrapper:
             self.status = TaskStatus.FAILED
             return Exc(exc, where="set_task_parameters")
 
+        self.executor = task_config.get("executor") or "thread"
+        if self.executor not in _executors:
+            self.status = TaskStatus.FAILED
+            return Err(
+                "task",
+                "wrong_executor",
+                error_message=f'Invalid executor "{self.executor}". Accepted values: {", ".join(_executors)}',
+            )
+        elif self.executor == "process" and self.task_type not in (
+            "python",
+            "python_module",
+        ):
+            self.status = TaskStatus.FAILED
+            return Err(
+                "task",
+                "wrong_executor",
+                error_message='"executor: process" is only supported in python tasks',
+            )
+
         # for decorator tasks
         if hasattr(self.task_class, "func_arguments"):
             for arg in self.task_class.func_arguments:
@@ -185,6 +219,7 @@ class TaskWrapper:
             return Exc(exc, where="compile_task_properties")
 
         self.runner = runner
+        self.runner._compile_writer = self.compile_writer
 
         try:
             result = self.runner.config(**runner_config)
@@ -364,11 +399,82 @@ class TaskWrapper:
     def test(self):
         return self.execute_task("test")
 
-    def execute_task(self, command):
+    def set_fingerprint(self, fingerprints):
+        """Calculates the fingerprint of the task from the runner content and the fingerprint of
+        its parents: the one calculated in this execution for parents in the query or the one
+        stored in `fingerprints` for the rest. Tasks whose runner doesn't provide a fingerprint
+        are considered to change in every execution.
+
+        Args:
+          fingerprints (Dict[str, str]): fingerprints from the last successful run of each task
+        """
+        self.fingerprint = None
+        if self.runner is None or not hasattr(self.runner, "get_fingerprint"):
+            return
+
+        try:
+            content = self.runner.get_fingerprint()
+        except Exception:
+            # Without a fingerprint the task is executed
+            return
+
+        if content is None:
+            return
+
+        components = [content]
+        for parent in sorted(self.parents, key=lambda p: p.name):
+            if parent.in_query:
+                value = parent.fingerprint
+            else:
+                value = fingerprints.get(parent.name, "")
+
+            if value is None:
+                return
+            components.append(f"{parent.name}:{value}")
+
+        self.fingerprint = hashlib.sha256(
+            "\n".join(components).encode("utf-8")
+        ).hexdigest()
+
+    def is_unchanged(self, fingerprints):
+        """Checks whether the task would produce the same output as in its last successful run"""
+        if self.fingerprint is None or self.run_arguments["full_load"]:
+            return False
+
+        if self.fingerprint != fingerprints.get(self.name):
+            return False
+
+        try:
+            return self.runner.output_exists()
+        except Exception:
+            return False
+
+    @property
+    def is_coroutine(self):
+        """Whether the run method of the task is a coroutine to be awaited in the event loop"""
+        return (
+            self.runner is not None
+            and self.executor != "process"
+            and hasattr(self.runner, "is_coroutine")
+            and self.runner.is_coroutine()
+        )
+
+    def check_execution(self, command, fingerprints=None):
+        """Returns the result of the task if it shouldn't be executed or None otherwise"""
         result = self.check_skip()
         if result.is_err or result.value == TaskStatus.SKIPPED:
             return result
 
+        if (
+            fingerprints is not None
+            and command == "run"
+            and self.is_unchanged(fingerprints)
+        ):
+            self.status = TaskStatus.SUCCEEDED
+            self.unchanged = True
+            self.tracker.info("Unchanged since the last successful run. Skipping")
+            return Ok()
+
         if self.runner is None:
             return Ok()
 
@@ -378,35 +484,78 @@ class TaskWrapper:
             return Err("execution", "task_not_in_query")
         elif self.status not in (TaskStatus.SETTING_UP, TaskStatus.READY):
             return Err("execution", "setup_error", status=self.status)
+
+    def set_execution_result(self, result):
+        if result is None:
+            result = Ok()
+            self.status = TaskStatus.SUCCEEDED
+        elif result.is_ok:
+            self.status = TaskStatus.SUCCEEDED
         else:
-            try:
-                if command == "run":
-                    result = self.runner.run()
+            self.status = TaskStatus.FAILED
+
+        return result
 
-                    if not (isinstance(result, Result) and result.is_err) and (
-                        self.run_arguments["with_tests"] and self.has_tests()
-                    ):
-                        result = self.runner.test()
+    def run_tests_after_run(self, result):
+        return not (isinstance(result, Result) and result.is_err) and (
+            self.run_arguments["with_tests"] and self.has_tests()
+        )
+
+    def execute_task(self, command, process_executor=None, fingerprints=None):
+        result = self.check_execution(command, fingerprints)
+        if result is not None:
+            return result
 
-                elif command == "compile":
-                    result = self.runner.compile()
+        try:
+            if command == "run":
+                if self.executor == "process" and process_executor is not None:
+                    result = process_executor.run(self)
                 else:
+                    result = self.runner.run()
+                    if inspect.isawaitable(result):
+                        result = asyncio.run(result)
+
+                if self.run_tests_after_run(result):
                     result = self.runner.test()
 
-                if result is None:
-                    result = Ok()
-                    self.status = TaskStatus.SUCCEEDED
-                elif result.is_ok:
-                    self.status = TaskStatus.SUCCEEDED
-                else:
-                    self.status = TaskStatus.FAILED
-            except Exception as e:
-                self.status = TaskStatus.FAILED
-                result = Exc(e)
+            elif command == "compile":
+                result = self.runner.compile()
+            else:
+                result = self.runner.test()
 
+            return self.set_execution_result(result)
+        except Exception as e:
+            self.status = TaskStatus.FAILED
+            return Exc(e)
+
+    async def execute_task_async(self, command, fingerprints=None):
+        """Equivalent to execute_task for tasks with a coroutine run method. Only the run method
+        is awaited, as the rest of the task methods are regular functions"""
+        result = self.check_execution(command, fingerprints)
+        if result is not None:
             return result
 
-    def set_parents(self, all_tasks, output_to_task):
+        try:
+            if command == "run":
+                result = self.runner.run()
+                if inspect.isawaitable(result):
+                    result = await result
+
+                if self.run_tests_after_run(result):
+                    result = self.runner.test()
+
+            elif command == "compile":
+                result = self.runner.compile()
+            else:
+                result = self.runner.test()
+
+            return self.set_execution_result(result)
+        except Exception as e:
+            self.status = TaskStatus.FAILED
+            return Exc(e)
+
+    def set_parents(self, all_tasks, output_to_task, report_missing=True):
+        self.parents = list()
         for parent_name in self.parent_names:
             if parent_name not in all_tasks:
                 return Err("dag", "missing_parents", missing={self.name: [parent_name]})
@@ -427,7 +576,7 @@ class TaskWrapper:
                         self.parent_names.add(task_name)
 
         # TODO send some message when a table is source
-        if len(missing) > 0:
+        if len(missing) > 0 and report_missing:
             tables = ", ".join([f"{t.raw}" for t in missing])
             self.tracker.warning(
                 f'No task creates table(s) "{tables}" referenced by task "{self.name}"'
@@ -435,6 +584,45 @@ class TaskWrapper:
 
         return Ok()
 
+    def get_edges(self):
+        """Returns the dependencies and properties of the task resulting from its config as a
+        json serialisable dictionary, so that the task can be added to the dag in a later
+        execution without running its config (see set_edges)"""
+
+        def db_objects(objects):
+            return [
+                [o.connection_name, o.database, o.schema, o.table]
+                for o in sorted(objects, key=lambda o: o.key)
+            ]
+
+        return {
+            "parents": sorted(self.parent_names),
+            "sources": db_objects(self.sources),
+            "outputs": db_objects(self.outputs),
+            "tags": sorted(self.tags),
+            "on_fail": self.on_fail,
+            "used_connections": sorted(self.used_connections),
+        }
+
+    def set_edges(self, edges):
+        """Sets the dependencies of the task from the output of get_edges. The task can be
+        part of the dag, but it needs to run its config before setup"""
+        self.parent_names.update(edges["parents"])
+        self.sources.update(
+            DbObject(self.db_object_compiler, *o) for o in edges["sources"]
+        )
+        self.outputs.update(
+            DbObject(self.db_object_compiler, *o) for o in edges["outputs"]
+        )
+        self.tags.update(edges["tags"])
+        self.on_fail = edges["on_fail"]
+        self.used_connections.update(edges["used_connections"])
+        self.status = TaskStatus.READY_FOR_SETUP
+
+    @property
+    def is_configured(self):
+        return self.runner is not None
+
     def src(self, obj, connection=None, level=None):
         obj = self.db_object_compiler.from_string(
             obj, connection=connection, level=level
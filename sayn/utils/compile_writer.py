@@ -0,0 +1,159 @@
+import atexit
+import hashlib
+import os
+from pathlib import Path
+import queue
+import threading
+
+
+class CompileWriter:
+    """Writes the files of the compile folder from a background thread so that tasks don't wait
+    on the file system.
+
+    Files are content addressed: the hash, modification time and size of each file written are
+    kept in the state store, and files whose content didn't change since they were written are
+    not written again. Files in the compile folder not written during the execution are removed
+    when the writer is closed, so the folder ends up with the same content as if it was deleted
+    at the start of the execution.
+
+    Args:
+      folder (str): the compile folder
+      state (StateStore): the store keeping the hashes of compiled files
+      remove_stale (bool): remove the files not written in this execution when closing
+    """
+
+    # Maximum number of files written between updates to the state store
+    batch_size = 500
+
+    def __init__(self, folder, state, remove_stale=True):
+        self.folder = Path(folder)
+        self.state = state
+        self.remove_stale = remove_stale
+        self.written = set()
+        self.errors = list()
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        # Pending writes are completed when the process exits without closing the writer
+        atexit.register(self.close)
+
+    def write(self, path, content):
+        """Queues writing content to a file in the compile folder"""
+        self._queue.put((Path(path).as_posix(), str(content)))
+
+    def flush(self):
+        """Waits until all files queued are written"""
+        self._queue.join()
+
+    def close(self):
+        """Writes the files queued, removes stale files and stops the background thread"""
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        existing = dict()
+        folders = set()
+        try:
+            if self.folder.is_file():
+                self.folder.unlink()
+            self.folder.mkdir(parents=True, exist_ok=True)
+
+            for root, _, file_names in os.walk(self.folder):
+                folders.add(Path(root).as_posix())
+                for file_name in file_names:
+                    path = Path(root, file_name)
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        # Deleted since listed
+                        continue
+                    existing[path.as_posix()] = (stat.st_mtime_ns, stat.st_size)
+        except OSError as exc:
+            self.errors.append((self.folder.as_posix(), exc))
+        hashes = self.state.get_compiled_files()
+
+        finished = False
+        while not finished:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            updates = dict()
+            for item in batch:
+                if item is None:
+                    finished = True
+                    continue
+
+                path, content = item
+                self.written.add(path)
+                try:
+                    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                    if hashes.get(path) == (
+                        *existing.get(path, (None, None)),
+                        content_hash,
+                    ):
+                        continue
+
+                    parent = Path(path).parent
+                    if parent.as_posix() not in folders:
+                        parent.mkdir(parents=True, exist_ok=True)
+                        folders.add(parent.as_posix())
+                    Path(path).write_text(content)
+                    stat = os.stat(path)
+                except Exception as exc:
+                    self.errors.append((path, exc))
+                    continue
+
+                existing[path] = (stat.st_mtime_ns, stat.st_size)
+                hashes[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+                updates[path] = hashes[path]
+
+            if len(updates) > 0:
+                self.state.set_compiled_files(updates)
+
+            for _ in batch:
+                self._queue.task_done()
+
+        if self.remove_stale:
+            self._remove_stale(set(existing.keys()), set(hashes.keys()), self.written)
+
+    def remove_stale_files(self, keep):
+        """Removes the files in the compile folder not in `keep`, for executions where the
+        files to keep are only known after closing the writer (eg: the files written by all
+        shards of a run)"""
+        existing = set()
+        for root, _, file_names in os.walk(self.folder):
+            for file_name in file_names:
+                existing.add(Path(root, file_name).as_posix())
+
+        self._remove_stale(existing, set(self.state.get_compiled_files().keys()), keep)
+
+    def _remove_stale(self, existing, known, keep):
+        stale = existing - set(keep)
+        for path in stale:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+        # Files no longer in the folder are also forgotten
+        self.state.delete_compiled_files(stale | (known - existing))
+        self._remove_empty_folders()
+
+    def _remove_empty_folders(self):
+        # Deepest first so that parents are empty after removing their children
+        for root, _, _ in sorted(
+            os.walk(self.folder), key=lambda x: len(Path(x[0]).parts), reverse=True
+        ):
+            if Path(root) != self.folder:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    # Not empty
+                    pass
@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
-from copy import deepcopy
+from collections import ChainMap
 from pathlib import Path
 from typing import Union
 
 from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+from jinja2.bccache import Bucket, FileSystemBytecodeCache
 
 from ..core.errors import SaynCompileError, SaynMissingFileError
 
@@ -18,6 +19,100 @@ class TaskJinjaEnv:
             self.name = name
 
 
+class TemplateCache(FileSystemBytecodeCache):
+    """Bytecode cache shared by all the jinja environments created by the compiler, so that
+    each template (including the ones imported as macros) is compiled only once per process.
+
+    Entries are keyed by the template name and store the hash of its source, so a changed
+    template replaces its previous entry. When a folder is given, the bytecode is also stored
+    there so that templates are only compiled again when they change. All environments using the cache need the same settings, as these affect the
+    compiled code.
+
+    Args:
+      folder (str): the folder where bytecode is stored. If None, it's only kept in memory
+    """
+
+    def __init__(self, folder=None):
+        super().__init__(directory=folder, pattern="%s.cache")
+        self.folder = folder
+        self.codes = dict()
+        self.strings = dict()
+
+    def _get_default_cache_dir(self):
+        return None
+
+    def get_bucket(self, environment, name, filename, source):
+        # Task environments keep track of the files they load (see TaskCompiler)
+        loaded_files = getattr(environment, "loaded_files", None)
+        if loaded_files is not None and filename is not None:
+            loaded_files.add(filename)
+
+        key = self.get_cache_key(name or "", filename)
+        bucket = Bucket(environment, key, self.get_source_checksum(source))
+        self.load_bytecode(bucket)
+        return bucket
+
+    def load_bytecode(self, bucket):
+        checksum, code = self.codes.get(bucket.key, (None, None))
+        if checksum != bucket.checksum:
+            code = None
+
+        if code is None and self.folder is not None:
+            # The bucket discards the stored bytecode if the checksum doesn't match
+            try:
+                super().load_bytecode(bucket)
+            except (OSError, EOFError, ValueError):
+                bucket.reset()
+            code = bucket.code
+
+        if code is not None:
+            bucket.code = code
+            self.codes[bucket.key] = (bucket.checksum, code)
+
+    def dump_bytecode(self, bucket):
+        self.codes[bucket.key] = (bucket.checksum, bucket.code)
+        if self.folder is not None:
+            try:
+                Path(self.folder).mkdir(parents=True, exist_ok=True)
+                super().dump_bytecode(bucket)
+            except OSError:
+                pass
+
+    def from_file(self, environment, path):
+        """Equivalent to `environment.from_string(path.read_text())` using the cache"""
+        source = path.read_text(encoding="utf-8")
+        name = path.as_posix()
+        bucket = self.get_bucket(environment, name, str(path), source)
+        if bucket.code is None:
+            bucket.code = environment.compile(source, name, str(path))
+            self.set_bucket(bucket)
+
+        return environment.template_class.from_code(
+            environment, bucket.code, environment.make_globals(None)
+        )
+
+    def from_string(self, environment, source):
+        """Equivalent to `environment.from_string(source)` using the in memory cache"""
+        code = self.strings.get(source)
+        if code is None:
+            code = environment.compile(source)
+            self.strings[source] = code
+
+        return environment.template_class.from_code(
+            environment, code, environment.make_globals(None)
+        )
+
+
+def is_template(value, environment):
+    """Returns False if the string doesn't contain jinja delimiters, so rendering it would
+    return the same string"""
+    return (
+        environment.variable_start_string in value
+        or environment.block_start_string in value
+        or environment.comment_start_string in value
+    )
+
+
 class BaseCompiler(ABC):
     @abstractmethod
     def compile(self, obj: Union[Template, Path, str], **kwargs) -> str:
@@ -29,7 +124,9 @@ class BaseCompiler(ABC):
 
 
 class Compiler(BaseCompiler):
-    def __init__(self, run_arguments, parameters, prod_parameters):
+    def __init__(self, run_arguments, parameters, prod_parameters, cache_folder=None):
+        self.template_cache = TemplateCache(cache_folder)
+
         env_arguments = {
             "full_load": run_arguments.full_load,
             "start_dt": f"'{run_arguments.start_dt.strftime('%Y-%m-%d')}'",
@@ -50,6 +147,7 @@ class Compiler(BaseCompiler):
             undefined=StrictUndefined,
             keep_trailing_newline=True,
             cache_size=0,
+            bytecode_cache=self.template_cache,
         )
 
     def _get_template(
@@ -66,10 +164,10 @@ class Compiler(BaseCompiler):
             if not obj.is_file():
                 raise SaynMissingFileError(str(obj))
             else:
-                return env.from_string(obj.read_text(encoding="utf-8"))
+                return self.template_cache.from_file(env, obj)
 
         elif isinstance(obj, str):
-            return env.from_string(obj)
+            return self.template_cache.from_string(env, obj)
 
         else:
             raise SaynCompileError(f'Cannot compile object of type "{type(obj)}"')
@@ -90,10 +188,16 @@ class Compiler(BaseCompiler):
         self.prod_env.globals.update(**params)
 
     def compile(self, obj: Union[Template, Path, str], **kwargs) -> str:
+        if isinstance(obj, str) and not is_template(obj, self.env):
+            return obj
+
         template = self._get_template(obj, False)
         return self._compile_template(template, **kwargs)
 
     def compile_prod(self, obj: Union[Path, str], **kwargs) -> str:
+        if isinstance(obj, str) and not is_template(obj, self.prod_env):
+            return obj
+
         template = self._get_template(obj, False)
         return self._compile_template(template, **kwargs)
 
@@ -126,10 +230,20 @@ class Prepared:
 
 class TaskCompiler(Compiler):
     def __init__(self, base_env, base_prod_env, task) -> None:
-        self.env = self._create_environment()
-        self.env.globals.update(**deepcopy(base_env.globals))
-        self.env.globals["task"] = task
-
-        self.prod_env = self._create_environment()
-        self.prod_env.globals.update(**deepcopy(base_prod_env.globals))
-        self.prod_env.globals["task"] = task
+        self.template_cache = base_env.bytecode_cache
+        # Template files used by the task, including imported macros
+        self.loaded_files = set()
+
+        self.env = self._create_overlay(base_env, task)
+        self.env.loaded_files = self.loaded_files
+        self.prod_env = self._create_overlay(base_prod_env, task)
+        self.prod_env.loaded_files = self.loaded_files
+
+    @staticmethod
+    def _create_overlay(base_env, task):
+        """Returns an environment linked to the base one, reading the globals (ie: project
+        parameters) from it without copying them. Globals set on the task compiler are stored
+        in the overlay only"""
+        env = base_env.overlay()
+        env.globals = ChainMap({"task": task}, base_env.globals)
+        return env
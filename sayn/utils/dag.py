@@ -1,3 +1,6 @@
+from collections import deque
+import heapq
+
 from .misc import reverse_dict_inclusive
 
 from ..core.errors import Err, Ok
@@ -14,35 +17,85 @@ def _has_missing_parents(dag):
     return Ok(False)
 
 
-def _is_cyclic_helper(dag, node, visited, stack, breadcrumbs):
-    visited[node] = True
-    stack[node] = True
+def _strongly_connected_components(dag):
+    """Iterative version of Tarjan's algorithm, returning the list of strongly connected
+    components of the dag in linear time without recursion"""
+    index = dict()
+    lowlink = dict()
+    stack = list()
+    on_stack = set()
+    components = list()
 
-    for parent in dag[node]:
-        if parent == node:
-            return Err("dag", "cycle_error", path=[node, parent])
-        elif not visited[parent]:
-            result = _is_cyclic_helper(
-                dag, parent, visited, stack, breadcrumbs + [parent]
-            )
-            if result.is_err:
-                return result
-        elif stack[parent]:
-            return Err("dag", "cycle_error", path=breadcrumbs + [parent])
+    for root in dag.keys():
+        if root in index:
+            continue
 
-    stack[node] = False
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(dag[root]))]
+        while len(work) > 0:
+            node, parents = work[-1]
+            for parent in parents:
+                if parent not in dag:
+                    continue
+                elif parent not in index:
+                    index[parent] = lowlink[parent] = len(index)
+                    stack.append(parent)
+                    on_stack.add(parent)
+                    work.append((parent, iter(dag[parent])))
+                    break
+                elif parent in on_stack:
+                    lowlink[node] = min(lowlink[node], index[parent])
+            else:
+                # All parents of node visited
+                work.pop()
+                if len(work) > 0:
+                    caller = work[-1][0]
+                    lowlink[caller] = min(lowlink[caller], lowlink[node])
 
-    return Ok()
+                if lowlink[node] == index[node]:
+                    component = list()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def _get_cycle(dag, component):
+    """Returns a path of nodes forming a cycle within a strongly connected component, or None
+    if the component is a single node without a dependency on itself"""
+    members = set(component)
+    start = component[0]
+    path = [start]
+    position = {start: 0}
+    while True:
+        parent = next((p for p in dag[path[-1]] if p in members), None)
+        if parent is None:
+            return
+        elif parent in position:
+            return path[position[parent] :] + [parent]
+        position[parent] = len(path)
+        path.append(parent)
 
 
 def _is_cyclic(dag):
-    visited = {n: False for n in dag.keys()}
-    stack = {n: False for n in dag.keys()}
-    for node in dag.keys():
-        if not visited[node]:
-            result = _is_cyclic_helper(dag, node, visited, stack, [node])
-            if result.is_err:
-                return result
+    order = {node: i for i, node in enumerate(dag.keys())}
+    cycles = list()
+    for component in _strongly_connected_components(dag):
+        component = sorted(component, key=lambda n: order[n])
+        cycle = _get_cycle(dag, component)
+        if cycle is not None:
+            cycles.append(cycle)
+
+    if len(cycles) > 0:
+        cycles = sorted(cycles, key=lambda c: order[c[0]])
+        return Err("dag", "cycle_error", path=cycles[0], cycles=cycles)
 
     return Ok(True)
 
@@ -60,40 +113,161 @@ def dag_is_valid(dag):
 
 # DAG -> Sorted list
 def topological_sort(dag):
+    """Sorts the nodes of the dag so that every node comes after all its parents.
+
+    Uses Kahn's algorithm, which is linear on the number of nodes and edges (plus a logarithmic
+    factor for the heaps). Nodes are sorted in passes over the order they're defined in `dag`:
+    each pass takes the available nodes defined after the last node sorted, and nodes becoming
+    available behind it wait for the next pass. This keeps the order the same as sorting by
+    repeatedly scanning the list of nodes pending.
+    """
     if len(dag) == 0:
         return Ok(list())
-    result = dag_is_valid(dag)
+    result = _has_missing_parents(dag)
     if result.is_err:
         return result
-    topo_sorted = []
-    pending = list(dag.keys())
-    current = 0
-    while True:
-        if len(set(dag[pending[current]]) - set(topo_sorted)) == 0:
-            topo_sorted.append(pending.pop(current))
 
-            if len(pending) == 0:
-                return Ok(topo_sorted)
-        else:
-            current += 1
+    index = {node: i for i, node in enumerate(dag.keys())}
+    pending_parents = dict()
+    children = {node: list() for node in dag.keys()}
+    for node, parents in dag.items():
+        parents = set(parents)
+        pending_parents[node] = len(parents)
+        for parent in parents:
+            children[parent].append(node)
+
+    # Heaps of the index of available nodes in the current and next pass
+    current = [index[node] for node, count in pending_parents.items() if count == 0]
+    heapq.heapify(current)
+    next_pass = list()
+    nodes = list(dag.keys())
+    topo_sorted = list()
+    while len(current) > 0:
+        last = heapq.heappop(current)
+        node = nodes[last]
+        topo_sorted.append(node)
+        for child in children[node]:
+            pending_parents[child] -= 1
+            if pending_parents[child] == 0:
+                heapq.heappush(
+                    current if index[child] > last else next_pass, index[child]
+                )
 
-        if current == len(pending):
-            current = 0
+        if len(current) == 0:
+            current, next_pass = next_pass, current
+
+    if len(topo_sorted) < len(dag):
+        # Nodes not sorted are either in a cycle or downstream of one
+        sorted_nodes = set(topo_sorted)
+        result = _is_cyclic(
+            {
+                node: [p for p in parents if p not in sorted_nodes]
+                for node, parents in dag.items()
+                if node not in sorted_nodes
+            }
+        )
+        if result.is_err:
+            return result
 
     return Ok(topo_sorted)
 
 
 # DAG querying
+class Dag:
+    """Index over a valid dag for repeated queries.
+
+    The index keeps the parents, children and position in the topological sort of every
+    node. Ancestors and descendants are calculated when requested with a breadth first search
+    from the nodes in the query, so memory stays linear on the size of the dag.
+
+    Args:
+      dag (Dict[str, List[str]]): dictionary of node to the list of its parents
+      topo_sort (List[str]): the nodes of the dag in topological order
+    """
+
+    def __init__(self, dag, topo_sort):
+        self.topo_sort = list(topo_sort)
+        self.position = {node: i for i, node in enumerate(self.topo_sort)}
+        self.parents = {node: list(dag[node]) for node in self.topo_sort}
+        self.children = {node: list() for node in self.topo_sort}
+        for node in self.topo_sort:
+            for parent in self.parents[node]:
+                self.children[parent].append(node)
+
+    def __contains__(self, node):
+        return node in self.position
+
+    def _reachable(self, nodes, adjacency):
+        """Set of all nodes reachable from any of nodes following adjacency"""
+        reached = set()
+        queue = deque(n for n in nodes if n in self.position)
+        while len(queue) > 0:
+            for n in adjacency[queue.popleft()]:
+                if n not in reached:
+                    reached.add(n)
+                    queue.append(n)
+
+        return reached
+
+    def upstream_set(self, nodes):
+        return self._reachable(nodes, self.parents)
+
+    def downstream_set(self, nodes):
+        return self._reachable(nodes, self.children)
+
+    def sort(self, nodes):
+        """Returns the nodes in topological order"""
+        return sorted(nodes, key=lambda n: self.position[n])
+
+    def upstream(self, node):
+        return self.sort(self.upstream_set([node]))
+
+    def downstream(self, node):
+        return self.sort(self.downstream_set([node]))
+
+    def query(self, query=list()):
+        """Returns the list of nodes selected by a query (as returned by
+        sayn.utils.task_query.get_query) in topological order"""
+        if len(query) == 0:
+            return Ok(list(self.topo_sort))
+
+        query = sorted(query, key=lambda x: 0 if x["operation"] == "include" else 1)
+        if query[0]["operation"] == "include":
+            selected = set()
+        else:
+            selected = set(self.topo_sort)
+
+        for operand in query:
+            node = operand["task"]
+            if node not in self.position:
+                continue
+
+            nodes = {node}
+            if operand["upstream"]:
+                nodes |= self.upstream_set([node])
+            if operand["downstream"]:
+                nodes |= self.downstream_set([node])
+
+            if operand["operation"] == "include":
+                selected |= nodes
+            else:
+                selected -= nodes
+
+        return Ok(self.sort(selected))
+
+
 def downstream(dag, node):
     return upstream(reverse_dict_inclusive(dag), node)
 
 
 def upstream(dag, node):
     to_include = list()
-    queue = dag[node]
+    seen = set()
+    queue = deque(dag[node])
     while len(queue) > 0:
-        current = queue.pop(0)
-        if current not in to_include:
+        current = queue.popleft()
+        if current not in seen:
+            seen.add(current)
             to_include.append(current)
             queue.extend(dag[current])
 
@@ -104,39 +278,5 @@ def query(dag, query=list()):
     result = topological_sort(dag)
     if result.is_err:
         return result
-    elif len(query) == 0:
-        return Ok(result.value)
-    else:
-        topo_sort = result.value
-
-    query = sorted(query, key=lambda x: 0 if x["operation"] == "include" else 1)
-    if query[0]["operation"] == "include":
-        to_include = set()
-    else:
-        to_include = set(topo_sort)
-    query_cache = dict()
-
-    for operand in query:
-        key = (operand["task"], operand["upstream"], operand["downstream"])
-        if key in query_cache:
-            tasks = query_cache[key]
-        else:
-            tasks = [key[0]]
-            if key[1]:
-                result = upstream(dag, key[0])
-                if result.is_err:
-                    return result
-                tasks.extend(result.value)
-            if key[2]:
-                result = downstream(dag, key[0])
-                if result.is_err:
-                    return result
-                tasks.extend(result.value)
-            query_cache[key] = tasks
-
-        if operand["operation"] == "include":
-            to_include = to_include.union(tasks)
-        else:
-            to_include -= set(tasks)
 
-    return Ok([n for n in topo_sort if n in to_include])
+    return Dag(dag, result.value).query(query)
@@ -7,7 +7,8 @@ from ..core.errors import Err, Ok
 
 
 class PythonLoader:
-    modules = list()
+    def __init__(self):
+        self.modules = list()
 
     def has_module(self, key):
         return key in self.modules
@@ -17,6 +18,13 @@ class PythonLoader:
         if not path.is_file():
             return Err("python_loader", "missing_init_py", path=path)
 
+        # Modules imported by a previous registration (eg: in a previous request to
+        # `sayn serve`) are removed so that changes to the files are picked up
+        for name in list(sys.modules.keys()):
+            if name == f"sayn_{key}" or name.startswith(f"sayn_{key}."):
+                del sys.modules[name]
+        importlib.invalidate_caches()
+
         loader = importlib.machinery.SourceFileLoader(
             key, str(Path(folder, "__init__.py"))
         )
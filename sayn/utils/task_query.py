@@ -1,3 +1,5 @@
+import fnmatch
+from pathlib import Path
 import re
 
 from ..core.errors import Err, Ok
@@ -9,19 +11,54 @@ from ..core.errors import Err, Ok
 RE_TASK_QUERY = re.compile(
     (
         r"^("
-        r"(?!(group:|tag:))(?P<upstream>\+?)(?P<task>[a-zA-Z0-9][-_a-zA-Z0-9]+)(?P<downstream>\+?)|"
+        r"(?!(group:|tag:|state:))(?P<upstream>\+?)(?P<task>[a-zA-Z0-9*?\[][-_a-zA-Z0-9*?\[\]!]*)(?P<downstream>\+?)|"
         r"group:(?P<group>[a-zA-Z0-9][-_a-zA-Z0-9]+)|"
-        r"tag:(?P<tag>[a-zA-Z0-9][-_a-zA-Z0-9]+)"
+        r"tag:(?P<tag>[a-zA-Z0-9][-_a-zA-Z0-9]+)|"
+        r"(?P<state_upstream>\+?)state:(?P<state>modified)(?P<state_downstream>\+?)"
         r")$"
     )
 )
 
+RE_GLOB = re.compile(r"[*?\[]")
+RE_STATE = re.compile(r"^\+?state:")
 
-def _get_query_component(tasks, query):
-    tasks = {
-        k: {"group": v["group"], "tags": v.get("tags", list())}
-        for k, v in tasks.items()
-    }
+
+def _get_index(tasks):
+    """Indexes the tasks by tag and group so that each query component is resolved without
+    going through all tasks in the project"""
+    index = {"tasks": dict(), "tags": dict(), "groups": dict(), "modified": list()}
+    for name, task in tasks.items():
+        index["tasks"][name] = task
+        if task.get("modified"):
+            index["modified"].append(name)
+        index["groups"].setdefault(task.get("group"), list()).append(name)
+        for tag in task.get("tags") or list():
+            index["tags"].setdefault(tag, list()).append(name)
+
+    return index
+
+
+def _read_query_files(components):
+    """Replaces components in the form `@file_path` with the components listed in the file,
+    separated by spaces or new lines. Lines starting with `#` are ignored"""
+    output = list()
+    for component in components:
+        if component.startswith("@"):
+            path = Path(component[1:])
+            if not path.is_file():
+                return Err("task_query", "missing_file", path=str(path))
+
+            for line in path.read_text().splitlines():
+                line = line.strip()
+                if len(line) > 0 and not line.startswith("#"):
+                    output.extend(line.split())
+        else:
+            output.append(component)
+
+    return Ok(output)
+
+
+def _get_query_component(index, query):
     match = RE_TASK_QUERY.match(query)
     if match is None:
         return Err(
@@ -34,10 +71,7 @@ def _get_query_component(tasks, query):
 
         if match_components.get("tag") is not None:
             tag = match_components["tag"]
-            relevant_tasks = {
-                k: v for k, v in tasks.items() if tag in v.get("tags", list())
-            }
-            if len(relevant_tasks) == 0:
+            if tag not in index["tags"]:
                 return Err(
                     "task_query",
                     "undefined_tag",
@@ -46,25 +80,47 @@ def _get_query_component(tasks, query):
             return Ok(
                 [
                     {"task": task, "upstream": False, "downstream": False}
-                    for task in relevant_tasks.keys()
+                    for task in index["tags"][tag]
+                ]
+            )
+
+        if match_components.get("state") is not None:
+            # No tasks modified is a valid selection
+            return Ok(
+                [
+                    {
+                        "task": task,
+                        "upstream": match_components["state_upstream"] == "+",
+                        "downstream": match_components["state_downstream"] == "+",
+                    }
+                    for task in index["modified"]
                 ]
             )
 
         if match_components.get("group") is not None:
             group = match_components["group"]
-            relevant_tasks = {k: v for k, v in tasks.items() if group == v.get("group")}
-            if len(relevant_tasks) == 0:
+            if group not in index["groups"]:
                 return Err("task_query", "undefined_group", group=group)
             return Ok(
                 [
                     {"task": task, "upstream": False, "downstream": False}
-                    for task in relevant_tasks.keys()
+                    for task in index["groups"][group]
                 ]
             )
 
         if match_components.get("task") is not None:
             task = match_components["task"]
-            if task not in tasks:
+            if RE_GLOB.search(task) is not None:
+                # Case sensitive on all platforms, like task names
+                relevant_tasks = [
+                    t for t in index["tasks"].keys() if fnmatch.fnmatchcase(t, task)
+                ]
+            elif task in index["tasks"]:
+                relevant_tasks = [task]
+            else:
+                relevant_tasks = list()
+
+            if len(relevant_tasks) == 0:
                 return Err(
                     "task_query",
                     "undefined_task",
@@ -77,12 +133,26 @@ def _get_query_component(tasks, query):
                         "upstream": match_components.get("upstream", "") == "+",
                         "downstream": match_components.get("downstream", "") == "+",
                     }
+                    for task in relevant_tasks
                 ]
             )
 
         return Err("task_query", "wrong_query")
 
 
+def uses_state(include=None, exclude=None):
+    """Returns whether the query selects tasks by their state (ie: state:modified), including
+    the selectors in query files"""
+    for components in (include or list(), exclude or list()):
+        result = _read_query_files(components)
+        if result.is_err:
+            return result
+        elif any(RE_STATE.search(c) is not None for c in result.value):
+            return Ok(True)
+
+    return Ok(False)
+
+
 def get_query(tasks, include=None, exclude=None):
     if include is None:
         include = set()
@@ -90,6 +160,16 @@ def get_query(tasks, include=None, exclude=None):
     if exclude is None:
         exclude = set()
 
+    result = _read_query_files(include)
+    if result.is_err:
+        return result
+    include = result.value
+
+    result = _read_query_files(exclude)
+    if result.is_err:
+        return result
+    exclude = result.value
+
     overlap = set(include).intersection(set(exclude))
     if len(overlap) > 0:
         overlap = ", ".join(overlap)
@@ -99,10 +179,11 @@ def get_query(tasks, include=None, exclude=None):
             overlap=overlap,
         )
 
+    index = _get_index(tasks)
     output = list()
     for operation, components in (("include", include), ("exclude", exclude)):
         for q in components:
-            result = _get_query_component(tasks, q)
+            result = _get_query_component(index, q)
             if result.is_err:
                 return result
             else:
@@ -1,16 +1,128 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import hashlib
+from itertools import repeat
+import multiprocessing
+import os
+
 from pydantic import ValidationError
 from ruamel.yaml import YAML
 from ruamel.yaml.error import MarkedYAMLError
 
 from ..core.errors import SaynMissingFileError, SaynParsingError
 
+# Minimum number of files to parse before using a pool of processes. Spawning the workers
+# (which need to import sayn) takes longer than parsing all files of most projects, so
+# files are parsed sequentially unless there are thousands of them
+parallel_min_files = 2000
+
+
+def read_yaml_file(file, Model, cache=None):
+    """Reads a yaml file and validates it with a pydantic model. See read_yaml_files"""
+    return read_yaml_files([file], Model, cache=cache, max_workers=1)[0]
+
+
+def read_yaml_files(files, Model, cache=None, max_workers=None, timings=None):
+    """Reads yaml files and validates them with a pydantic model, returning the models in
+    the same order as the files.
+
+    When a cache (sayn.core.state.StateStore) is passed, the validated content is stored
+    in it and files are only parsed again when their modification time or size change and
+    their content hash is different from the cached one. Files that need parsing are
+    parsed in a pool of processes when there are at least `parallel_min_files` of them.
+
+    Args:
+      files (List[Path]): the files to read
+      Model (pydantic.BaseModel): the model validating the content of the files
+      cache (sayn.core.state.StateStore): the cache of parsed files
+      max_workers (int): maximum number of processes to use. Defaults to the number of cpus
+      timings (Dict[Path, timedelta]): if passed, it's updated with the time spent parsing
+          each file not found in the cache
+    """
+    models = dict()
+    to_parse = dict()
+    for file in files:
+        if not file.exists():
+            raise SaynMissingFileError(str(file))
+
+        if cache is None:
+            to_parse[file] = (file.read_text(), None, None)
+            continue
+
+        stat = file.stat()
+        cached = cache.get_parsed_file(file)
+        if cached is not None and (cached["mtime_ns"], cached["size"]) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            models[file] = Model.construct(**cached["content"])
+            continue
+
+        text = file.read_text()
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if cached is not None and cached["hash"] == content_hash:
+            models[file] = Model.construct(**cached["content"])
+            cache.set_parsed_file(
+                file, stat.st_mtime_ns, stat.st_size, content_hash, cached["content"]
+            )
+        else:
+            to_parse[file] = (text, stat, content_hash)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(to_parse))
+    arguments = (
+        [str(f) for f in to_parse.keys()],
+        [text for text, _, _ in to_parse.values()],
+        repeat(Model),
+    )
+    if max_workers > 1 and len(to_parse) >= parallel_min_files:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = list(pool.map(_parse_file, *arguments))
+    else:
+        results = list(map(_parse_file, *arguments))
+
+    # Errors are raised in the order of the files, regardless of the order of parsing
+    for (file, (_, stat, content_hash)), (error, model, duration) in zip(
+        to_parse.items(), results
+    ):
+        if error is not None:
+            raise SaynParsingError(*error)
+
+        models[file] = model
+        if timings is not None:
+            timings[file] = duration
+        if cache is not None:
+            cache.set_parsed_file(
+                file, stat.st_mtime_ns, stat.st_size, content_hash, model.dict()
+            )
+
+    return [models[file] for file in files]
+
 
-def read_yaml_file(file, Model):
-    if not file.exists():
-        raise SaynMissingFileError(str(file))
+def _parse_file(file_name, text, Model):
+    """Parses a yaml file returning the error, the model and the time it took to parse.
+    SaynParsingError can't be sent back from a worker process, so errors are returned as the
+    arguments to create it"""
+    start_ts = datetime.now()
+    try:
+        model = parse_yaml(file_name, text, Model)
+    except SaynParsingError as exc:
+        return (exc.code, exc.errors), None, datetime.now() - start_ts
+
+    return None, model, datetime.now() - start_ts
+
+
+def parse_yaml(file, text, Model):
+    """Parses and validates the content of a yaml file. The safe loader is faster, but it
+    doesn't keep the position of keys, so the round-trip loader is used to report errors"""
+    try:
+        return Model(**YAML(typ="safe").load(text))
+    except (MarkedYAMLError, ValidationError):
+        pass
 
     try:
-        parsed = YAML().load(file.read_text())
+        parsed = YAML().load(text)
     except MarkedYAMLError as exc:
         raise SaynParsingError(
             "yaml_parsing",
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from sayn.core.state import StateStore
+from sayn.utils.compile_writer import CompileWriter
+
+from . import inside_dir
+
+
+def test_compile_writer(tmp_path):
+    with inside_dir(tmp_path, {"compile/old/stale.sql": "SELECT 0"}):
+        state = StateStore(".sayn")
+
+        writer = CompileWriter("compile", state)
+        writer.write(Path("compile", "g1", "t1.sql"), "SELECT 1")
+        writer.write(Path("compile", "g1", "t2.sql"), "SELECT 2")
+        writer.write(Path("compile", "g2", "t3.sql"), "SELECT 3")
+        writer.flush()
+        assert Path("compile", "g2", "t3.sql").read_text() == "SELECT 3"
+        writer.close()
+
+        # Files not written are removed with their folders
+        assert not Path("compile", "old").exists()
+        assert set(state.get_compiled_files().keys()) == {
+            "compile/g1/t1.sql",
+            "compile/g1/t2.sql",
+            "compile/g2/t3.sql",
+        }
+        t1_mtime = Path("compile", "g1", "t1.sql").stat().st_mtime_ns
+
+        writer = CompileWriter("compile", state)
+        writer.write(Path("compile", "g1", "t1.sql"), "SELECT 1")
+        writer.write(Path("compile", "g1", "t2.sql"), "SELECT 22")
+        writer.close()
+
+        # Unchanged files are not written again
+        assert Path("compile", "g1", "t1.sql").stat().st_mtime_ns == t1_mtime
+        assert Path("compile", "g1", "t2.sql").read_text() == "SELECT 22"
+        assert not Path("compile", "g2").exists()
+        assert set(state.get_compiled_files().keys()) == {
+            "compile/g1/t1.sql",
+            "compile/g1/t2.sql",
+        }
+
+        # Files modified outside sayn are written again
+        Path("compile", "g1", "t1.sql").write_text("edited")
+        writer = CompileWriter("compile", state, remove_stale=False)
+        writer.write(Path("compile", "g1", "t1.sql"), "SELECT 1")
+        writer.close()
+
+        assert Path("compile", "g1", "t1.sql").read_text() == "SELECT 1"
+        assert Path("compile", "g1", "t2.sql").exists()
+        assert writer.errors == list()
+
+        # Files to keep can be passed after closing the writer
+        writer.remove_stale_files({"compile/g1/t2.sql"})
+        assert not Path("compile", "g1", "t1.sql").exists()
+        assert Path("compile", "g1", "t2.sql").exists()
+        assert set(state.get_compiled_files().keys()) == {"compile/g1/t2.sql"}
+
+        state.close()
@@ -0,0 +1,104 @@
+from pathlib import Path
+import tracemalloc
+
+from jinja2 import Environment
+
+from sayn.core.app import RunArguments
+from sayn.utils.compiler import Compiler
+
+from . import inside_dir
+
+
+def count_compilations(monkeypatch):
+    compiled = list()
+    compile = Environment.compile
+
+    def counted_compile(self, source, name=None, filename=None, *args, **kwargs):
+        compiled.append(name or source)
+        return compile(self, source, name, filename, *args, **kwargs)
+
+    monkeypatch.setattr(Environment, "compile", counted_compile)
+    return compiled
+
+
+def test_template_cache(tmp_path, monkeypatch):
+    compiled = count_compilations(monkeypatch)
+    files = {
+        "sql/macros.sql": "{% macro double(x) %}{{ x * 2 }}{% endmacro %}",
+        "sql/task1.sql": "{% import 'sql/macros.sql' as m %}SELECT {{ m.double(1) }}",
+        "sql/task2.sql": "{% import 'sql/macros.sql' as m %}SELECT {{ m.double(2) }}",
+    }
+
+    with inside_dir(tmp_path, files):
+        compiler = Compiler(RunArguments(), dict(), dict(), cache_folder=".sayn/jinja")
+        for task in ("task1", "task2"):
+            task_compiler = compiler.get_task_compiler("group", task)
+            assert task_compiler.compile(Path(f"sql/{task}.sql")).startswith("SELECT")
+
+        # Macros are compiled once even if each task has its own environment
+        assert sorted(compiled) == ["sql/macros.sql", "sql/task1.sql", "sql/task2.sql"]
+
+        # A new process reads the bytecode from disk, compiling only changed files
+        compiled.clear()
+        Path("sql/task2.sql").write_text("SELECT 3")
+        compiler = Compiler(RunArguments(), dict(), dict(), cache_folder=".sayn/jinja")
+        task_compiler = compiler.get_task_compiler("group", "task1")
+        assert task_compiler.compile(Path("sql/task1.sql")) == "SELECT 2"
+        assert task_compiler.compile(Path("sql/task2.sql")) == "SELECT 3"
+        assert compiled == ["sql/task2.sql"]
+
+        # The changed file replaces its previous entry
+        assert len(list(Path(".sayn/jinja").iterdir())) == 3
+
+        # Changes are picked up by the same process too
+        compiled.clear()
+        Path("sql/task2.sql").write_text("SELECT 4")
+        assert task_compiler.compile(Path("sql/task2.sql")) == "SELECT 4"
+        assert compiled == ["sql/task2.sql"]
+
+
+def test_compile_strings(monkeypatch):
+    compiled = count_compilations(monkeypatch)
+    compiler = Compiler(RunArguments(), {"schema": "analytics"}, dict())
+
+    for task in ("task1", "task2"):
+        task_compiler = compiler.get_task_compiler("group", task)
+        assert task_compiler.compile("{{ schema }}.{{ task.name }}") == (
+            f"analytics.{task}"
+        )
+        assert task_compiler.compile("plain_string") == "plain_string"
+
+    assert compiled == ["{{ schema }}.{{ task.name }}"]
+
+
+def test_task_compiler_globals():
+    compiler = Compiler(RunArguments(), {"schema": "analytics"}, {"schema": "prod"})
+    task1 = compiler.get_task_compiler("group", "task1")
+    task2 = compiler.get_task_compiler("group", "task2")
+
+    task1.update_globals(schema="task_schema", src=lambda x: f"src_{x}")
+    assert task1.compile("{{ schema }}.{{ src('t') }}") == "task_schema.src_t"
+    assert task2.compile("{{ schema }}.{{ task.name }}") == "analytics.task2"
+    assert task2.prod_env.globals["schema"] == "prod"
+    assert "src" not in compiler.env.globals
+
+
+def test_task_compiler_memory():
+    # Task compilers share the globals of the base compiler instead of copying them
+    parameters = {
+        f"param_{i}": {"values": list(range(20)), "name": f"value_{i}"}
+        for i in range(1000)
+    }
+    compiler = Compiler(RunArguments(), parameters, parameters)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        compilers = [compiler.get_task_compiler("group", f"t{i}") for i in range(100)]
+        per_task = (tracemalloc.get_traced_memory()[0] - before) / len(compilers)
+    finally:
+        tracemalloc.stop()
+
+    # Copying the parameters takes close to 1MB per task
+    assert per_task < 64 * 1024
+    assert compilers[5].compile("{{ param_5.name }}") == "value_5"
@@ -35,6 +35,46 @@ def test_cycle03():
     assert dag.dag_is_valid(test_dag).is_err
 
 
+def test_cycle_path():
+    test_dag = {"task1": ["task2"], "task2": ["task3"], "task3": ["task1"]}
+    result = dag.dag_is_valid(test_dag)
+    assert result.error.details["path"] == ["task1", "task2", "task3", "task1"]
+
+    test_dag = {"task1": [], "task2": ["task2"]}
+    result = dag.dag_is_valid(test_dag)
+    assert result.error.details["path"] == ["task2", "task2"]
+
+
+def test_all_cycles():
+    test_dag = {
+        "task1": ["task2"],
+        "task2": ["task1"],
+        "task3": ["task1"],
+        "task4": ["task5"],
+        "task5": ["task6"],
+        "task6": ["task4", "task3"],
+        "task7": ["task7"],
+    }
+    result = dag.dag_is_valid(test_dag)
+    assert result.error.details["cycles"] == [
+        ["task1", "task2", "task1"],
+        ["task4", "task5", "task6", "task4"],
+        ["task7", "task7"],
+    ]
+
+
+def test_long_chain():
+    n_nodes = 50000
+    test_dag = {"task0": []}
+    test_dag.update({f"task{i}": [f"task{i - 1}"] for i in range(1, n_nodes)})
+    assert dag.dag_is_valid(test_dag).is_ok
+
+    test_dag["task0"] = [f"task{n_nodes - 1}"]
+    result = dag.dag_is_valid(test_dag)
+    assert len(result.error.details["cycles"]) == 1
+    assert len(result.error.details["path"]) == n_nodes + 1
+
+
 def test_topological_sort01():
     test_dag = {"task1": [], "task2": [], "task3": []}
     assert dag.topological_sort(test_dag).value == ["task1", "task2", "task3"]
@@ -45,6 +85,69 @@ def test_topological_sort02():
     assert dag.topological_sort(test_dag).value == ["task3", "task2", "task1"]
 
 
+def test_topological_sort03():
+    test_dag = {"task1": ["task3"], "task2": [], "task3": [], "task4": ["task2"]}
+    assert dag.topological_sort(test_dag).value == ["task2", "task3", "task4", "task1"]
+
+
+def test_topological_sort_cycle():
+    test_dag = {
+        "task1": [],
+        "task2": ["task1", "task4"],
+        "task3": ["task2"],
+        "task4": ["task3"],
+    }
+    result = dag.topological_sort(test_dag)
+    assert result.is_err
+    assert result.error.code == "cycle_error"
+
+
+def get_layered_dag(n_nodes, width=100):
+    """Layers of `width` nodes, each depending on 3 nodes of the previous layer"""
+    test_dag = dict()
+    for i in range(n_nodes):
+        if i < width:
+            test_dag[f"task{i}"] = list()
+        else:
+            layer_start = (i // width - 1) * width
+            test_dag[f"task{i}"] = [
+                f"task{layer_start + (i + j) % width}" for j in range(3)
+            ]
+    return test_dag
+
+
+def test_topological_sort_order():
+    test_dag = {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]}
+    assert dag.topological_sort(test_dag).value == ["a", "b", "c", "d"]
+
+    # Nodes available behind the last node sorted wait until the next pass over the nodes
+    test_dag = {"a": ["b"], "b": [], "c": [], "d": ["a"]}
+    assert dag.topological_sort(test_dag).value == ["b", "c", "a", "d"]
+
+
+def test_topological_sort_large():
+    n_nodes = 100000
+    test_dag = get_layered_dag(n_nodes)
+    result = dag.topological_sort(test_dag)
+
+    assert result.is_ok
+    position = {node: i for i, node in enumerate(result.value)}
+    assert len(position) == n_nodes
+    assert all(
+        position[p] < position[n] for n, parents in test_dag.items() for p in parents
+    )
+
+
+def test_topological_sort_deep():
+    # Defined from the end of the chain so nodes are sorted one per pass
+    n_nodes = 20000
+    test_dag = {f"task{i}": [f"task{i - 1}"] for i in range(n_nodes - 1, 0, -1)}
+    test_dag["task0"] = []
+
+    result = dag.topological_sort(test_dag)
+    assert result.value == [f"task{i}" for i in range(n_nodes)]
+
+
 def test_upstream01():
     test_dag = {"task1": ["task2", "task3"], "task2": ["task3"], "task3": []}
     assert set(dag.upstream(test_dag, "task1").value) == set(["task3", "task2"])
@@ -163,3 +266,101 @@ def test_query06():
             }
         ],
     ).value == ["task2", "task1"]
+
+
+def get_index(test_dag):
+    return dag.Dag(test_dag, dag.topological_sort(test_dag).value)
+
+
+def test_dag_index():
+    test_dag = {
+        "task1": [],
+        "task2": ["task1"],
+        "task3": ["task2"],
+        "task4": ["task1"],
+        "task5": [],
+    }
+    index = get_index(test_dag)
+    assert index.upstream("task3") == ["task1", "task2"]
+    assert index.downstream("task1") == ["task2", "task3", "task4"]
+    assert index.downstream("task5") == []
+    assert "task5" in index
+    assert "task6" not in index
+
+
+def test_dag_index_query():
+    test_dag = {
+        "task1": [],
+        "task2": ["task1"],
+        "task3": ["task2"],
+        "task4": ["task1"],
+        "task5": [],
+    }
+    index = get_index(test_dag)
+
+    def operand(task, upstream=False, downstream=False, operation="include"):
+        return {
+            "task": task,
+            "upstream": upstream,
+            "downstream": downstream,
+            "operation": operation,
+        }
+
+    assert index.query([]).value == ["task1", "task2", "task3", "task4", "task5"]
+    assert index.query([operand("task2", upstream=True, downstream=True)]).value == [
+        "task1",
+        "task2",
+        "task3",
+    ]
+    assert index.query(
+        [operand("task1", downstream=True), operand("task2", operation="exclude")]
+    ).value == ["task1", "task3", "task4"]
+    assert index.query([operand("task4", operation="exclude")]).value == [
+        "task1",
+        "task2",
+        "task3",
+        "task5",
+    ]
+
+
+def test_dag_index_query_large():
+    n_nodes = 10000
+    test_dag = get_layered_dag(n_nodes)
+    index = get_index(test_dag)
+    query = [
+        {
+            "task": "task5000",
+            "upstream": True,
+            "downstream": True,
+            "operation": "include",
+        },
+        {
+            "task": "task5050",
+            "upstream": True,
+            "downstream": False,
+            "operation": "exclude",
+        },
+    ]
+
+    expected = (
+        {"task5000"}
+        | set(dag.upstream(test_dag, "task5000").value)
+        | set(dag.downstream(test_dag, "task5000").value)
+    ) - ({"task5050"} | set(dag.upstream(test_dag, "task5050").value))
+
+    result = index.query(query)
+    assert result.is_ok
+    assert set(result.value) == expected
+    assert result.value == [n for n in index.topo_sort if n in expected]
+
+
+def test_dag_index_deep():
+    n_nodes = 20000
+    test_dag = {"task0": []}
+    test_dag.update({f"task{i}": [f"task{i - 1}"] for i in range(1, n_nodes)})
+    index = get_index(test_dag)
+
+    assert index.downstream("task0") == [f"task{i}" for i in range(1, n_nodes)]
+    assert index.upstream(f"task{n_nodes - 1}") == [
+        f"task{i}" for i in range(n_nodes - 1)
+    ]
@@ -0,0 +1,91 @@
+import threading
+
+from sayn.logging import EventTracker
+
+
+class ListLogger:
+    def __init__(self):
+        self.events = list()
+
+    def report_event(self, context, event, stage, **details):
+        self.events.append((details.get("task"), event))
+
+
+def get_tracker():
+    tracker = EventTracker("run_id")
+    logger = ListLogger()
+    tracker.loggers = [logger]
+    tracker.set_tasks(["task1", "task2", "task3"])
+    return tracker, logger
+
+
+def test_buffered_task_events():
+    tracker, logger = get_tracker()
+    tracker.buffer_task_events(["task1", "task2", "task3"])
+
+    task1 = tracker.get_task_tracker("task1")
+    task2 = tracker.get_task_tracker("task2")
+    task3 = tracker.get_task_tracker("task3")
+
+    task3._report_event("start_stage")
+    task1._report_event("start_stage")
+    task2._report_event("start_stage")
+    task3._report_event("finish_stage")
+    tracker.release_task_events("task3")
+
+    # Only events from the first task are reported while it's executing
+    assert logger.events == [("task1", "start_stage")]
+
+    task2._report_event("finish_stage")
+    tracker.release_task_events("task2")
+    task1._report_event("finish_stage")
+    tracker.release_task_events("task1")
+
+    assert logger.events == [
+        ("task1", "start_stage"),
+        ("task1", "finish_stage"),
+        ("task2", "start_stage"),
+        ("task2", "finish_stage"),
+        ("task3", "start_stage"),
+        ("task3", "finish_stage"),
+    ]
+
+    # Once all tasks are released events are reported as they happen
+    task3._report_event("start_stage")
+    assert logger.events[-1] == ("task3", "start_stage")
+
+
+def test_unbuffered_task_events():
+    tracker, logger = get_tracker()
+
+    tracker.get_task_tracker("task2")._report_event("start_stage")
+    tracker.get_task_tracker("task1")._report_event("start_stage")
+
+    assert logger.events == [("task2", "start_stage"), ("task1", "start_stage")]
+
+
+class CommitLogger:
+    def __init__(self):
+        self.commits = list()
+
+    def report_event(self, project_git_commit, **details):
+        self.commits.append(project_git_commit)
+
+
+def test_git_commit_not_awaited(monkeypatch):
+    resolved = threading.Event()
+
+    def get_git_commit(self):
+        resolved.wait()
+        self._git_commit = "abc"
+
+    monkeypatch.setattr(EventTracker, "_get_git_commit", get_git_commit)
+    tracker = EventTracker("run_id")
+    logger = CommitLogger()
+    tracker.loggers = [logger]
+
+    # Events other than the start and finish of the app don't wait for git
+    tracker.report_event(event="start_stage", stage="config")
+    resolved.set()
+    tracker.report_event(event="finish_app")
+    assert logger.commits == [None, "abc"]
@@ -0,0 +1,169 @@
+from pathlib import Path
+import re
+import subprocess
+
+from sayn.core.manifest import get_definitions, get_modified_tasks, update_manifest
+from sayn.core.project import read_groups
+
+from . import create_project, inside_dir, run_sayn
+
+
+def get_tasks():
+    return {
+        name: {
+            "name": name,
+            "group": "models",
+            "type": "sql",
+            "file_name": f"{name}.sql",
+        }
+        for name in ("task1", "task2")
+    }
+
+
+def executed_tasks(output):
+    line = re.search(r"Tasks executed: (.*)", output.decode("utf-8")).group(1)
+    return {t.strip() for t in line.split(",") if len(t.strip()) > 0}
+
+
+sql_files = {"sql/task1.sql": "SELECT 1", "sql/task2.sql": "SELECT 2"}
+
+
+def test_modified_from_manifest(tmp_path):
+    with inside_dir(tmp_path, sql_files):
+        definitions = get_definitions(get_tasks(), dict(), "sql", "python")
+        assert definitions["task1"]["files"] == ["project.yaml", "sql/task1.sql"]
+
+        # Without a manifest all tasks are modified
+        assert get_modified_tasks(definitions, None, ".sayn/manifest.json").value == {
+            "task1",
+            "task2",
+        }
+
+        update_manifest(
+            ".sayn/manifest.json", {k: v["hash"] for k, v in definitions.items()}
+        )
+        result = get_modified_tasks(definitions, None, ".sayn/manifest.json")
+        assert result.value == set()
+
+        Path("sql/task2.sql").write_text("SELECT 3")
+        tasks = get_tasks()
+        tasks["task1"]["materialisation"] = "view"
+        definitions = get_definitions(tasks, dict(), "sql", "python")
+        assert get_modified_tasks(definitions, None, ".sayn/manifest.json").value == {
+            "task1",
+            "task2",
+        }
+
+
+group_file = """
+presets:
+  modelling:
+    materialisation: table
+
+tasks:
+  task1:
+    type: sql
+    file_name: task1.sql
+  task2:
+    type: sql
+    file_name: task2.sql
+    preset: modelling
+"""
+
+
+def test_modified_from_git(tmp_path):
+    with inside_dir(tmp_path, dict(sql_files, **{"tasks/models.yaml": group_file})):
+        subprocess.run(["git", "init", "-q", "."], check=True)
+        subprocess.run(["git", "add", "-A"], check=True)
+        subprocess.run(
+            [
+                "git",
+                "-c",
+                "user.name=a",
+                "-c",
+                "user.email=a@a",
+                "commit",
+                "-qm",
+                "init",
+            ],
+            check=True,
+        )
+
+        def modified():
+            file_groups = read_groups()
+            definitions = get_definitions(get_tasks(), file_groups, "sql", "python")
+            assert definitions["task1"]["files"] == [
+                "tasks/models.yaml",
+                "sql/task1.sql",
+            ]
+            return get_modified_tasks(definitions, "HEAD", None).value
+
+        Path("sql/task2.sql").write_text("SELECT 3")
+        assert modified() == {"task2"}
+        assert get_modified_tasks(dict(), "missing_ref", None).is_err
+        Path("sql/task2.sql").write_text("SELECT 2")
+
+        # Only tasks whose definition changed in the group file are modified
+        Path("tasks/models.yaml").write_text(
+            group_file.replace(
+                "file_name: task1.sql", "file_name: task1.sql\n    tags: [x]"
+            )
+        )
+        assert modified() == {"task1"}
+
+        Path("tasks/models.yaml").write_text(
+            group_file.replace("materialisation: table", "materialisation: view")
+        )
+        assert modified() == {"task2"}
+
+
+settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  models:
+    type: autosql
+    file_name: "*.sql"
+    materialisation: table
+    destination:
+      table: "{{ task.name }}"
+"""
+
+
+def test_state_modified(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        Path("sql").mkdir()
+        Path("sql", "t1.sql").write_text("SELECT 1 AS x")
+        Path("sql", "t2.sql").write_text("SELECT 2 AS x")
+        Path("sql", "t3.sql").write_text("SELECT x FROM {{ src('t1') }}")
+
+        output = run_sayn("run", "-t", "state:modified")
+        assert executed_tasks(output) == {"t1", "t2", "t3"}
+
+        output = run_sayn("run", "-t", "state:modified")
+        assert executed_tasks(output) == set()
+
+        Path("sql", "t1.sql").write_text("SELECT 3 AS x")
+        output = run_sayn("run", "-t", "state:modified+")
+        assert executed_tasks(output) == {"t1", "t3"}
+
+        # Also from a query file
+        Path("sql", "t2.sql").write_text("SELECT 4 AS x")
+        Path("query.txt").write_text("state:modified+\n")
+        output = run_sayn("run", "-t", "@query.txt")
+        assert executed_tasks(output) == {"t2"}
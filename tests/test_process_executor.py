@@ -0,0 +1,84 @@
+import os
+from pathlib import Path
+import sqlite3
+import subprocess
+
+import pytest
+
+from . import create_project, run_sayn
+
+settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  process:
+    type: python
+    module: process
+    executor: process
+    parameters:
+      value: 42
+"""
+
+python_module = """
+import os
+
+from sayn import task
+
+
+@task(outputs=["process_table"])
+def process_task(context, warehouse, value):
+    with context.step("Load"):
+        warehouse.load_data(
+            "process_table", [{"pid": os.getpid(), "value": value}], replace=True
+        )
+    context.info("Loaded from worker")
+"""
+
+
+def write_python(tmp_path, code):
+    Path(tmp_path, "python").mkdir()
+    Path(tmp_path, "python", "__init__.py").write_text("")
+    Path(tmp_path, "python", "process.py").write_text(code)
+
+
+def test_process_executor(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        write_python(tmp_path, python_module)
+        output = run_sayn("run", "-d").decode("utf-8")
+
+        assert "Loaded from worker" in output
+        assert "Load" in output
+
+        with sqlite3.connect("test.db") as conn:
+            pid, value = conn.execute("SELECT pid, value FROM process_table").fetchone()
+
+        assert value == 42
+        assert pid != os.getpid()
+
+
+def test_process_executor_wrong_type(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        write_python(tmp_path, python_module)
+        Path(tmp_path, "tasks").mkdir()
+        Path(tmp_path, "tasks", "dummy.yaml").write_text(
+            "tasks:\n  dummy_task:\n    type: dummy\n    executor: process\n"
+        )
+        with pytest.raises(subprocess.CalledProcessError) as exc:
+            run_sayn("run")
+
+        assert "only supported in python tasks" in exc.value.output.decode("utf-8")
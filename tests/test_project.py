@@ -1,6 +1,14 @@
+import os
 from pathlib import Path
 
-from sayn.core.project import read_project
+import pytest
+
+from sayn.core.app import RunArguments
+from sayn.core.errors import SaynParsingError
+from sayn.core.project import get_tasks_dict, read_groups, read_project
+from sayn.core.state import StateStore
+from sayn.utils import yaml
+from sayn.utils.compiler import Compiler
 from . import inside_dir
 
 # utils
@@ -57,3 +65,126 @@ def test_project_err_no_tasks(tmp_path):
     with inside_dir(tmp_path):
         setup_project_and_tasks(project_yaml=project_yaml)
         read_project()
+
+
+def test_project_cache(tmp_path):
+    project_yaml = """
+    required_credentials:
+      - warehouse
+
+    default_db: warehouse
+    """
+
+    base_yaml = """
+    tasks:
+        test_sql:
+            type: sql
+            file_name: test.sql
+    """
+
+    with inside_dir(tmp_path):
+        setup_project_and_tasks(project_yaml=project_yaml, base_yaml=base_yaml)
+        state = StateStore(".sayn")
+        assert read_project(cache=state).default_db == "warehouse"
+        cached = state.get_parsed_file(Path("project.yaml"))
+        assert cached["content"]["default_db"] == "warehouse"
+
+        # Unchanged files are served from the cache, even if their mtime changes
+        Path("project.yaml").write_text(project_yaml.replace("default_db", "#"))
+        stat = Path("project.yaml").stat()
+        state.set_parsed_file(
+            Path("project.yaml"),
+            stat.st_mtime_ns,
+            stat.st_size,
+            cached["hash"],
+            cached["content"],
+        )
+        assert read_project(cache=state).default_db == "warehouse"
+
+        Path("project.yaml").write_text(project_yaml.replace("warehouse", "db"))
+        os.utime("project.yaml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert read_project(cache=state).default_db == "db"
+
+        groups = read_groups(cache=state)
+        assert groups["base"].tasks == {
+            "test_sql": {"type": "sql", "file_name": "test.sql"}
+        }
+        assert read_groups(cache=state)["base"].tasks == groups["base"].tasks
+
+
+def test_tasks_dict_cache(tmp_path):
+    base_yaml = """
+    tasks:
+        task1:
+            type: sql
+            file_name: task1.sql
+    """
+
+    project_yaml = """
+    required_credentials:
+      - warehouse
+
+    groups:
+      models:
+        type: autosql
+        file_name: "models/*.sql"
+        materialisation: table
+    """
+
+    with inside_dir(tmp_path, {"sql/models/task2.sql": "SELECT 1"}):
+        setup_project_and_tasks(project_yaml=project_yaml, base_yaml=base_yaml)
+        state = StateStore(".sayn")
+        compiler = Compiler(RunArguments(), dict(), dict())
+
+        def get_tasks():
+            project = read_project(cache=state)
+            return get_tasks_dict(
+                dict(),
+                read_groups(cache=state),
+                project.autogroups,
+                "sql",
+                compiler,
+                None,
+                cache=state,
+            ).value
+
+        tasks = get_tasks()
+        assert set(tasks.keys()) == {"task1", "task2"}
+        assert get_tasks() == tasks
+
+        # New files in the sql folder are picked by autogroups
+        Path("sql/models/task3.sql").write_text("SELECT 1")
+        assert set(get_tasks().keys()) == {"task1", "task2", "task3"}
+
+
+def test_read_groups_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(yaml, "parallel_min_files", 2)
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    groups = {
+        f"tasks/group{i}.yaml": f"tasks:\n  task{i}:\n    type: sql\n" for i in range(4)
+    }
+
+    with inside_dir(tmp_path, groups):
+        timings = dict()
+        groups_read = read_groups(cache=StateStore(".sayn"), timings=timings)
+        assert list(groups_read.keys()) == [f"group{i}" for i in range(4)]
+        assert groups_read["group2"].tasks == {"task2": {"type": "sql"}}
+        assert len(timings) == 4
+
+        # Only changed files are parsed again
+        timings = dict()
+        Path("tasks/group1.yaml").write_text("tasks:\n  task1:\n    type: autosql\n")
+        assert read_groups(cache=StateStore(".sayn"), timings=timings)[
+            "group1"
+        ].tasks == {"task1": {"type": "autosql"}}
+        assert list(timings.keys()) == [Path("tasks/group1.yaml")]
+
+        Path("tasks/group3.yaml").write_text("tasks: []\nwrong: 1\n")
+        Path("tasks/group2.yaml").write_text("tasks:\n  - task2\n")
+        with pytest.raises(SaynParsingError) as exc:
+            read_groups(cache=StateStore(".sayn"))
+
+        # Errors are reported for the first file, with the position of the wrong key
+        assert exc.value.code == "data_validation"
+        assert exc.value.errors[0]["file_name"] == str(Path("tasks/group2.yaml"))
+        assert exc.value.errors[0]["line"] == 1
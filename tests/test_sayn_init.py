@@ -1,8 +1,12 @@
 from pathlib import Path
+import re
+import subprocess
 
 
 import pytest
 
+from sayn.core.state import StateStore
+
 from . import inside_dir, run_sayn
 
 
@@ -38,3 +42,78 @@ def test_sayn_run_prod(tmp_root_path):
         run_sayn("run", "-p", "prod")
 
         assert Path("prod.db").exists()
+
+
+def test_sayn_run_threads(tmp_root_path):
+    with inside_dir(str(tmp_root_path / project_name)):
+        run_sayn("run", "--threads", "4")
+
+        assert Path("dev.db").exists()
+
+
+def test_sayn_run_resume(tmp_root_path):
+    with inside_dir(str(tmp_root_path / project_name)):
+        output = run_sayn("run", "-t", "group:models").decode("utf-8")
+        run_id = re.search(r"Run ID: ([0-9a-f-]+)", output).group(1)
+
+        # All tasks succeeded in the first run, so there's nothing left to execute
+        output = run_sayn("run", "--resume", run_id).decode("utf-8")
+        assert f"Resuming run: {run_id}" in output
+        assert "Total tasks: 0" in output
+
+        with pytest.raises(subprocess.CalledProcessError):
+            run_sayn("run", "--resume", "missing")
+
+
+def test_sayn_run_skip_unchanged(tmp_root_path):
+    with inside_dir(str(tmp_root_path / project_name)):
+        run_sayn("run", "--skip-unchanged")
+        output = run_sayn("run", "-d", "--skip-unchanged").decode("utf-8")
+        assert output.count("Unchanged since the last successful run") == 6
+
+        # Changes to a task are propagated downstream
+        sql = Path("sql", "dim_arenas.sql")
+        sql.write_text(sql.read_text() + "\n")
+        output = run_sayn("run", "-d", "--skip-unchanged").decode("utf-8")
+        assert output.count("Unchanged since the last successful run") == 2
+
+
+def test_sayn_compile_threads_output_order(tmp_root_path):
+    with inside_dir(str(tmp_root_path / project_name)):
+        output = run_sayn("compile", "-d", "--threads", "4").decode("utf-8")
+
+        lines = output.split("\n")
+        start = lines.index("Configuring Project...") + 1
+        config = lines[start : start + 12]
+
+        # Events from tasks configured concurrently are not interleaved
+        assert all("✔" not in l for l in config[::2])
+        assert all("✔" in l for l in config[1::2])
+
+
+def test_sayn_run_connection_timings(tmp_root_path):
+    with inside_dir(str(tmp_root_path / project_name)):
+        output = run_sayn("run", "-d").decode("utf-8")
+
+        assert re.search(
+            r"Connection warehouse ready \(.+\), introspection \(.+\)", output
+        )
+
+
+def test_sayn_task_edges_cache(tmp_path):
+    with inside_dir(str(tmp_path)):
+        run_sayn("init", project_name)
+
+    with inside_dir(str(tmp_path / project_name)):
+        run_sayn("compile")
+        edges = StateStore(Path(".sayn")).get_task_edges()
+        assert len(edges) == 6
+
+        # Edges found when compiling are reused when running
+        run_sayn("run")
+        assert StateStore(Path(".sayn")).get_task_edges() == edges
+
+        # Removed tasks are removed from the cache
+        Path("sql", "f_rankings.sql").unlink()
+        run_sayn("compile")
+        assert "f_rankings" not in StateStore(Path(".sayn")).get_task_edges()
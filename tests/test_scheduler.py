@@ -0,0 +1,291 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sayn.core.errors import Err, Ok
+from sayn.core.scheduler import Scheduler
+from sayn.database.creator import create as create_db
+
+
+class FakeTask:
+    def __init__(self, name, parents=None, used_connections=None):
+        self.name = name
+        self.parents = parents or list()
+        self.used_connections = used_connections or set()
+        self.fail_fast = False
+
+
+def get_tasks(dag):
+    tasks = dict()
+    for name, parents in dag.items():
+        tasks[name] = FakeTask(name, [tasks[p] for p in parents])
+    return tasks
+
+
+def test_sequential_order():
+    tasks = get_tasks({"task1": [], "task2": [], "task3": ["task1"], "task4": []})
+    executed = list()
+
+    def func(task):
+        executed.append(task.name)
+        return Ok()
+
+    Scheduler(tasks, threads=1).run(func)
+
+    assert executed == ["task1", "task2", "task3", "task4"]
+
+
+def test_parallel_respects_parents():
+    tasks = get_tasks(
+        {
+            "task1": [],
+            "task2": [],
+            "task3": ["task1"],
+            "task4": ["task2", "task3"],
+            "task5": [],
+        }
+    )
+    finished = set()
+    errors = list()
+    lock = threading.Lock()
+
+    def func(task):
+        with lock:
+            for parent in task.parents:
+                if parent.name not in finished:
+                    errors.append(task.name)
+        time.sleep(0.01)
+        with lock:
+            finished.add(task.name)
+        return Ok()
+
+    results = Scheduler(tasks, threads=4).run(func)
+
+    assert len(errors) == 0
+    assert set(results.keys()) == set(tasks.keys())
+
+
+def test_parallel_concurrency():
+    tasks = get_tasks({f"task{i}": [] for i in range(8)})
+    running = list()
+    max_running = list()
+    lock = threading.Lock()
+
+    def func(task):
+        with lock:
+            running.append(task.name)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(task.name)
+        return Ok()
+
+    Scheduler(tasks, threads=4).run(func)
+
+    assert max(max_running) == 4
+
+
+def test_parents_outside_query():
+    all_tasks = get_tasks({"task1": [], "task2": ["task1"]})
+    tasks = {"task2": all_tasks["task2"]}
+    executed = list()
+
+    def func(task):
+        executed.append(task.name)
+        return Ok()
+
+    Scheduler(tasks, threads=2).run(func)
+
+    assert executed == ["task2"]
+
+
+def test_connection_limits():
+    tasks = get_tasks({f"task{i}": [] for i in range(6)})
+    for i, task in enumerate(tasks.values()):
+        task.used_connections = {"db1"} if i % 2 == 0 else {"db1", "db2"}
+
+    running = {"db1": 0, "db2": 0}
+    max_running = {"db1": 0, "db2": 0}
+    waits = list()
+    lock = threading.Lock()
+
+    def func(task):
+        with lock:
+            for c in task.used_connections:
+                running[c] += 1
+                max_running[c] = max(max_running[c], running[c])
+        time.sleep(0.02)
+        with lock:
+            for c in task.used_connections:
+                running[c] -= 1
+        return Ok()
+
+    scheduler = Scheduler(tasks, threads=4, connection_limits={"db1": 2, "db2": 1})
+    scheduler.report_wait = lambda task, connections, duration: waits.append(
+        (task.name, connections)
+    )
+    results = scheduler.run(func)
+
+    assert set(results.keys()) == set(tasks.keys())
+    assert max_running == {"db1": 2, "db2": 1}
+    assert len(waits) > 0
+
+
+def test_invalid_max_concurrency():
+    for value in (0, -1, "2", True):
+        with pytest.raises(ValueError):
+            create_db("db", "db", {"type": "sqlite", "max_concurrency": value})
+
+
+def test_fail_fast():
+    tasks = get_tasks({"task1": [], "task2": ["task1"], "task3": []})
+
+    def func(task):
+        if task.name == "task1":
+            return Err("tasks", "task_fail", message="failed")
+        return Ok()
+
+    Scheduler(tasks, threads=1, fail_fast=True).run(func)
+
+    assert not tasks["task1"].fail_fast
+    assert tasks["task2"].fail_fast
+    assert tasks["task3"].fail_fast
+
+
+def test_critical_path_priority():
+    tasks = get_tasks(
+        {
+            "task1": [],
+            "task2": [],
+            "task3": ["task2"],
+            "task4": ["task3"],
+            "task5": [],
+        }
+    )
+    durations = {"task1": 5, "task2": 1, "task3": 10, "task4": 1}
+    started = list()
+    lock = threading.Lock()
+
+    def func(task):
+        with lock:
+            started.append(task.name)
+        time.sleep(0.02)
+        return Ok()
+
+    scheduler = Scheduler(tasks, threads=2, durations=durations)
+    scheduler.run(func)
+
+    # task5 has no recorded duration, so it's given the average (4.25)
+    assert scheduler.critical_path == {
+        "task1": 5,
+        "task2": 12,
+        "task3": 11,
+        "task4": 1,
+        "task5": 4.25,
+    }
+    assert started[:2] == ["task2", "task1"]
+
+
+def test_critical_path_sequential():
+    tasks = get_tasks({"task1": [], "task2": []})
+    executed = list()
+
+    def func(task):
+        executed.append(task.name)
+        return Ok()
+
+    Scheduler(tasks, threads=1, durations={"task1": 1, "task2": 10}).run(func)
+
+    assert executed == ["task1", "task2"]
+
+
+def test_external_parents():
+    # x1 and x2 depend on task b from another shard, which needs task a from this one
+    b = FakeTask("b")
+    tasks = {
+        "x1": FakeTask("x1", [b]),
+        "x2": FakeTask("x2", [b]),
+        "a": FakeTask("a"),
+    }
+
+    for threads in (1, 2):
+        started = list()
+        waits = list()
+        lock = threading.Lock()
+
+        def func(task):
+            with lock:
+                started.append(task.name)
+            time.sleep(0.02)
+            return Ok()
+
+        def poll_external(names):
+            assert names == {"b"}
+            return {"b"} if "a" in started else set()
+
+        scheduler = Scheduler(
+            tasks,
+            threads=threads,
+            durations={"x1": 10, "x2": 10, "a": 1},
+            external_parents={"x1": {"b"}, "x2": {"b"}},
+            poll_external=poll_external,
+            poll_interval=0.01,
+        )
+        scheduler.report_external_wait = lambda task, names, duration: waits.append(
+            (task.name, names)
+        )
+        results = scheduler.run(func)
+
+        # Tasks waiting on other shards don't take the threads needed by a
+        assert started[0] == "a"
+        assert set(results.keys()) == {"a", "x1", "x2"}
+        assert sorted(waits) == [("x1", ["b"]), ("x2", ["b"])]
+
+
+def test_coroutines_dont_use_threads():
+    tasks = get_tasks({f"task{i}": [] for i in range(20)})
+    tasks["sync"] = FakeTask("sync")
+    for name, task in tasks.items():
+        task.is_coroutine = name != "sync"
+
+    running = {"current": 0, "max": 0}
+    loop_threads = set()
+
+    def func(task):
+        return Ok()
+
+    async def coroutine_func(task):
+        loop_threads.add(threading.get_ident())
+        running["current"] += 1
+        running["max"] = max(running["max"], running["current"])
+        await asyncio.sleep(0.05)
+        running["current"] -= 1
+        return Ok()
+
+    results = Scheduler(tasks, threads=2).run(func, coroutine_func=coroutine_func)
+
+    assert len(results) == 21
+    assert all(r.is_ok for r in results.values())
+    assert running["max"] == 20
+    assert len(loop_threads) == 1
+
+
+def test_coroutines_sequential():
+    tasks = get_tasks({"task1": [], "task2": ["task1"], "task3": []})
+    tasks["task2"].is_coroutine = True
+    executed = list()
+
+    def func(task):
+        executed.append(task.name)
+        return Ok()
+
+    async def coroutine_func(task):
+        await asyncio.sleep(0)
+        executed.append(task.name)
+        return Ok()
+
+    Scheduler(tasks, threads=1).run(func, coroutine_func=coroutine_func)
+
+    assert executed == ["task1", "task2", "task3"]
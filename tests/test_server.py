@@ -0,0 +1,135 @@
+from datetime import datetime
+import http.client
+import json
+from pathlib import Path
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from sayn.server import commands, parse_arguments
+
+from . import create_project
+
+
+def test_parse_arguments():
+    _, allowed = commands["/run"]
+    assert parse_arguments("", allowed) == dict()
+    assert parse_arguments(
+        json.dumps(
+            {
+                "tasks": ["t1 t2", "tag:x"],
+                "exclude": "t3",
+                "start_dt": "2021-01-01",
+                "threads": 2,
+                "full_load": True,
+            }
+        ),
+        allowed,
+    ) == {
+        "include": ["t1", "t2", "tag:x"],
+        "exclude": ["t3"],
+        "start_dt": datetime(2021, 1, 1),
+        "threads": 2,
+        "full_load": True,
+    }
+
+    for body in (
+        "[]",
+        "{",
+        '{"unknown": 1}',
+        '{"tasks": 1}',
+        '{"start_dt": "01/01/2021"}',
+        '{"threads": 0}',
+        '{"full_load": "yes"}',
+    ):
+        with pytest.raises(ValueError):
+            parse_arguments(body, allowed)
+
+    # skip_unchanged only applies to run
+    with pytest.raises(ValueError):
+        parse_arguments('{"skip_unchanged": true}', commands["/test"][1])
+
+
+settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  models:
+    type: autosql
+    file_name: "*.sql"
+    materialisation: table
+    destination:
+      table: "{{ task.name }}"
+"""
+
+
+def request(port, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    connection.request("POST", path, body=json.dumps(body) if body else None)
+    response = connection.getresponse()
+    content = response.read().decode("utf-8")
+    connection.close()
+    if response.status != 200:
+        return response.status, json.loads(content)
+    return response.status, [json.loads(l) for l in content.splitlines()]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Sends SIGINT to the process")
+def test_serve(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        Path("sql").mkdir()
+        Path("sql", "t1.sql").write_text("SELECT 1 AS x")
+        Path("sql", "t2.sql").write_text("SELECT x FROM {{ src('t1') }}")
+
+        process = subprocess.Popen(
+            ["sayn", "serve", "--port", "0"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            port = int(
+                re.search(r":(\d+) ", process.stdout.readline().decode()).group(1)
+            )
+
+            assert request(port, "/unknown")[0] == 404
+            assert request(port, "/run", {"tasks": 1})[0] == 400
+
+            status, lines = request(port, "/run", {"debug": True})
+            assert status == 200
+            assert lines[-1] == {"exit_code": 0}
+            assert any("Tasks executed: t1, t2" in l["message"] for l in lines[:-1])
+
+            # Changes to the project are picked up by the next request
+            Path("sql", "t1.sql").write_text("SELECT 2 AS x")
+            status, lines = request(port, "/run", {"tasks": "t1+"})
+            assert lines[-1] == {"exit_code": 0}
+            assert not any(l["level"] == "debug" for l in lines[:-1])
+
+            status, lines = request(port, "/test")
+            assert lines[-1] == {"exit_code": 0}
+        finally:
+            process.send_signal(signal.SIGINT)
+            process.communicate(timeout=30)
+
+        assert process.returncode == 0
+        with sqlite3.connect("test.db") as conn:
+            assert [r[0] for r in conn.execute("SELECT x FROM t2")] == [2]
@@ -64,6 +64,7 @@ credentials:
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
@@ -95,6 +96,7 @@ credentials:
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
@@ -208,6 +210,7 @@ def test_env_01(tmpdir):
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
@@ -232,6 +235,7 @@ def test_env_02(tmpdir):
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
@@ -256,6 +260,7 @@ def test_env_03(tmpdir):
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
@@ -280,6 +285,7 @@ def test_env_04(tmpdir):
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
@@ -310,6 +316,49 @@ def test_env_05(tmpdir):
                     "include": set(),
                     "exclude": set(),
                     "upstream_prod": None,
+                    "threads": None,
                 },
             },
         )
+
+
+def test_default_run_threads(tmpdir):
+    settings_yaml = """
+profiles:
+  dev:
+    credentials:
+      warehouse: dev_db
+    default_run: -x group:extract --threads 8
+
+credentials:
+  dev_db:
+    type: sqlite
+    database: dev.db
+"""
+
+    with create_project(tmpdir, settings=settings_yaml):
+        settings = get_settings_dict()
+        assert settings["default_run"] == {
+            "include": set(),
+            "exclude": {"group:extract"},
+            "upstream_prod": None,
+            "threads": 8,
+        }
+
+
+def test_default_run_threads_err(tmpdir):
+    settings_yaml = """
+profiles:
+  dev:
+    credentials:
+      warehouse: dev_db
+    default_run: --threads 0
+
+credentials:
+  dev_db:
+    type: sqlite
+    database: dev.db
+"""
+
+    with create_project(tmpdir, settings=settings_yaml):
+        assert read_settings().is_err
@@ -0,0 +1,155 @@
+from pathlib import Path
+import sqlite3
+import subprocess
+
+from sayn.core.shards import ShardStore, partition
+
+from . import create_project
+
+
+def test_partition_components():
+    # Two independent chains and a single task are never split
+    parents = {
+        "a1": [],
+        "a2": ["a1"],
+        "b1": [],
+        "b2": ["b1"],
+        "c1": [],
+    }
+    durations = {"a1": 5, "a2": 5, "b1": 4, "b2": 4, "c1": 2}
+    plan = partition(list(parents.keys()), parents, durations, 2)
+
+    assert plan["a1"] == plan["a2"]
+    assert plan["b1"] == plan["b2"]
+    assert plan["a1"] != plan["b1"]
+    assert plan["c1"] == plan["b1"]
+
+
+def test_partition_split():
+    # A single component larger than a shard is split, keeping chains together
+    parents = {"root": []}
+    parents.update({f"left{i}": ["root"] for i in range(1)})
+    parents.update({f"left{i}": [f"left{i - 1}"] for i in range(1, 4)})
+    parents.update({"right0": ["root"]})
+    parents.update({f"right{i}": [f"right{i - 1}"] for i in range(1, 4)})
+    tasks = ["root"] + [f"left{i}" for i in range(4)] + [f"right{i}" for i in range(4)]
+    plan = partition(tasks, parents, dict(), 2)
+
+    loads = {1: 0, 2: 0}
+    for shard in plan.values():
+        loads[shard] += 1
+    assert abs(loads[1] - loads[2]) <= 1
+
+    cross_edges = [(t, p) for t in tasks for p in parents[t] if plan[t] != plan[p]]
+    assert len(cross_edges) == 1
+
+
+def test_shard_store(tmp_path):
+    store1 = ShardStore(tmp_path / "shards.db")
+    store2 = ShardStore(tmp_path / "shards.db")
+
+    assert store1.get_plan("key", 1, lambda: {"task1": 1, "task2": 2}) == (
+        {"task1": 1, "task2": 2},
+        1,
+    )
+    # The plan is only created once per generation
+    assert store2.get_plan("key", 2, lambda: {"task1": 2, "task2": 1}) == (
+        {"task1": 1, "task2": 2},
+        1,
+    )
+
+    store1.set_status("key", 1, "task1", "succeeded")
+    assert store2.get_statuses("key", 1, ["task1", "task2"]) == {"task1": "succeeded"}
+
+    store2.finish_shard("key", 1, 2)
+    assert store1.get_finished_shards("key", 1) == {2}
+
+    # A shard starting again with the same key starts a new generation
+    assert store1.get_plan("key", 1, lambda: {"task1": 2, "task2": 1}) == (
+        {"task1": 2, "task2": 1},
+        2,
+    )
+    assert store2.get_plan("key", 2, lambda: dict()) == ({"task1": 2, "task2": 1}, 2)
+    assert store1.get_finished_shards("key", 2) == set()
+    assert store2.get_statuses("key", 2, ["task1", "task2"]) == dict()
+
+    # Shards still running from the previous generation don't affect the new one
+    store1.set_status("key", 1, "task2", "failed")
+    store2.finish_shard("key", 1, 1)
+    assert store2.get_statuses("key", 2, ["task1", "task2"]) == dict()
+    assert store1.get_finished_shards("key", 2) == set()
+
+
+settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  models:
+    type: autosql
+    file_name: "*.sql"
+    materialisation: table
+    destination:
+      table: "{{ task.name }}"
+"""
+
+
+def test_run_shards(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        Path("sql").mkdir()
+        Path("sql", "t1.sql").write_text("SELECT 1 AS x")
+        Path("sql", "t2.sql").write_text("SELECT 2 AS x")
+        Path("sql", "t3.sql").write_text(
+            "SELECT x FROM {{ src('t1') }} UNION ALL SELECT x FROM {{ src('t2') }}"
+        )
+
+        def run_shards():
+            shards = [
+                subprocess.Popen(
+                    ["sayn", "run", "-d", "--shard", f"{i}/2"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                )
+                for i in (1, 2)
+            ]
+            outputs = [
+                shard.communicate(timeout=120)[0].decode("utf-8") for shard in shards
+            ]
+            assert all(shard.returncode == 0 for shard in shards)
+            return outputs
+
+        outputs = run_shards()
+        assert "Shard: 1/2" in outputs[0]
+        assert "Shard: 2/2" in outputs[1]
+        assert "waited" in "".join(outputs)
+
+        with sqlite3.connect("test.db") as conn:
+            assert sorted(r[0] for r in conn.execute("SELECT x FROM t3")) == [1, 2]
+
+        compiled = {p.as_posix() for p in Path("compile").rglob("*.sql")}
+        assert len(compiled) > 0
+
+        # Running again with the same arguments doesn't reuse the statuses of the first run
+        Path("sql", "t1.sql").write_text("SELECT 3 AS x")
+        Path("compile", "stale.sql").write_text("SELECT 0")
+        run_shards()
+
+        # The last shard to finish removes files not written by any shard
+        assert {p.as_posix() for p in Path("compile").rglob("*.sql")} == compiled
+
+        with sqlite3.connect("test.db") as conn:
+            assert sorted(r[0] for r in conn.execute("SELECT x FROM t3")) == [2, 3]
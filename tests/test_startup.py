@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+from sayn.database.creator import create as create_db
+
+
+def import_times(module):
+    """Returns the cumulative import time in microseconds of each module imported by module"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+
+    times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_cli_import_time():
+    times = import_times("sayn.cli")
+
+    # Database drivers are imported when a credential of its type is used
+    drivers = ("bigquery", "mysql", "postgresql", "redshift", "snowflake", "sqlite")
+    assert not any(f"sayn.database.{d}" in times for d in drivers)
+
+    # halo imports IPython when a spinner is created
+    assert "IPython" not in times
+
+    # A generous budget to catch imports of heavy dependencies on start up
+    assert times["sayn.cli"] < 2_000_000
+
+
+def test_driver_loaded_on_use(tmp_path):
+    db = create_db("db", "db", {"type": "sqlite", "database": str(tmp_path / "t.db")})
+    assert type(db).__module__ == "sayn.database.sqlite"
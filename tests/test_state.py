@@ -0,0 +1,226 @@
+from pathlib import Path
+import re
+import sqlite3
+
+from sayn.core.state import StateStore
+
+from . import create_project, run_sayn
+
+
+def test_durations(tmp_path):
+    state = StateStore(tmp_path / ".sayn")
+    assert state.get_durations("run") == dict()
+
+    state.set_duration("run", "task1", 1.5)
+    state.set_duration("run", "task1", 2.5)
+    state.set_duration("test", "task1", 0.5)
+    state.close()
+
+    state = StateStore(tmp_path / ".sayn")
+    assert state.get_durations("run") == {"task1": 2.5}
+    assert state.get_durations("test") == {"task1": 0.5}
+
+
+def test_unavailable_store(tmp_path):
+    (tmp_path / ".sayn").write_text("")
+    state = StateStore(tmp_path / ".sayn")
+
+    state.set_duration("run", "task1", 1.5)
+    assert state.get_durations("run") == dict()
+
+
+def test_runs(tmp_path):
+    state = StateStore(tmp_path / ".sayn")
+    assert state.get_run("run1") is None
+
+    state.start_run(
+        "run1",
+        "run",
+        {"start_dt": "2024-01-01", "include": ["group:models"]},
+        {"task1": "ready", "task2": "ready"},
+    )
+    state.set_task_status("run1", "task1", "succeeded")
+    state.set_task_status("run1", "task2", "failed")
+
+    assert state.get_run("run1") == {
+        "command": "run",
+        "arguments": {"start_dt": "2024-01-01", "include": ["group:models"]},
+        "tasks": {"task1": "succeeded", "task2": "failed"},
+    }
+
+
+def test_fingerprints(tmp_path):
+    state = StateStore(tmp_path / ".sayn")
+    assert state.get_fingerprints() == dict()
+
+    state.set_fingerprint("task1", "abc")
+    state.set_fingerprint("task1", "def")
+    state.set_fingerprint("task2", "ghi")
+
+    assert state.get_fingerprints() == {"task1": "def", "task2": "ghi"}
+
+
+def test_task_edges(tmp_path):
+    state = StateStore(tmp_path / ".sayn")
+    assert state.get_task_edges() == dict()
+
+    entry = {
+        "cache_key": "abc",
+        "files": {"sql/task1.sql": "def"},
+        "edges": {"parents": ["task0"], "sources": [], "outputs": []},
+    }
+    state.set_task_edges({"task1": entry})
+    state.set_task_edges({"task1": dict(entry, cache_key="ghi")})
+
+    assert StateStore(tmp_path / ".sayn").get_task_edges() == {
+        "task1": dict(entry, cache_key="ghi")
+    }
+
+    state.set_task_edges({"task2": entry})
+    state.delete_task_edges(["task1"])
+    assert state.get_task_edges() == {"task2": entry}
+
+
+settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  models:
+    type: autosql
+    file_name: "models/*.sql"
+    materialisation: table
+    destination:
+      table: "{{ task.name }}"
+"""
+
+
+def configured_tasks(output):
+    config = output.decode("utf-8").split("Finished project config")[0]
+    return set(re.findall(r"^  (\w+)$", config, re.MULTILINE))
+
+
+def executed_tasks(output):
+    line = re.search(r"Tasks executed: (.*)", output.decode("utf-8")).group(1)
+    return {t.strip() for t in line.split(",") if len(t.strip()) > 0}
+
+
+def test_cached_edges(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        Path("sql", "models").mkdir(parents=True)
+        Path("sql", "macros.sql").write_text("{% macro one() %}1{% endmacro %}")
+        Path("sql", "models", "t1.sql").write_text("SELECT 1 AS x")
+        Path("sql", "models", "t2.sql").write_text(
+            "{% from 'sql/macros.sql' import one %}"
+            "SELECT {{ one() }} AS x FROM {{ src('t1') }}"
+        )
+        Path("sql", "models", "t3.sql").write_text("SELECT x FROM {{ src('t2') }}")
+
+        output = run_sayn("run", "-d")
+        assert configured_tasks(output) == {"t1", "t2", "t3"}
+
+        # Only the selected tasks are configured, the rest use the edges from the last run
+        output = run_sayn("run", "-d", "-t", "t3")
+        assert configured_tasks(output) == {"t3"}
+
+        output = run_sayn("run", "-d", "-t", "t1+")
+        assert configured_tasks(output) == {"t1", "t2", "t3"}
+        assert executed_tasks(output) == {"t1", "t2", "t3"}
+
+        # Changes to imported templates invalidate the cache
+        Path("sql", "macros.sql").write_text("{% macro one() %}2{% endmacro %}")
+        output = run_sayn("run", "-d", "-t", "t3")
+        assert configured_tasks(output) == {"t2", "t3"}
+
+
+skip_settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+      source: source_db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+  source_db:
+    type: sqlite
+    database: source.db
+"""
+
+skip_project = """
+required_credentials:
+  - warehouse
+  - source
+
+default_db: warehouse
+"""
+
+skip_tasks = """
+tasks:
+  plain_sql:
+    type: sql
+    file_name: plain_sql.sql
+    materialisation: script
+
+  copied:
+    type: copy
+    source:
+      db: source
+      table: source_table
+    destination:
+      table: copied
+
+  model:
+    type: autosql
+    file_name: model.sql
+    materialisation: table
+    destination:
+      table: model
+"""
+
+
+def test_skip_unchanged_task_types(tmp_path):
+    with create_project(tmp_path, settings=skip_settings, project=skip_project):
+        Path("sql").mkdir()
+        Path("sql", "plain_sql.sql").write_text("SELECT 1")
+        Path("sql", "model.sql").write_text("SELECT 1 AS x")
+        Path("tasks").mkdir()
+        Path("tasks", "models.yaml").write_text(skip_tasks)
+        with sqlite3.connect("source.db") as conn:
+            conn.execute("CREATE TABLE source_table (x INTEGER)")
+            conn.execute("INSERT INTO source_table VALUES (1)")
+
+        # Script sql tasks and copy tasks have no fingerprint
+        output = run_sayn("run").decode("utf-8")
+        executed = re.search(r"Tasks executed: (.*)", output).group(1).strip()
+        assert set(executed.split(", ")) == {"plain_sql", "copied", "model"}
+
+        run_sayn("run", "--skip-unchanged")
+        state = StateStore(".sayn")
+        durations = state.get_durations("run")
+        state.close()
+
+        output = run_sayn("run", "-d", "--skip-unchanged").decode("utf-8")
+        assert output.count("Unchanged since the last successful run") == 1
+        assert "Unchanged, skipped" in output
+
+        # The duration of the skipped task is kept from its last execution
+        state = StateStore(".sayn")
+        assert state.get_durations("run")["model"] == durations["model"]
+        state.close()
@@ -1,7 +1,7 @@
 from pathlib import Path
 
 from sayn.utils.python_loader import PythonLoader
-from . import inside_dir
+from . import create_project, inside_dir, run_sayn
 
 # utils
 
@@ -50,3 +50,79 @@ def test_python_task_err2(tmp_path):
         assert python_loader.get_class(
             "python_tasks", "test_python.TestPythonErr"
         ).is_err
+
+
+def test_python_reload(tmp_path):
+    with inside_dir(tmp_path):
+        initiate_python_setup(module="mod", module_content="class Task:\n    value = 1")
+        python_loader = PythonLoader()
+        assert python_loader.register_module("python_tasks", "python").is_ok
+        assert python_loader.get_class("python_tasks", "mod.Task").value.value == 1
+
+        # Modules are registered per loader and imported again in every registration
+        Path("python", "mod.py").write_text("class Task:\n    value = 2")
+        assert not PythonLoader().has_module("sayn_python_tasks")
+        python_loader = PythonLoader()
+        assert python_loader.register_module("python_tasks", "python").is_ok
+        assert python_loader.get_class("python_tasks", "mod.Task").value.value == 2
+
+
+async_settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+async_project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  decorated:
+    type: python
+    module: async_tasks
+"""
+
+async_module = """
+import asyncio
+
+from sayn import PythonTask, task
+
+
+@task()
+async def async_decorated(context):
+    with context.step("Wait"):
+        await asyncio.sleep(0.01)
+    context.info("Decorated coroutine done")
+
+
+class AsyncClass(PythonTask):
+    async def run(self):
+        with self.step("Wait"):
+            await asyncio.sleep(0.01)
+        self.info("Class coroutine done")
+        return self.success()
+"""
+
+
+def test_python_coroutines(tmp_path):
+    with create_project(tmp_path, settings=async_settings, project=async_project):
+        Path("tasks").mkdir()
+        Path("tasks", "classes.yaml").write_text(
+            "tasks:\n  async_class:\n    type: python\n    class: async_tasks.AsyncClass\n"
+        )
+        initiate_python_setup(module="async_tasks", module_content=async_module)
+        for threads in ("1", "4"):
+            output = run_sayn("run", "-d", "--threads", threads).decode("utf-8")
+            assert "Decorated coroutine done" in output
+            assert "Class coroutine done" in output
+            assert "Wait" in output
+            assert "FAILED" not in output
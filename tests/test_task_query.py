@@ -1,6 +1,6 @@
 import pytest
 
-from sayn.utils.task_query import get_query
+from sayn.utils.task_query import get_query, uses_state
 
 
 tasks = {
@@ -188,3 +188,60 @@ def test_full_query03():
             "downstream": False,
         },
     ]
+
+
+def test_glob():
+    assert get_query(tasks, include=["task[12]", "+task?+"]).value == [
+        {
+            "operation": "include",
+            "task": f"task{i}",
+            "upstream": True,
+            "downstream": True,
+        }
+        for i in range(1, 8)
+    ]
+    assert get_query(tasks, include=["task_*"]).is_err
+    # Globs are case sensitive on every platform
+    assert get_query(tasks, include=["TASK?"]).is_err
+
+
+def test_query_file(tmp_path):
+    query_file = tmp_path / "query.txt"
+    query_file.write_text("# selection\ntask1 task2\n\ntag:tag2\n")
+    assert get_query(tasks, include=[f"@{query_file}"], exclude=["task5"]).value == [
+        {"operation": "include", "task": t, "upstream": False, "downstream": False}
+        for t in ("task1", "task2", "task5")
+    ] + [
+        {
+            "operation": "exclude",
+            "task": "task5",
+            "upstream": False,
+            "downstream": False,
+        }
+    ]
+
+    result = get_query(tasks, include=[f"@{tmp_path / 'missing.txt'}"])
+    assert result.is_err and result.error.code == "missing_file"
+
+
+def test_uses_state(tmp_path):
+    query_file = tmp_path / "query.txt"
+    query_file.write_text("task1\nstate:modified+\n")
+    assert uses_state(["task1", "+state:modified"]).value
+    assert not uses_state(["task1"], ["tag:tag1"]).value
+    assert uses_state(["task2"], [f"@{query_file}"]).value
+    assert uses_state([f"@{tmp_path / 'missing.txt'}"]).is_err
+
+
+def test_many_selectors():
+    many_tasks = {
+        f"task{i}": {"group": f"group{i % 100}", "tags": [f"tag{i % 50}"]}
+        for i in range(10000)
+    }
+    include = [f"tag:tag{i}" for i in range(0, 50, 2)] + [
+        f"group:group{i}" for i in range(100)
+    ]
+    include += [f"task{i}+" for i in range(0, 10000, 10)]
+    result = get_query(many_tasks, include=include)
+    assert result.is_ok
+    assert len(result.value) == 10000
@@ -0,0 +1,112 @@
+from pathlib import Path
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from sayn.core.watcher import FileWatcher
+
+from . import create_project, inside_dir
+
+
+def test_file_watcher(tmp_path):
+    with inside_dir(tmp_path, {"sql/t1.sql": "SELECT 1", "sql/.hidden": "x"}):
+        watcher = FileWatcher(["project.yaml", "sql"])
+        assert watcher.changes() == set()
+
+        Path("sql", "t1.sql").write_text("SELECT 10")
+        Path("sql", "sub").mkdir()
+        Path("sql", "sub", "t2.sql").write_text("SELECT 2")
+        Path("sql", ".hidden").write_text("xx")
+        Path("project.yaml").write_text("")
+        assert watcher.changes() == {"sql/t1.sql", "sql/sub/t2.sql", "project.yaml"}
+        assert watcher.changes() == set()
+
+        Path("sql", "t1.sql").unlink()
+        assert watcher.changes() == {"sql/t1.sql"}
+
+
+settings = """
+profiles:
+  dev:
+    credentials:
+      warehouse: db
+
+credentials:
+  db:
+    type: sqlite
+    database: test.db
+"""
+
+project = """
+required_credentials:
+  - warehouse
+
+default_db: warehouse
+
+groups:
+  models:
+    type: autosql
+    file_name: "models/*.sql"
+    materialisation: view
+    destination:
+      table: "{{ task.name }}"
+"""
+
+
+def wait_for(condition, timeout=30):
+    start = time.time()
+    while not condition():
+        assert time.time() - start < timeout
+        time.sleep(0.1)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Sends SIGINT to the process")
+def test_compile_watch(tmp_path):
+    with create_project(tmp_path, settings=settings, project=project):
+        Path("sql", "models").mkdir(parents=True)
+        Path("sql", "macros.sql").write_text("{% macro one() %}1{% endmacro %}")
+        Path("sql", "models", "t1.sql").write_text("SELECT 1 AS x")
+        Path("sql", "models", "t2.sql").write_text(
+            "{% from 'sql/macros.sql' import one %}"
+            "SELECT {{ one() }} AS x FROM {{ src('t1') }}"
+        )
+        Path("sql", "models", "t3.sql").write_text("SELECT x FROM {{ src('t2') }}")
+
+        process = subprocess.Popen(
+            ["sayn", "compile", "-d", "--watch"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            t3 = Path("compile", "models", "t3_create_view.sql")
+            wait_for(t3.exists)
+            t1_mtime = (
+                Path("compile", "models", "t1_create_view.sql").stat().st_mtime_ns
+            )
+            t3_mtime = t3.stat().st_mtime_ns
+            time.sleep(1)
+
+            # Changing a macro compiles again the tasks using it and their downstream tasks
+            Path("sql", "macros.sql").write_text("{% macro one() %}22{% endmacro %}")
+            t2 = Path("compile", "models", "t2_select.sql")
+            wait_for(lambda: "SELECT 22 AS x" in t2.read_text())
+            assert (
+                Path("compile", "models", "t1_create_view.sql").stat().st_mtime_ns
+                == t1_mtime
+            )
+            # Compiled files with the same content are not written again
+            assert t3.stat().st_mtime_ns == t3_mtime
+
+            # New tasks are compiled
+            Path("sql", "models", "t4.sql").write_text("SELECT x FROM {{ src('t3') }}")
+            wait_for(Path("compile", "models", "t4_create_view.sql").exists)
+        finally:
+            process.send_signal(signal.SIGINT)
+            output = process.communicate(timeout=30)[0].decode("utf-8")
+
+        assert "Changes detected in: sql/macros.sql" in output
+        assert "Tasks executed: t2, t3" in output
+        assert "Tasks executed: t4" in output